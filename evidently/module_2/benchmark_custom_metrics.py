@@ -0,0 +1,90 @@
+import argparse
+import statistics
+import time
+import warnings
+
+import numpy as np
+from sklearn import metrics
+
+from evidently.base_metric import InputData
+from evidently.metrics.custom_metric import CustomValueMetric
+from evidently.report import Report
+
+import vectorized_metrics
+from custom_metrics_regression import housing_cur, housing_ref, regression_column_mapping
+
+
+def sklearn_func(score):
+    """Une métrique écrite comme dans l'exercice : ses colonnes extraites et un appel à sklearn."""
+
+    def func(data: InputData) -> float:
+        return score(
+            data.current_data[data.column_mapping.target],
+            data.current_data[data.column_mapping.prediction],
+        )
+
+    func.__name__ = f"sklearn_{score.__name__}"
+    return func
+
+
+SKLEARN_FUNCS = {
+    "explained_variance": sklearn_func(metrics.explained_variance_score),
+    "max_error": sklearn_func(metrics.max_error),
+    "mean_absolute_error": sklearn_func(metrics.mean_absolute_error),
+    "root_mean_squared_error": sklearn_func(metrics.root_mean_squared_error),
+    "mean_error": sklearn_func(lambda y, y_pred: np.mean(y - y_pred)),
+}
+VECTORIZED_FUNCS = {name: getattr(vectorized_metrics, name) for name in SKLEARN_FUNCS}
+
+
+def median_seconds(method, trials: int) -> float:
+    times = []
+    for _ in range(trials):
+        start = time.perf_counter()
+        method()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def compute(funcs: list):
+    # Un nouvel InputData, comme à chaque exécution d'un rapport.
+    data = InputData(housing_ref, housing_cur, regression_column_mapping, None, {})
+    return [func(data) for func in funcs]
+
+
+def run_report(funcs: list):
+    report = Report(metrics=[CustomValueMetric(func=func, title=func.__name__) for func in funcs])
+    report.run(
+        reference_data=housing_ref,
+        current_data=housing_cur,
+        column_mapping=regression_column_mapping,
+    )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare les métriques personnalisées de l'exercice (une fonction sklearn par "
+        "métrique) et MetricSet (une passe vectorisée) sur le jeu California housing."
+    )
+    parser.add_argument("--trials", type=int, default=50)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    # Les deux implémentations donnent les mêmes valeurs.
+    expected = compute(list(SKLEARN_FUNCS.values()))
+    assert np.allclose(compute(list(VECTORIZED_FUNCS.values())), expected)
+    # Le premier rapport initialise Evidently : il n'est pas mesuré.
+    run_report(list(SKLEARN_FUNCS.values()))
+
+    print(f"{len(housing_cur)} lignes, médiane de {args.trials} essais")
+    print(f"{'métriques':>9} {'implémentation':<16} {'fonctions':>10} {'rapport':>10}")
+    for count in [2, len(SKLEARN_FUNCS)]:
+        for label, funcs in [("sklearn", SKLEARN_FUNCS), ("MetricSet", VECTORIZED_FUNCS)]:
+            funcs = list(funcs.values())[:count]
+            func_seconds = median_seconds(lambda: compute(funcs), args.trials)
+            report_seconds = median_seconds(lambda: run_report(funcs), args.trials)
+            print(
+                f"{count:>9} {label:<16} {func_seconds * 1000:>8.2f}ms "
+                f"{report_seconds * 1000:>8.1f}ms"
+            )
@@ -1,14 +1,14 @@
 import pandas as pd
 import numpy as np
 from sklearn import datasets
-from sklearn.metrics import explained_variance_score, max_error
 
 from evidently import ColumnMapping
-from evidently.base_metric import InputData
 from evidently.metrics.custom_metric import CustomValueMetric
 from evidently.report import Report
 from evidently.renderers.html_widgets import WidgetSize
 
+from vectorized_metrics import explained_variance, max_error
+
 TARGET_COLUMN = 'target'
 PREDICTION_COLUMN = 'prediction'
 SAVE_TO_HTML = True
@@ -31,42 +31,31 @@ regression_column_mapping = ColumnMapping()
 regression_column_mapping.target = TARGET_COLUMN
 regression_column_mapping.prediction = PREDICTION_COLUMN
 
-def explained_variance_custom_func(data: InputData) -> float:
-    """Calcule le score de variance expliquée sur les données actuelles."""
-    return explained_variance_score(
-        data.current_data[data.column_mapping.target],
-        data.current_data[data.column_mapping.prediction]
-    )
-
-def max_error_custom_func(data: InputData) -> float:
-    """Calcule l'erreur maximale sur les données actuelles."""
-    return max_error(
-        data.current_data[data.column_mapping.target],
-        data.current_data[data.column_mapping.prediction]
-    )
-
 
-custom_metrics_report = Report(metrics=[
-    CustomValueMetric(
-        func=explained_variance_custom_func,
-        title="Custom: Explained Variance Score (Current)",
-        size=WidgetSize.HALF
-    ),
-    CustomValueMetric(
-        func=max_error_custom_func,
-        title="Custom: Max Error (Current)",
-        size=WidgetSize.HALF
+if __name__ == "__main__":
+    # Les métriques de vectorized_metrics.py partagent l'extraction des colonnes
+    # cible et prédiction et les résidus : elles sont calculées en une seule passe.
+    custom_metrics_report = Report(metrics=[
+        CustomValueMetric(
+            func=explained_variance,
+            title="Custom: Explained Variance Score (Current)",
+            size=WidgetSize.HALF
+        ),
+        CustomValueMetric(
+            func=max_error,
+            title="Custom: Max Error (Current)",
+            size=WidgetSize.HALF
+        )
+    ])
+
+    custom_metrics_report.run(
+        reference_data=housing_ref,
+        current_data=housing_cur,
+        column_mapping=regression_column_mapping
     )
-])
-
-custom_metrics_report.run(
-    reference_data=housing_ref,
-    current_data=housing_cur,
-    column_mapping=regression_column_mapping
-)
 
 
-if SAVE_TO_HTML:
-    report_file_path_custom_reg = "evidently_custom_metrics_regression_report.html"
-    custom_metrics_report.save_html(report_file_path_custom_reg)
-    print(f"Rapport avec métriques personnalisées sauvegardé dans : {report_file_path_custom_reg}")
+    if SAVE_TO_HTML:
+        report_file_path_custom_reg = "evidently_custom_metrics_regression_report.html"
+        custom_metrics_report.save_html(report_file_path_custom_reg)
+        print(f"Rapport avec métriques personnalisées sauvegardé dans : {report_file_path_custom_reg}")
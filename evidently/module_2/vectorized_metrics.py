@@ -0,0 +1,113 @@
+import inspect
+import weakref
+
+import numpy as np
+
+from evidently.base_metric import InputData
+
+
+class MetricSet:
+    """Métriques personnalisées calculées ensemble, en une seule passe vectorisée.
+
+    Chaque métrique déclare ses besoins par le nom de ses arguments : une
+    colonne (`MetricSet(y="target")` lit la colonne cible de la
+    ColumnMapping) ou une grandeur intermédiaire déclarée avec
+    `@intermediate`. Au premier appel d'une métrique sur un `InputData`,
+    chaque colonne est extraite une seule fois en tableau NumPy, chaque
+    grandeur intermédiaire est calculée une seule fois, puis toutes les
+    métriques sont calculées. Les métriques suivantes du même rapport lisent
+    le résultat de cette passe.
+    """
+
+    def __init__(self, **columns: str):
+        # nom d'argument -> attribut de la ColumnMapping (target, prediction...)
+        self.columns = columns
+        self.intermediates = {}
+        self.metrics = {}
+        self._data = None
+        self._values = None
+
+    def intermediate(self, func):
+        """Déclare une grandeur intermédiaire, partagée par les métriques qui la demandent."""
+        self.intermediates[func.__name__] = (func, list(inspect.signature(func).parameters))
+        return func
+
+    def metric(self, func):
+        """Déclare une métrique et retourne la fonction à passer à `CustomValueMetric`."""
+        self.metrics[func.__name__] = (func, list(inspect.signature(func).parameters))
+
+        def value(data: InputData) -> float:
+            return self.values(data)[func.__name__]
+
+        value.__name__ = value.__qualname__ = func.__name__
+        value.__module__ = func.__module__
+        value.__doc__ = func.__doc__
+        return value
+
+    def values(self, data: InputData) -> dict:
+        """Calcule toutes les métriques sur les données actuelles de `data`."""
+        if self._data is not None and self._data() is data:
+            return self._values
+        cache = {}
+
+        def resolve(name):
+            if name not in cache:
+                if name in self.columns:
+                    column = getattr(data.column_mapping, self.columns[name])
+                    cache[name] = data.current_data[column].to_numpy(dtype=np.float64)
+                elif name in self.intermediates:
+                    cache[name] = call(*self.intermediates[name])
+                else:
+                    raise ValueError(f"{name} n'est ni une colonne ni une grandeur intermédiaire")
+            return cache[name]
+
+        def call(func, args):
+            return func(*[resolve(arg) for arg in args])
+
+        values = {name: float(call(*metric)) for name, metric in self.metrics.items()}
+        # Une référence faible : l'ensemble ne garde pas les données d'un rapport en vie.
+        self._data, self._values = weakref.ref(data), values
+        return values
+
+
+regression_metrics = MetricSet(y="target", y_pred="prediction")
+
+
+@regression_metrics.intermediate
+def residual(y, y_pred):
+    return y - y_pred
+
+
+@regression_metrics.intermediate
+def abs_residual(residual):
+    return np.abs(residual)
+
+
+@regression_metrics.metric
+def explained_variance(y, residual):
+    """Score de variance expliquée, comme `sklearn.metrics.explained_variance_score`."""
+    variance = y.var()
+    if variance == 0:
+        return 1.0 if residual.var() == 0 else 0.0
+    return 1 - residual.var() / variance
+
+
+@regression_metrics.metric
+def max_error(abs_residual):
+    """Erreur maximale, comme `sklearn.metrics.max_error`."""
+    return abs_residual.max()
+
+
+@regression_metrics.metric
+def mean_absolute_error(abs_residual):
+    return abs_residual.mean()
+
+
+@regression_metrics.metric
+def root_mean_squared_error(residual):
+    return np.sqrt(np.mean(residual * residual))
+
+
+@regression_metrics.metric
+def mean_error(residual):
+    return residual.mean()
@@ -3,11 +3,11 @@ from sklearn import ensemble
 
 from evidently.test_suite import TestSuite
 from evidently import ColumnMapping
-from evidently.base_metric import InputData
-from sklearn.metrics import balanced_accuracy_score, fbeta_score
 
 from evidently.tests.custom_test import CustomValueTest
 
+from vectorized_metrics import balanced_accuracy, f2_score
+
 TARGET_COLUMN = "target"
 PREDICTION_COLUMN = "prediction" 
 BINARY_PREDICTION_COLUMN = (
@@ -48,39 +48,34 @@ binary_column_mapping.prediction = BINARY_PREDICTION_COLUMN
 binary_column_mapping.numerical_features = feature_names
 
 
-# Custom test
-def balanced_accuracy_func(data: InputData): 
-    return balanced_accuracy_score(data.current_data[data.column_mapping.target],
-        data.current_data[data.column_mapping.prediction])
-
-def fbeta_func(data: InputData):
-    return fbeta_score(data.current_data[data.column_mapping.target],
-        data.current_data[data.column_mapping.prediction], beta=2)
-
-classification_test_suite = TestSuite(
-    tests=[
-        CustomValueTest(
-            func=balanced_accuracy_func,
-            title="Custom: Balanced Accuracy Score (Current)",
-            lt=0.9,
-            gte=0.7
-        ),
-        CustomValueTest(
-            func=fbeta_func,
-            title="Custom: F-beta Score (Current)",
-            gt=0.6
-        )
-     
-    ]
-)
-
-classification_test_suite.run(
-    current_data=bcancer_cur,
-    reference_data=bcancer_ref,
-    column_mapping=binary_column_mapping,
-)
-
-if SAVE_TO_HTML:
-    report_file_path_tests = "evidently_classification_with_custom_test.html"
-    classification_test_suite.save_html(report_file_path_tests)
-    print(f"Test suite report saved to {report_file_path_tests}")
+if __name__ == "__main__":
+    # Custom test
+    # Les métriques de vectorized_metrics.py partagent l'extraction des colonnes
+    # cible et prédiction et la matrice de confusion : elles sont calculées en une seule passe.
+    classification_test_suite = TestSuite(
+        tests=[
+            CustomValueTest(
+                func=balanced_accuracy,
+                title="Custom: Balanced Accuracy Score (Current)",
+                lt=0.9,
+                gte=0.7
+            ),
+            CustomValueTest(
+                func=f2_score,
+                title="Custom: F-beta Score (Current)",
+                gt=0.6
+            )
+
+        ]
+    )
+
+    classification_test_suite.run(
+        current_data=bcancer_cur,
+        reference_data=bcancer_ref,
+        column_mapping=binary_column_mapping,
+    )
+
+    if SAVE_TO_HTML:
+        report_file_path_tests = "evidently_classification_with_custom_test.html"
+        classification_test_suite.save_html(report_file_path_tests)
+        print(f"Test suite report saved to {report_file_path_tests}")
@@ -0,0 +1,120 @@
+# BEGIN INLINED evidently/module_2/vectorized_metrics.py: MetricSet
+# Generated by sync_inlined.py, edit the file above instead.
+import inspect
+import numpy as np
+import weakref
+from evidently.base_metric import InputData
+
+
+class MetricSet:
+    """Métriques personnalisées calculées ensemble, en une seule passe vectorisée.
+
+    Chaque métrique déclare ses besoins par le nom de ses arguments : une
+    colonne (`MetricSet(y="target")` lit la colonne cible de la
+    ColumnMapping) ou une grandeur intermédiaire déclarée avec
+    `@intermediate`. Au premier appel d'une métrique sur un `InputData`,
+    chaque colonne est extraite une seule fois en tableau NumPy, chaque
+    grandeur intermédiaire est calculée une seule fois, puis toutes les
+    métriques sont calculées. Les métriques suivantes du même rapport lisent
+    le résultat de cette passe.
+    """
+
+    def __init__(self, **columns: str):
+        # nom d'argument -> attribut de la ColumnMapping (target, prediction...)
+        self.columns = columns
+        self.intermediates = {}
+        self.metrics = {}
+        self._data = None
+        self._values = None
+
+    def intermediate(self, func):
+        """Déclare une grandeur intermédiaire, partagée par les métriques qui la demandent."""
+        self.intermediates[func.__name__] = (func, list(inspect.signature(func).parameters))
+        return func
+
+    def metric(self, func):
+        """Déclare une métrique et retourne la fonction à passer à `CustomValueMetric`."""
+        self.metrics[func.__name__] = (func, list(inspect.signature(func).parameters))
+
+        def value(data: InputData) -> float:
+            return self.values(data)[func.__name__]
+
+        value.__name__ = value.__qualname__ = func.__name__
+        value.__module__ = func.__module__
+        value.__doc__ = func.__doc__
+        return value
+
+    def values(self, data: InputData) -> dict:
+        """Calcule toutes les métriques sur les données actuelles de `data`."""
+        if self._data is not None and self._data() is data:
+            return self._values
+        cache = {}
+
+        def resolve(name):
+            if name not in cache:
+                if name in self.columns:
+                    column = getattr(data.column_mapping, self.columns[name])
+                    cache[name] = data.current_data[column].to_numpy(dtype=np.float64)
+                elif name in self.intermediates:
+                    cache[name] = call(*self.intermediates[name])
+                else:
+                    raise ValueError(f"{name} n'est ni une colonne ni une grandeur intermédiaire")
+            return cache[name]
+
+        def call(func, args):
+            return func(*[resolve(arg) for arg in args])
+
+        values = {name: float(call(*metric)) for name, metric in self.metrics.items()}
+        # Une référence faible : l'ensemble ne garde pas les données d'un rapport en vie.
+        self._data, self._values = weakref.ref(data), values
+        return values
+# END INLINED
+
+
+classification_metrics = MetricSet(y="target", y_pred="prediction")
+
+
+def _ratio(numerator, denominator):
+    # 0 quand le dénominateur est nul, comme le zero_division de sklearn.
+    return numerator / denominator if denominator else 0.0
+
+
+@classification_metrics.intermediate
+def confusion(y, y_pred):
+    """Les effectifs tn, fp, fn, tp d'une cible et d'une prédiction binaires (0 ou 1)."""
+    # Avec d'autres valeurs, 2 * y + y_pred ne serait plus l'indice d'une case.
+    if not (np.isin(y, (0, 1)).all() and np.isin(y_pred, (0, 1)).all()):
+        raise ValueError("La cible et la prédiction doivent valoir 0 ou 1")
+    return np.bincount((2 * y + y_pred).astype(np.intp), minlength=4)
+
+
+@classification_metrics.metric
+def balanced_accuracy(confusion):
+    """Exactitude équilibrée, comme `sklearn.metrics.balanced_accuracy_score`."""
+    tn, fp, fn, tp = confusion
+    return (_ratio(tp, tp + fn) + _ratio(tn, tn + fp)) / 2
+
+
+@classification_metrics.metric
+def f2_score(confusion):
+    """F-beta avec beta = 2, comme `sklearn.metrics.fbeta_score(..., beta=2)`."""
+    tn, fp, fn, tp = confusion
+    return _ratio(5 * tp, 5 * tp + 4 * fn + fp)
+
+
+@classification_metrics.metric
+def accuracy(confusion):
+    tn, fp, fn, tp = confusion
+    return _ratio(tn + tp, confusion.sum())
+
+
+@classification_metrics.metric
+def precision(confusion):
+    tn, fp, fn, tp = confusion
+    return _ratio(tp, tp + fp)
+
+
+@classification_metrics.metric
+def recall(confusion):
+    tn, fp, fn, tp = confusion
+    return _ratio(tp, tp + fn)
@@ -7,45 +7,217 @@ from kfp import dsl, compiler
         "fsspec",
         "gcsfs",
         "pandas",
+        "pyarrow",
         "scikit-learn",
     ],
 )
 def load_data(
-    dataset_uri: str, features: dsl.Output[dsl.Dataset], target: dsl.Output[dsl.Dataset]
+    dataset_uri: str,
+    features: dsl.Output[dsl.Dataset],
+    target: dsl.Output[dsl.Dataset],
+    data_format: str = "parquet",
 ):
     import pandas as pd
 
+    # BEGIN INLINED kfp/module_6/dataset_io.py: write_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def write_dataset(df, dataset, data_format: str):
+        """Write `df` to the `dataset` artifact as "parquet", "arrow" or "csv".
+
+        The format is recorded in the `format` metadata of the artifact.
+        """
+        # Arrow IPC is written uncompressed and as a single record batch, so
+        # that readers can memory-map its columns without copying them.
+        dataset.metadata["format"] = data_format
+        if data_format == "parquet":
+            df.to_parquet(dataset.path, index=False)
+        elif data_format == "arrow":
+            df.reset_index(drop=True).to_feather(
+                dataset.path, compression="uncompressed", chunksize=max(len(df), 1)
+            )
+        elif data_format == "csv":
+            df.to_csv(dataset.path, index=False)
+        else:
+            raise ValueError(f"Unknown data format {data_format!r}")
+    # END INLINED
+
     df = pd.read_csv(dataset_uri)
     features_df = df.drop(columns=["Churn"])
     target_df = df[["Churn"]]
-    features_df.to_csv(features.path, index=False)
-    target_df.to_csv(target.path, index=False)
+    write_dataset(features_df, features, data_format)
+    write_dataset(target_df, target, data_format)
 
 
 @dsl.component(
-    base_image="python:3.11", packages_to_install=["pandas", "scikit-learn", "mlflow"]
+    base_image="python:3.11",
+    packages_to_install=["pandas", "pyarrow", "scikit-learn", "mlflow"],
 )
 def predict(
     features: dsl.Input[dsl.Dataset],
     model_name: str,
     tracking_uri: str,
     predictions: dsl.Output[dsl.Dataset],
+    metrics: dsl.Output[dsl.Metrics],
+    chunk_size: int = 0,
+    workers: int = 1,
+    data_format: str = "parquet",
 ):
+    import itertools
+    import resource
+    import time
+    import numpy as np
     import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
     import mlflow
 
     mlflow.set_tracking_uri(tracking_uri)
 
     production_model = mlflow.pyfunc.load_model(f"models:/{model_name}@production-live")
 
-    features_df = pd.read_csv(features.path)
-    pred = production_model.predict(features_df)
-    predictions_df = pd.DataFrame(pred, columns=["prediction"])
-    predictions_df.to_csv(predictions.path, index=False)
+    if data_format not in ("parquet", "arrow", "csv"):
+        raise ValueError(f"Unknown data format {data_format!r}")
+    with open(features.path, "rb") as f:
+        magic = f.read(6)
+    input_format = "parquet" if magic[:4] == b"PAR1" else "arrow" if magic == b"ARROW1" else "csv"
+    if workers > 1:
+        chunk_size = chunk_size or 100_000
+
+    def read_chunks(raw_csv=False):
+        # Yield the features by chunks of at most chunk_size rows, or all at once.
+        if input_format == "parquet":
+            if not chunk_size:
+                yield pd.read_parquet(features.path)
+                return
+            for batch in pq.ParquetFile(features.path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif input_format == "arrow":
+            # Memory-mapped, only the chunk being converted is read from disk.
+            table = pa.ipc.open_file(pa.memory_map(features.path)).read_all()
+            if not chunk_size:
+                yield table.to_pandas(split_blocks=True)
+                return
+            for batch in table.to_batches(max_chunksize=chunk_size):
+                yield batch.to_pandas()
+        elif raw_csv:
+            # Leave parsing to the workers. The features have no quoted
+            # fields, so a line is a row.
+            with open(features.path) as f:
+                header = f.readline()
+                while lines := list(itertools.islice(f, chunk_size)):
+                    yield header + "".join(lines)
+        elif chunk_size:
+            yield from pd.read_csv(features.path, chunksize=chunk_size)
+        else:
+            yield pd.read_csv(features.path)
+
+    predictions.metadata["format"] = data_format
+    writer = None
+
+    def write_predictions(pred):
+        # Append one chunk of predictions to the output artifact.
+        nonlocal writer
+        predictions_df = pd.DataFrame(pred, columns=["prediction"])
+        if data_format == "csv":
+            if writer is None:
+                writer = open(predictions.path, "w", newline="")
+                predictions_df.to_csv(writer, index=False)
+            else:
+                predictions_df.to_csv(writer, header=False, index=False)
+            return
+        table = pa.Table.from_pandas(predictions_df, preserve_index=False)
+        if writer is None:
+            if data_format == "parquet":
+                writer = pq.ParquetWriter(predictions.path, table.schema)
+            else:
+                writer = pa.ipc.new_file(predictions.path, table.schema)
+        writer.write_table(table)
+
+    start = time.perf_counter()
+    n_rows = 0
+    if workers > 1:
+        # Forked workers share the model loaded above and score the chunks,
+        # CSV ones are sent as raw text and parsed by the workers too.
+        import io
+        import multiprocessing
+        import queue
+
+        context = multiprocessing.get_context("fork")
+        tasks, results = context.Queue(), context.Queue()
+
+        def score_chunks():
+            while (task := tasks.get()) is not None:
+                i, chunk = task
+                try:
+                    if isinstance(chunk, str):
+                        chunk = pd.read_csv(io.StringIO(chunk))
+                    results.put((i, np.asarray(production_model.predict(chunk)), None))
+                except Exception as e:
+                    results.put((i, None, repr(e)))
+
+        def next_result(processes):
+            while True:
+                try:
+                    return results.get(timeout=1)
+                except queue.Empty:
+                    if not all(p.is_alive() for p in processes):
+                        raise RuntimeError("A scoring worker exited unexpectedly")
+
+        processes = [context.Process(target=score_chunks, daemon=True) for _ in range(workers)]
+        for p in processes:
+            p.start()
+        # Chunks are written in input order. At most two chunks per worker
+        # are in flight, which bounds the memory held by queues and by the
+        # results waiting for an earlier chunk.
+        chunks = read_chunks(raw_csv=True)
+        done, n_sent, n_written = {}, 0, 0
+        chunk = next(chunks, None)
+        while chunk is not None or n_written < n_sent:
+            if chunk is not None and n_sent - n_written < 2 * workers:
+                tasks.put((n_sent, chunk))
+                n_sent += 1
+                chunk = next(chunks, None)
+                continue
+            i, pred, error = next_result(processes)
+            if error is not None:
+                raise RuntimeError(f"Scoring chunk {i} failed: {error}")
+            done[i] = pred
+            while n_written in done:
+                pred = done.pop(n_written)
+                write_predictions(pred)
+                n_rows += len(pred)
+                n_written += 1
+        for p in processes:
+            tasks.put(None)
+        for p in processes:
+            p.join()
+    else:
+        for features_df in read_chunks():
+            write_predictions(production_model.predict(features_df))
+            n_rows += len(features_df)
+    if writer is None:
+        write_predictions([])
+    writer.close()
+    seconds = time.perf_counter() - start
+
+    metrics.log_metric("rows", n_rows)
+    metrics.log_metric("chunk_size", chunk_size)
+    metrics.log_metric("workers", workers)
+    metrics.log_metric("scoring_seconds", round(seconds, 3))
+    metrics.log_metric("rows_per_second", round(n_rows / seconds, 1) if seconds else 0.0)
+    # ru_maxrss is in KiB on Linux.
+    metrics.log_metric(
+        "peak_rss_mib", round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    )
+    if workers > 1:
+        metrics.log_metric(
+            "worker_peak_rss_mib",
+            round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        )
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "evidently==0.6.6"]
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
 )
 def data_quality(
     reference_features: dsl.Input[dsl.Dataset],
@@ -53,18 +225,37 @@ def data_quality(
     report: dsl.Output[dsl.HTML],
 ):
     import pandas as pd
+    import pyarrow as pa
     from evidently.test_suite import TestSuite
     from evidently.test_preset import DataStabilityTestPreset
 
-    reference_df = pd.read_csv(reference_features.path)
-    current_df = pd.read_csv(current_features.path)
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    reference_df = read_dataset(reference_features)
+    current_df = read_dataset(current_features)
     test_suite = TestSuite(tests=[DataStabilityTestPreset()])
     test_suite.run(reference_data=reference_df, current_data=current_df)
     test_suite.save_html(report.path)
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "evidently==0.6.6"]
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
 )
 def data_drift(
     reference_features: dsl.Input[dsl.Dataset],
@@ -72,18 +263,37 @@ def data_drift(
     report: dsl.Output[dsl.HTML],
 ):
     import pandas as pd
+    import pyarrow as pa
     from evidently.test_suite import TestSuite
     from evidently.test_preset import DataDriftTestPreset
 
-    reference_df = pd.read_csv(reference_features.path)
-    current_df = pd.read_csv(current_features.path)
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    reference_df = read_dataset(reference_features)
+    current_df = read_dataset(current_features)
     test_suite = TestSuite(tests=[DataDriftTestPreset()])
     test_suite.run(reference_data=reference_df, current_data=current_df)
     test_suite.save_html(report.path)
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "evidently==0.6.6"]
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
 )
 def prediction_drift(
     reference_target: dsl.Input[dsl.Dataset],
@@ -91,11 +301,30 @@ def prediction_drift(
     drift_report: dsl.Output[dsl.HTML],
 ):
     import pandas as pd
+    import pyarrow as pa
     from evidently.report import Report
     from evidently.metrics import ColumnDriftMetric
 
-    reference_df = pd.read_csv(reference_target.path)
-    current_df = pd.read_csv(current_target.path)
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    reference_df = read_dataset(reference_target)
+    current_df = read_dataset(current_target)
     report = Report(
         metrics=[ColumnDriftMetric(column_name="prediction")],
     )
@@ -104,20 +333,59 @@ def prediction_drift(
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "evidently==0.6.6"]
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
 )
 def post_process(
     features: dsl.Input[dsl.Dataset],
     target: dsl.Input[dsl.Dataset],
     predictions: dsl.Input[dsl.Dataset],
     output_dataset: dsl.Output[dsl.Dataset],
+    data_format: str = "parquet",
 ):
     import pandas as pd
+    import pyarrow as pa
+
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset write_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def write_dataset(df, dataset, data_format: str):
+        """Write `df` to the `dataset` artifact as "parquet", "arrow" or "csv".
+
+        The format is recorded in the `format` metadata of the artifact.
+        """
+        # Arrow IPC is written uncompressed and as a single record batch, so
+        # that readers can memory-map its columns without copying them.
+        dataset.metadata["format"] = data_format
+        if data_format == "parquet":
+            df.to_parquet(dataset.path, index=False)
+        elif data_format == "arrow":
+            df.reset_index(drop=True).to_feather(
+                dataset.path, compression="uncompressed", chunksize=max(len(df), 1)
+            )
+        elif data_format == "csv":
+            df.to_csv(dataset.path, index=False)
+        else:
+            raise ValueError(f"Unknown data format {data_format!r}")
 
-    df = pd.read_csv(features.path)
-    df["predictions"] = pd.read_csv(predictions.path)
-    df["Churn"] = pd.read_csv(target.path)
-    df.to_csv(output_dataset.path, index=False)
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    df = read_dataset(features)
+    df["predictions"] = read_dataset(predictions)
+    df["Churn"] = read_dataset(target)
+    write_dataset(df, output_dataset, data_format)
 
 
 @dsl.pipeline(name="inference_pipeline")
@@ -126,13 +394,16 @@ def inference_pipeline(
     model_name: str,
     tracking_uri: str,
     reference_dataset_uri: str,
+    chunk_size: int = 0,
+    workers: int = 1,
+    data_format: str = "parquet",
 ):
     load_reference_data_task = load_data(
-        dataset_uri=reference_dataset_uri
+        dataset_uri=reference_dataset_uri, data_format=data_format
     ).set_display_name("Load Reference Data")
-    load_data_task = load_data(dataset_uri=churn_dataset_uri).set_display_name(
-        "Load Current Data"
-    )
+    load_data_task = load_data(
+        dataset_uri=churn_dataset_uri, data_format=data_format
+    ).set_display_name("Load Current Data")
     data_quality_task = data_quality(
         reference_features=load_reference_data_task.outputs["features"],
         current_features=load_data_task.outputs["features"],
@@ -146,6 +417,9 @@ def inference_pipeline(
         features=load_data_task.outputs["features"],
         model_name=model_name,
         tracking_uri=tracking_uri,
+        chunk_size=chunk_size,
+        workers=workers,
+        data_format=data_format,
     ).set_display_name("Predict Current")
 
     # If Reference Predictions weren't saved, we need to predict them
@@ -153,6 +427,9 @@ def inference_pipeline(
         features=load_reference_data_task.outputs["features"],
         model_name=model_name,
         tracking_uri=tracking_uri,
+        chunk_size=chunk_size,
+        workers=workers,
+        data_format=data_format,
     ).set_display_name("Predict Reference")
 
     target_drift_task = prediction_drift(
@@ -164,6 +441,7 @@ def inference_pipeline(
         features=load_data_task.outputs["features"],
         target=load_data_task.outputs["target"],
         predictions=predict_current_task.outputs["predictions"],
+        data_format=data_format,
     ).set_display_name("Post Process")
 
 
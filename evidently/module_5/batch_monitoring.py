@@ -16,7 +16,7 @@ from evidently.ui.dashboards import TestSuitePanelType
 from evidently.renderers.html_widgets import WidgetSize
 from evidently.ui.workspace import Workspace
 from evidently.ui.workspace import WorkspaceBase
-from evidently.ui.remote import RemoteWorkspace
+from workspace_client import PooledWorkspace
 
 YOUR_PROJECT_NAME = "PROJECT_NAME"
 YOUR_PROJECT_DESCRIPTION = "Test project using Churn dataset"
@@ -144,5 +144,6 @@ def create_project(workspace: WorkspaceBase):
     return project
     
 if __name__ == "__main__":
-    ws = RemoteWorkspace("https://evidently-server-instance-988498511057.europe-west9.run.app")
-    create_project(ws)
\ No newline at end of file
+    ws = PooledWorkspace("https://evidently-server-instance-988498511057.europe-west9.run.app")
+    create_project(ws)
+    ws.close()
\ No newline at end of file
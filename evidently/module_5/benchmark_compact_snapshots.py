@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import urllib.request
+import warnings
+from datetime import datetime, timedelta
+
+from benchmark_fused_monitoring import run
+from benchmark_monitoring_memory import prepare
+
+
+def full_snapshots(workspace: str, project_id: str, rows: int) -> list:
+    """The snapshots of the monitoring component on the churn data, as saved in snapshot_detail."""
+    from evidently._pydantic_compat import parse_obj_as
+    from evidently.suite.base_suite import Snapshot
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prepare(tmp_dir, "parquet", rows)
+        run("monitoring", "parquet", tmp_dir, workspace, project_id, compact=True)
+        with open(os.path.join(tmp_dir, "monitoring_snapshots.json")) as f:
+            return [parse_obj_as(Snapshot, s) for s in json.load(f).values()]
+
+
+def windows(snapshots: list, count: int) -> list:
+    """`count` daily copies of `snapshots`, with new ids, like `count` runs of the component."""
+    from evidently.core import new_id
+
+    start = datetime(2025, 1, 1)
+    return [
+        s.copy(update={"id": new_id(), "timestamp": start + timedelta(days=day)})
+        for day in range(count)
+        for s in snapshots
+    ]
+
+
+def median_seconds(method, trials: int) -> float:
+    times = []
+    for _ in range(trials):
+        start = time.perf_counter()
+        method()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare full and compact snapshots of the monitoring component: size, "
+        "upload time and dashboard load time."
+    )
+    parser.add_argument("--workspace", type=str, required=True, help="URL of an Evidently UI")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--windows", type=int, default=100, help="Runs shown on the dashboard")
+    parser.add_argument("--trials", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    from evidently._pydantic_compat import parse_obj_as
+    from evidently.suite.base_suite import Snapshot
+    from evidently.utils import NumpyEncoder
+    from batch_monitoring import create_project
+    from workspace_client import PooledWorkspace, compact_snapshot
+
+    ws = PooledWorkspace(args.workspace)
+    full = full_snapshots(args.workspace, str(ws.create_project("benchmark").id), args.rows)
+    modes = {"full": full, "compact": [compact_snapshot(s) for s in full]}
+
+    print(f"monitoring snapshots on {args.rows} rows, median of {args.trials} trials")
+    print(f"{'snapshot':<26} {'full':>10} {'compact':>10}")
+    for snapshot, compact in zip(*modes.values()):
+        sizes = [
+            len(json.dumps(s.dict(), allow_nan=True, cls=NumpyEncoder).encode())
+            for s in [snapshot, compact]
+        ]
+        print(f"{snapshot.tags[0]:<26} {sizes[0] / 1024:>6.1f} KiB {sizes[1] / 1024:>6.1f} KiB")
+
+    for mode, snapshots in modes.items():
+        project = create_project(ws)
+        upload = median_seconds(
+            lambda: ws.add_snapshots(project.id, windows(snapshots, 1)), args.trials
+        )
+        ws.add_snapshots(project.id, windows(snapshots, args.windows))
+        url = f"{args.workspace}/api/projects/{project.id}/dashboard"
+        dashboard = median_seconds(lambda: urllib.request.urlopen(url).read(), args.trials)
+        # What the UI does for every stored snapshot when it starts.
+        bodies = [
+            json.dumps(s.dict(), allow_nan=True, cls=NumpyEncoder)
+            for s in windows(snapshots, args.windows)
+        ]
+        parse = median_seconds(
+            lambda: [parse_obj_as(Snapshot, json.loads(body)) for body in bodies], 1
+        )
+        print(
+            f"{mode:<8} upload of one run {upload * 1000:6.1f}ms, "
+            f"dashboard of {args.windows} runs {dashboard * 1000:7.1f}ms, "
+            f"parse of {args.windows} runs {parse * 1000:7.1f}ms"
+        )
+    ws.close()
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import statistics
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmark_monitoring_memory import DATA_DIR
+
+START = datetime(2025, 1, 1)
+
+
+def run_snapshots() -> list:
+    """The snapshots of one run on the churn data: those of the monitoring component and model performance."""
+    from evidently.metrics import ClassificationQualityMetric, ColumnDriftMetric, DatasetDriftMetric
+    from evidently.report import Report
+    from evidently.test_preset import DataDriftTestPreset, DataStabilityTestPreset
+    from evidently.test_suite import TestSuite
+    from workspace_client import compact_snapshot
+
+    reference = pd.read_csv(os.path.join(DATA_DIR, "churn_data_2025_03.csv"))
+    current = pd.read_csv(os.path.join(DATA_DIR, "churn_data_2025_05.csv"))
+    features = [c for c in reference.columns if c != "Churn"]
+    # The churn, with 10% of errors, stands in for the predictions.
+    for df, seed in [(reference, 0), (current, 1)]:
+        errors = np.random.default_rng(seed).random(len(df)) < 0.1
+        df["prediction"] = np.where(errors, 1 - df["Churn"], df["Churn"])
+    suites = [
+        TestSuite(tests=[DataStabilityTestPreset()], tags=["data_quality_test_suite"]),
+        TestSuite(tests=[DataDriftTestPreset()], tags=["data_drift_test_suite"]),
+        Report(
+            metrics=[DatasetDriftMetric(columns=features), ColumnDriftMetric(column_name="prediction")],
+            tags=["data_drift", "prediction_drift"],
+        ),
+        Report(metrics=[ClassificationQualityMetric()], tags=["model_performance"]),
+    ]
+    for suite in suites[:2]:
+        suite.run(reference_data=reference[features], current_data=current[features])
+    suites[2].run(
+        reference_data=reference[features + ["prediction"]],
+        current_data=current[features + ["prediction"]],
+    )
+    suites[3].run(
+        reference_data=reference.rename(columns={"Churn": "target"}),
+        current_data=current.rename(columns={"Churn": "target"}),
+    )
+    return [compact_snapshot(s.to_snapshot()) for s in suites]
+
+
+def add_runs(path: str, project_id, snapshots: list, first_day: int, last_day: int):
+    """Write the snapshots of runs `first_day` to `last_day` to the workspace, with new ids."""
+    from evidently.core import new_id
+    from evidently.ui.workspace import Workspace
+
+    ws = Workspace(path)
+    for day in range(first_day, last_day):
+        for s in snapshots:
+            ws.add_snapshot(
+                project_id, s.copy(update={"id": new_id(), "timestamp": START + timedelta(days=day)})
+            )
+
+
+def as_json(dashboard) -> str:
+    """The dashboard as sent by the UI."""
+    from evidently.utils import NumpyEncoder
+
+    return json.dumps(dataclasses.asdict(dashboard), cls=NumpyEncoder)
+
+
+async def measure(project_manager, project_id, added: list, runs: int, trials: int) -> dict:
+    from evidently.ui.storage.common import NO_USER
+
+    async def median_seconds(timestamp_start):
+        times = []
+        for _ in range(trials):
+            start = time.perf_counter()
+            dashboard = await project.build_dashboard_info_async(timestamp_start, None)
+            times.append(time.perf_counter() - start)
+        return statistics.median(times), dashboard
+
+    project = await project_manager.get_project(NO_USER.id, project_id)
+    start = time.perf_counter()
+    first = await project.build_dashboard_info_async(None, None)
+    first_seconds = time.perf_counter() - start
+    load_seconds, dashboard = await median_seconds(None)
+    # The default view of a dashboard over a long history: its last 30 days.
+    last_days_seconds, _ = await median_seconds(START + timedelta(days=runs - 30))
+    # One more run, through the project manager like an upload, then deleted.
+    start = time.perf_counter()
+    for s in added:
+        await project_manager.add_snapshot(NO_USER.id, project_id, s)
+    add_seconds = time.perf_counter() - start
+    after_add = await project.build_dashboard_info_async(None, None)
+    for s in added:
+        await project_manager.delete_snapshot(NO_USER.id, project_id, s.id)
+    after_delete = await project.build_dashboard_info_async(None, None)
+    assert as_json(first) == as_json(dashboard) == as_json(after_delete)
+    return {
+        "first": first_seconds,
+        "load": load_seconds,
+        "last_days": last_days_seconds,
+        "add": add_seconds,
+        "dashboard": as_json(dashboard),
+        "after_add": as_json(after_add),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time the dashboard of batch_monitoring.py over a growing number of runs, with "
+        "the stock in-memory data storage and with IndexedDataStorage."
+    )
+    parser.add_argument("--runs", type=int, nargs="+", default=[30, 365, 1095])
+    parser.add_argument("--trials", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    from evidently.core import new_id
+    from evidently.ui.storage.local import create_local_project_manager
+    from evidently.ui.workspace import Workspace
+    from batch_monitoring import create_project
+    from dashboard_index import create_indexed_project_manager
+
+    snapshots = run_snapshots()
+    print(f"{len(snapshots)} snapshots per run, median of {args.trials} loads")
+    print(
+        f"{'runs':>5} {'storage':<8} {'first load':>11} {'load':>9} {'last 30 days':>13} "
+        f"{'add a run':>10}"
+    )
+    with tempfile.TemporaryDirectory() as path:
+        project_id = create_project(Workspace(path)).id
+        written = 0
+        for runs in args.runs:
+            add_runs(path, project_id, snapshots, written, runs)
+            written = runs
+            added = [
+                s.copy(update={"id": new_id(), "timestamp": datetime(2030, 1, 1)}) for s in snapshots
+            ]
+            results = {}
+            for label, create in [
+                ("stock", create_local_project_manager),
+                ("indexed", create_indexed_project_manager),
+            ]:
+                project_manager = create(path, autorefresh=False)
+                result = asyncio.run(measure(project_manager, project_id, added, runs, args.trials))
+                results[label] = result
+                print(
+                    f"{runs:>5} {label:<8} {result['first'] * 1000:>9.1f}ms "
+                    f"{result['load'] * 1000:>7.1f}ms {result['last_days'] * 1000:>11.1f}ms "
+                    f"{result['add'] * 1000:>8.1f}ms"
+                )
+            # Both storages give the same dashboard, before and after a run is added.
+            assert results["stock"]["dashboard"] == results["indexed"]["dashboard"]
+            assert results["stock"]["after_add"] == results["indexed"]["after_add"]
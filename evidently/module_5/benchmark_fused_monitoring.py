@@ -0,0 +1,124 @@
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark_monitoring_memory import artifact, prepare
+
+THREE_STEPS = ["data_quality", "data_drift", "prediction_drift"]
+
+
+class Metrics:
+    """Stand-in for the `dsl.Metrics` artifact when calling the component locally."""
+
+    def __init__(self):
+        self.values = {}
+
+    def log_metric(self, metric: str, value):
+        self.values[metric] = value
+
+
+def run(
+    component: str,
+    data_format: str,
+    tmp_dir: str,
+    workspace: str,
+    project_id: str,
+    compact: bool = False,
+):
+    """Run `component` like its container would: import, load, compute and upload."""
+    import inference_pipeline
+
+    features = {
+        "reference_features": artifact(tmp_dir, f"reference_features_{data_format}"),
+        "current_features": artifact(tmp_dir, f"current_features_{data_format}"),
+    }
+    if component == "monitoring":
+        inputs = {
+            **features,
+            "reference_predictions": artifact(tmp_dir, f"reference_predictions_{data_format}"),
+            "current_predictions": artifact(tmp_dir, f"current_predictions_{data_format}"),
+            "metrics": Metrics(),
+        }
+    elif component == "prediction_drift":
+        inputs = {
+            "reference_target": artifact(tmp_dir, f"reference_predictions_{data_format}"),
+            "current_target": artifact(tmp_dir, f"current_predictions_{data_format}"),
+            "drift_report": artifact(tmp_dir, "report.html"),
+        }
+    else:
+        inputs = {**features, "report": artifact(tmp_dir, "report.html")}
+    getattr(inference_pipeline, component).python_func(
+        workspace=workspace,
+        project_id=project_id,
+        snapshot_detail=artifact(tmp_dir, f"{component}_snapshots.json"),
+        compact=compact,
+        **inputs,
+    )
+
+
+def timed_process(args: list) -> tuple:
+    """Return the wall-clock and CPU time of a fresh process running the benchmark with `args`."""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *args],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return wall, cpu
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the fused monitoring component with data_quality, data_drift "
+        "and prediction_drift, each run in a fresh process like in its own container."
+    )
+    parser.add_argument("--workspace", type=str, required=True, help="URL of an Evidently UI")
+    parser.add_argument("--project_id", type=str, default="")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--data_format", type=str, default="parquet")
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument("--run", nargs=2, metavar=("COMPONENT", "TMP_DIR"))
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run[0], args.data_format, args.run[1], args.workspace, args.project_id)
+        sys.exit()
+
+    project_id = args.project_id
+    if not project_id:
+        from evidently.ui.remote import RemoteWorkspace
+
+        project_id = str(RemoteWorkspace(args.workspace).create_project("benchmark").id)
+    common = ["--workspace", args.workspace, "--project_id", project_id]
+    common += ["--data_format", args.data_format]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prepare(tmp_dir, args.data_format, args.rows)
+        print(f"{args.rows} rows of reference and current data in {args.data_format}, "
+              f"best of {args.trials} trials, imports included")
+        results = {}
+        for component in THREE_STEPS + ["monitoring"]:
+            trials = [timed_process([*common, "--run", component, tmp_dir]) for _ in range(args.trials)]
+            results[component] = min(trials)
+            wall, cpu = results[component]
+            print(f"{component:<17} wall {wall:6.2f}s  cpu {cpu:6.2f}s")
+
+        steps_wall = [results[step][0] for step in THREE_STEPS]
+        steps_cpu = sum(results[step][1] for step in THREE_STEPS)
+        fused_wall, fused_cpu = results["monitoring"]
+        print(
+            f"three steps: wall {sum(steps_wall):.2f}s one after the other, "
+            f"{max(steps_wall):.2f}s in parallel, cpu {steps_cpu:.2f}s"
+        )
+        print(
+            f"fused: wall {fused_wall:.2f}s, cpu {fused_cpu:.2f}s "
+            f"({1 - fused_cpu / steps_cpu:.0%} less cpu)"
+        )
@@ -0,0 +1,96 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+from benchmark_fused_monitoring import Metrics
+from benchmark_monitoring_memory import DATA_DIR, artifact
+from benchmark_sketch_drift import register_model
+
+
+def write_partition(tmp_dir: str, day: int, rows: int):
+    """Write `rows` rows of the May data, shifted a little more every day, as one partition."""
+    df = pd.read_csv(os.path.join(DATA_DIR, "churn_data_2025_05.csv"))
+    df = df.sample(rows, replace=True, random_state=day, ignore_index=True)
+    df["MonthlyCharges"] *= 1 + day / 100
+    partition_dir = os.path.join(tmp_dir, "partitions", f"date=2025-05-{day:02d}")
+    os.makedirs(partition_dir, exist_ok=True)
+    df.to_csv(os.path.join(partition_dir, "part.csv"), index=False)
+
+
+def run(tmp_dir: str, state_dir: str, workspace: str, project_id: str) -> dict:
+    from inference_pipeline import incremental_drift
+
+    metrics = Metrics()
+    start = time.perf_counter()
+    incremental_drift.python_func(
+        profile=artifact(tmp_dir, "profile.json"),
+        partitions_uri=os.path.join(tmp_dir, "partitions", "date=*", "part.csv"),
+        model_name="ChurnPrediction",
+        tracking_uri=f"sqlite:///{tmp_dir}/mlflow.db",
+        state_dir=state_dir,
+        workspace=workspace,
+        project_id=project_id,
+        running_profile=artifact(tmp_dir, "running_profile.json"),
+        metrics=metrics,
+    )
+    return {"seconds": time.perf_counter() - start, **metrics.values}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time incremental_drift on daily partitions: a first run over all of them, "
+        "then runs after one more day, and without new data."
+    )
+    parser.add_argument("--workspace", type=str, required=True, help="URL of an Evidently UI")
+    parser.add_argument("--project_id", type=str, default="")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows_per_day", type=int, default=100_000)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    from evidently.ui.remote import RemoteWorkspace
+    from inference_pipeline import reference_profile
+
+    project_id = args.project_id or str(
+        RemoteWorkspace(args.workspace).create_project("benchmark").id
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tracking_uri = f"sqlite:///{tmp_dir}/mlflow.db"
+        register_model(tracking_uri, os.path.join(tmp_dir, "mlruns"), "ChurnPrediction")
+        reference_profile.python_func(
+            reference_dataset_uri=os.path.join(DATA_DIR, "churn_data_2025_03.csv"),
+            model_name="ChurnPrediction",
+            tracking_uri=tracking_uri,
+            profile_dir=os.path.join(tmp_dir, "profiles"),
+            profile=artifact(tmp_dir, "profile.json"),
+            metrics=Metrics(),
+        )
+        for day in range(1, args.days):
+            write_partition(tmp_dir, day, args.rows_per_day)
+
+        state_dir = os.path.join(tmp_dir, "state")
+        print(f"{args.rows_per_day} rows per daily partition")
+        print(f"{'run':<28} {'time':>7} {'new':>4} {'rows scanned':>13} {'running rows':>13}")
+        cases = [(f"first run, {args.days - 1} days", None)]
+        cases += [(f"day {day} added", day) for day in range(args.days, args.days + 2)]
+        cases += [("no new partition", 0)]
+        for label, day in cases:
+            if day:
+                write_partition(tmp_dir, day, args.rows_per_day)
+            result = run(tmp_dir, state_dir, args.workspace, project_id)
+            print(
+                f"{label:<28} {result['seconds']:>6.2f}s {result['new_partitions']:>4} "
+                f"{result['rows']:>13} {result['running_rows']:>13}"
+            )
+        # What each run would cost if it started from scratch.
+        shutil.rmtree(state_dir)
+        result = run(tmp_dir, state_dir, args.workspace, project_id)
+        print(
+            f"{'recomputed, ' + str(result['partitions']) + ' days':<28} {result['seconds']:>6.2f}s "
+            f"{result['new_partitions']:>4} {result['rows']:>13} {result['running_rows']:>13}"
+        )
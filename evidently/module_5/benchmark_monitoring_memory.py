@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+COMPONENTS = ["data_quality", "data_drift", "prediction_drift"]
+
+
+def artifact(tmp_dir: str, name: str):
+    path = os.path.join(tmp_dir, name)
+    return SimpleNamespace(path=path, uri=path, metadata={})
+
+
+def memory_status() -> dict:
+    with open("/proc/self/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    return {key: int(status[key].split()[0]) / 1024 for key in ["VmHWM", "RssAnon"]}
+
+
+def prepare(tmp_dir: str, data_format: str, rows: int):
+    """Write reference and current features and predictions in `data_format`."""
+    from inference_pipeline import load_data
+
+    datasets = {"reference": "churn_data_2025_03.csv", "current": "churn_data_2025_05.csv"}
+    for name, dataset in datasets.items():
+        df = pd.read_csv(os.path.join(DATA_DIR, dataset))
+        enlarged_path = os.path.join(tmp_dir, f"{name}.csv")
+        pd.concat([df] * (rows // len(df)), ignore_index=True).to_csv(enlarged_path, index=False)
+        load_data.python_func(
+            dataset_uri=enlarged_path,
+            features=artifact(tmp_dir, f"{name}_features_{data_format}"),
+            target=artifact(tmp_dir, f"{name}_target_{data_format}"),
+            data_format=data_format,
+        )
+        # The actual churn stands in for the predictions, only their size matters here.
+        predictions_path = os.path.join(tmp_dir, f"{name}_predictions_{data_format}")
+        predictions_df = pd.read_csv(enlarged_path, usecols=["Churn"]).rename(
+            columns={"Churn": "prediction"}
+        )
+        if data_format == "parquet":
+            predictions_df.to_parquet(predictions_path, index=False)
+        elif data_format == "arrow":
+            predictions_df.to_feather(
+                predictions_path, compression="uncompressed", chunksize=len(predictions_df)
+            )
+        else:
+            predictions_df.to_csv(predictions_path, index=False)
+
+
+def measure(component: str, data_format: str, tmp_dir: str, workspace: str, project_id: str):
+    """Run `component` in this process and print its peak memory as JSON."""
+    import inference_pipeline
+    # Imported by the components, but not part of what is measured.
+    import evidently.metrics
+    import evidently.report
+    import evidently.test_preset
+    import evidently.test_suite
+    import evidently.ui.remote
+    import pyarrow.parquet
+
+    peak = {"RssAnon": 0.0}
+
+    def sample():
+        while True:
+            peak["RssAnon"] = max(peak["RssAnon"], memory_status()["RssAnon"])
+            time.sleep(0.005)
+
+    before = memory_status()
+    threading.Thread(target=sample, daemon=True).start()
+    if component == "prediction_drift":
+        inputs = {
+            "reference_target": artifact(tmp_dir, f"reference_predictions_{data_format}"),
+            "current_target": artifact(tmp_dir, f"current_predictions_{data_format}"),
+            "drift_report": artifact(tmp_dir, "report.html"),
+        }
+    else:
+        inputs = {
+            "reference_features": artifact(tmp_dir, f"reference_features_{data_format}"),
+            "current_features": artifact(tmp_dir, f"current_features_{data_format}"),
+            "report": artifact(tmp_dir, "report.html"),
+        }
+    start = time.perf_counter()
+    getattr(inference_pipeline, component).python_func(
+        workspace=workspace,
+        project_id=project_id,
+        snapshot_detail=artifact(tmp_dir, "snapshots.json"),
+        **inputs,
+    )
+    seconds = time.perf_counter() - start
+    after = memory_status()
+    print(
+        json.dumps(
+            {
+                "seconds": seconds,
+                "peak_rss_mib": after["VmHWM"] - before["VmHWM"],
+                "peak_private_mib": max(peak["RssAnon"], after["RssAnon"]) - before["RssAnon"],
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the peak memory of the monitoring components for each data_format, "
+        "each run in a fresh process."
+    )
+    parser.add_argument("--workspace", type=str, required=True, help="URL of an Evidently UI")
+    parser.add_argument("--project_id", type=str, default="")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--formats", type=str, default="csv,parquet,arrow")
+    parser.add_argument("--measure", nargs=3, metavar=("COMPONENT", "FORMAT", "TMP_DIR"))
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure, args.workspace, args.project_id)
+        sys.exit()
+
+    project_id = args.project_id
+    if not project_id:
+        from evidently.ui.remote import RemoteWorkspace
+
+        project_id = str(RemoteWorkspace(args.workspace).create_project("benchmark").id)
+    formats = args.formats.split(",")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for data_format in formats:
+            prepare(tmp_dir, data_format, args.rows)
+        print(f"{args.rows} rows of reference and current data, memory above the imports")
+        print(f"{'component':<17} {'format':<8} {'time':>7} {'peak RSS':>10} {'peak private':>13}")
+        for component in COMPONENTS:
+            for data_format in formats:
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        os.path.abspath(__file__),
+                        "--workspace",
+                        args.workspace,
+                        "--project_id",
+                        project_id,
+                        "--measure",
+                        component,
+                        data_format,
+                        tmp_dir,
+                    ],
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"{component:<17} {data_format:<8} {result['seconds']:>6.1f}s "
+                    f"{result['peak_rss_mib']:>6.0f} MiB {result['peak_private_mib']:>9.0f} MiB"
+                )
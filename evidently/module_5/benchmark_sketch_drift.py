@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from benchmark_fused_monitoring import Metrics
+from benchmark_monitoring_memory import DATA_DIR, artifact, memory_status
+
+COLUMNS = ["Tenure", "MonthlyCharges", "ContractType", "SupportTickets"]
+
+
+def register_model(tracking_uri: str, artifact_location: str, model_name: str):
+    import mlflow
+    from mlflow.tracking import MlflowClient
+    from sklearn.ensemble import RandomForestClassifier
+
+    mlflow.set_tracking_uri(tracking_uri)
+    df = pd.read_csv(os.path.join(DATA_DIR, "churn_data_2025_03.csv"))
+    model = RandomForestClassifier(n_estimators=5, max_depth=2, random_state=42).fit(
+        df.drop(columns=["Churn"]), df["Churn"]
+    )
+    experiment_id = mlflow.create_experiment("benchmark_sketch_drift", artifact_location)
+    with mlflow.start_run(experiment_id=experiment_id):
+        model_info = mlflow.sklearn.log_model(model, "model", registered_model_name=model_name)
+    MlflowClient().set_registered_model_alias(
+        model_name, "production-live", model_info.registered_model_version
+    )
+
+
+def prepare(tmp_dir: str, rows: int):
+    """Write enlarged reference and current data, their predictions and the reference profile."""
+    from inference_pipeline import load_data, predict, reference_profile
+
+    tracking_uri = f"sqlite:///{tmp_dir}/mlflow.db"
+    register_model(tracking_uri, os.path.join(tmp_dir, "mlruns"), "ChurnPrediction")
+    datasets = {"reference": "churn_data_2025_03.csv", "current": "churn_data_2025_05.csv"}
+    for name, dataset in datasets.items():
+        df = pd.read_csv(os.path.join(DATA_DIR, dataset))
+        enlarged_path = os.path.join(tmp_dir, f"{name}.csv")
+        pd.concat([df] * (rows // len(df)), ignore_index=True).to_csv(enlarged_path, index=False)
+        load_data.python_func(
+            dataset_uri=enlarged_path,
+            features=artifact(tmp_dir, f"{name}_features"),
+            target=artifact(tmp_dir, f"{name}_target"),
+        )
+        predict.python_func(
+            features=artifact(tmp_dir, f"{name}_features"),
+            model_name="ChurnPrediction",
+            tracking_uri=tracking_uri,
+            predictions=artifact(tmp_dir, f"{name}_predictions"),
+            metrics=Metrics(),
+            chunk_size=100_000,
+        )
+    reference_profile.python_func(
+        reference_dataset_uri=os.path.join(tmp_dir, "reference.csv"),
+        model_name="ChurnPrediction",
+        tracking_uri=tracking_uri,
+        profile_dir=os.path.join(tmp_dir, "profiles"),
+        profile=artifact(tmp_dir, "profile.json"),
+        metrics=Metrics(),
+    )
+
+
+def evidently_drift(tmp_dir: str, workspace: str, project_id: str) -> dict:
+    """The drift report of the monitoring component, on the full datasets."""
+    from datetime import datetime
+    from evidently.metrics import ColumnDriftMetric, DatasetDriftMetric
+    from evidently.report import Report
+    from evidently.ui.remote import RemoteWorkspace
+
+    data = {
+        name: pd.read_parquet(artifact(tmp_dir, f"{name}_features").path).assign(
+            prediction=pd.read_parquet(artifact(tmp_dir, f"{name}_predictions").path)[
+                "prediction"
+            ].to_numpy()
+        )
+        for name in ["reference", "current"]
+    }
+    report = Report(
+        metrics=[DatasetDriftMetric(columns=COLUMNS), ColumnDriftMetric(column_name="prediction")],
+        timestamp=datetime.now(),
+        tags=["data_drift", "prediction_drift"],
+    )
+    report.run(reference_data=data["reference"], current_data=data["current"])
+    RemoteWorkspace(workspace).add_report(project_id, report)
+    result = report.as_dict()["metrics"]
+    return {
+        "share_of_drifted_columns": result[0]["result"]["share_of_drifted_columns"],
+        "prediction_drift_score": result[1]["result"]["drift_score"],
+    }
+
+
+def sketch_drift(tmp_dir: str, workspace: str, project_id: str) -> dict:
+    from inference_pipeline import profile_drift
+
+    metrics = Metrics()
+    profile_drift.python_func(
+        profile=artifact(tmp_dir, "profile.json"),
+        current_features=artifact(tmp_dir, "current_features"),
+        current_predictions=artifact(tmp_dir, "current_predictions"),
+        workspace=workspace,
+        project_id=project_id,
+        current_profile=artifact(tmp_dir, "current_profile.json"),
+        metrics=metrics,
+    )
+    return metrics.values
+
+
+def column_scores(tmp_dir: str) -> dict:
+    """Per-column drift scores of Evidently, to compare with the ones of the sketches."""
+    from evidently.metrics import DataDriftTable
+    from evidently.report import Report
+
+    reference_df, current_df = (
+        pd.read_parquet(artifact(tmp_dir, f"{name}_features").path)
+        for name in ["reference", "current"]
+    )
+    report = Report(metrics=[DataDriftTable(columns=COLUMNS)])
+    report.run(reference_data=reference_df, current_data=current_df)
+    drift_by_columns = report.as_dict()["metrics"][0]["result"]["drift_by_columns"]
+    return {name: drift_by_columns[name]["drift_score"] for name in COLUMNS}
+
+
+def measure(method: str, tmp_dir: str, workspace: str, project_id: str):
+    """Run `method` in this process and print its time, peak memory and results as JSON."""
+    # Imported by both methods, but not part of what is measured.
+    import evidently.metrics
+    import evidently.report
+    import evidently.ui.remote
+    import inference_pipeline
+    import pyarrow.parquet
+    import scipy.stats
+
+    peak = {"RssAnon": 0.0}
+
+    def sample():
+        while True:
+            peak["RssAnon"] = max(peak["RssAnon"], memory_status()["RssAnon"])
+            time.sleep(0.005)
+
+    before = memory_status()
+    threading.Thread(target=sample, daemon=True).start()
+    start = time.perf_counter()
+    if method == "evidently":
+        result = evidently_drift(tmp_dir, workspace, project_id)
+    else:
+        result = sketch_drift(tmp_dir, workspace, project_id)
+    result["seconds"] = time.perf_counter() - start
+    result["peak_private_mib"] = max(peak["RssAnon"], memory_status()["RssAnon"]) - before["RssAnon"]
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the drift of the current data against the reference computed by "
+        "Evidently on the full datasets and by profile_drift on sketches, each in a fresh process."
+    )
+    parser.add_argument("--workspace", type=str, required=True, help="URL of an Evidently UI")
+    parser.add_argument("--project_id", type=str, default="")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--measure", nargs=2, metavar=("METHOD", "TMP_DIR"))
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure, args.workspace, args.project_id)
+        sys.exit()
+
+    project_id = args.project_id
+    if not project_id:
+        from evidently.ui.remote import RemoteWorkspace
+
+        project_id = str(RemoteWorkspace(args.workspace).create_project("benchmark").id)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prepare(tmp_dir, args.rows)
+        print(f"{args.rows} rows of reference and current data, memory above the imports")
+        print(f"{'method':<10} {'time':>7} {'peak private':>13} {'drift share':>12} {'prediction drift':>17}")
+        results = {}
+        for method in ["evidently", "sketch"]:
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "--workspace",
+                    args.workspace,
+                    "--project_id",
+                    project_id,
+                    "--measure",
+                    method,
+                    tmp_dir,
+                ],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            result = results[method] = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{method:<10} {result['seconds']:>6.1f}s {result['peak_private_mib']:>9.0f} MiB "
+                f"{result['share_of_drifted_columns']:>12.2f} {result['prediction_drift_score']:>17.4f}"
+            )
+
+        print(f"{'column':<15} {'Evidently':>10} {'sketch':>10}")
+        for name, score in column_scores(tmp_dir).items():
+            print(f"{name:<15} {score:>10.4f} {results['sketch'][f'drift_score_{name}']:>10.4f}")
@@ -0,0 +1,154 @@
+import argparse
+import json
+import statistics
+import threading
+import time
+import warnings
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from benchmark_monitoring_memory import DATA_DIR
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """The endpoints of the Evidently UI used by the components, behind a simulated network.
+
+    Each new connection waits `connect_seconds`, like a TCP and TLS
+    handshake, each request `rtt_seconds`, and request bodies are received
+    at `bytes_per_second`.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Like uvicorn, so that small responses on kept-alive connections are not delayed.
+    disable_nagle_algorithm = True
+    connect_seconds = 0.0
+    rtt_seconds = 0.0
+    bytes_per_second = float("inf")
+    project = b""
+    stats = Counter()
+
+    def setup(self):
+        super().setup()
+        self.stats["connections"] += 1
+        time.sleep(self.connect_seconds)
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, body: bytes):
+        time.sleep(self.rtt_seconds)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.stats["requests"] += 1
+        if self.path == "/api/version":
+            from evidently.ui.api.service import EVIDENTLY_APPLICATION_NAME
+
+            self.reply(json.dumps({"application": EVIDENTLY_APPLICATION_NAME}).encode())
+        else:
+            self.reply(self.project)
+
+    def do_POST(self):
+        self.stats["requests"] += 1
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.stats["bytes"] += len(body)
+        time.sleep(len(body) / self.bytes_per_second)
+        json.loads(body)
+        self.reply(b"null")
+
+
+def monitoring_snapshots() -> list:
+    """The test suites and report uploaded by the monitoring component, on the course data."""
+    from evidently.metric_preset import DataDriftPreset
+    from evidently.report import Report
+    from evidently.test_preset import DataDriftTestPreset, DataStabilityTestPreset
+    from evidently.test_suite import TestSuite
+
+    reference = pd.read_csv(f"{DATA_DIR}/churn_data_2025_03.csv")
+    current = pd.read_csv(f"{DATA_DIR}/churn_data_2025_05.csv")
+    suites = [
+        TestSuite(tests=[DataStabilityTestPreset()], tags=["data_quality_test_suite"]),
+        TestSuite(tests=[DataDriftTestPreset()], tags=["data_drift_test_suite"]),
+        Report(metrics=[DataDriftPreset()], tags=["data_drift"]),
+    ]
+    for suite in suites:
+        suite.run(reference_data=reference, current_data=current)
+    return suites
+
+
+def upload_remote(url: str, project_id: str, suites: list):
+    """What the components did: one RemoteWorkspace, a project lookup, one request per snapshot."""
+    from evidently.report import Report
+    from evidently.ui.remote import RemoteWorkspace
+
+    ws = RemoteWorkspace(url)
+    project = ws.get_project(project_id)
+    for suite in suites:
+        if isinstance(suite, Report):
+            ws.add_report(project.id, suite)
+        else:
+            ws.add_test_suite(project.id, suite)
+
+
+def upload_pooled(url: str, project_id: str, suites: list, **kwargs):
+    from workspace_client import PooledWorkspace
+
+    ws = PooledWorkspace(url, **kwargs)
+    ws.get_project(project_id)
+    ws.add_snapshots(project_id, suites)
+    ws.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time the upload of the monitoring snapshots to a local stand-in of the "
+        "Evidently UI, with RemoteWorkspace and with PooledWorkspace."
+    )
+    parser.add_argument("--connect_ms", type=float, default=30.0)
+    parser.add_argument("--rtt_ms", type=float, default=20.0)
+    parser.add_argument("--mbps", type=float, default=50.0)
+    parser.add_argument("--trials", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    from evidently.ui.base import Project
+
+    project = Project(name="benchmark")
+    StandInHandler.project = project.json().encode()
+    StandInHandler.connect_seconds = args.connect_ms / 1000
+    StandInHandler.rtt_seconds = args.rtt_ms / 1000
+    StandInHandler.bytes_per_second = args.mbps * 1e6 / 8
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    suites = monitoring_snapshots()
+    methods = {
+        "RemoteWorkspace": lambda: upload_remote(url, str(project.id), suites),
+        "pooled, sequential": lambda: upload_pooled(url, str(project.id), suites, pool_size=1),
+        "pooled, batched": lambda: upload_pooled(url, str(project.id), suites),
+    }
+    print(
+        f"{len(suites)} snapshots, connection setup {args.connect_ms}ms, "
+        f"round trip {args.rtt_ms}ms, {args.mbps} Mbit/s, median of {args.trials} trials"
+    )
+    print(f"{'client':<22} {'time':>8} {'connections':>12} {'requests':>9} {'sent':>10}")
+    for label, method in methods.items():
+        times = []
+        for _ in range(args.trials):
+            StandInHandler.stats.clear()
+            start = time.perf_counter()
+            method()
+            times.append(time.perf_counter() - start)
+        stats = StandInHandler.stats
+        print(
+            f"{label:<22} {statistics.median(times) * 1000:>6.0f}ms {stats['connections']:>12} "
+            f"{stats['requests']:>9} {stats['bytes'] / 1024:>6.0f} KiB"
+        )
+    server.shutdown()
@@ -0,0 +1,262 @@
+import argparse
+import json
+import threading
+from collections import defaultdict
+
+import uuid6
+from fsspec.implementations.local import LocalFileSystem
+from evidently.ui.app import get_config, run
+from evidently.ui.components.storage import LocalStorageComponent
+from evidently.ui.dashboards.test_suites import TestFilter, to_period
+from evidently.ui.managers.projects import ProjectManager
+from evidently.ui.storage.common import NoopAuthManager
+from evidently.ui.storage.local.base import (
+    FSSpecBlobStorage,
+    InMemoryDataStorage,
+    JsonFileProjectMetadataStorage,
+    LocalState,
+)
+from evidently.ui.storage.local.watcher import WorkspaceDirHandler
+from evidently.ui.type_aliases import PointInfo
+
+
+class _Series:
+    """The values of one panel query, by snapshot, in the order of the workspace."""
+
+    def __init__(self, filter, extract):
+        self.filter = filter
+        self.extract = extract
+        self.points = {}
+
+    def update(self, snapshot_id, snapshot, suites: dict):
+        point = None
+        if snapshot is not None and _matches(self.filter, snapshot):
+            point = self.extract(snapshot, suites)
+        if point:
+            self.points[snapshot_id] = point
+        else:
+            self.points.pop(snapshot_id, None)
+
+
+def _matches(filter, snapshot) -> bool:
+    # ReportFilter.filter, on the snapshot itself: tags and metadata are
+    # checked before the report or the test suite is rebuilt.
+    return all(snapshot.metadata.get(k) == v for k, v in filter.metadata_values.items()) and all(
+        tag in snapshot.tags for tag in filter.tag_values
+    )
+
+
+def _as(suites: dict, snapshot, kind: str):
+    # Rebuild the report or the test suite of a snapshot once for all the series.
+    if kind not in suites:
+        suites[kind] = snapshot.as_report() if kind == "report" else snapshot.as_test_suite()
+    return suites[kind]
+
+
+class IndexedDataStorage(InMemoryDataStorage):
+    """`InMemoryDataStorage` with the values of the dashboard panels kept up to date.
+
+    Evidently rebuilds every snapshot of the project and filters it on
+    each panel load. Here each panel query, keyed by its filter (tags,
+    metadata) and its values (metric_id, field_path, metric_args) or
+    tests, is computed once over the workspace, the first time it is
+    loaded, and then only updated for the snapshots added, reloaded or
+    deleted. A panel load only reads the points of its series.
+    """
+
+    def __init__(self, path: str, local_state: LocalState = None):
+        super().__init__(path, local_state)
+        # project id -> series key -> _Series
+        self._series = defaultdict(dict)
+        # Snapshots are also reloaded by the workspace watcher, in its own thread.
+        self._lock = threading.RLock()
+
+    def _get_series(self, project_id, key, filter, extract) -> _Series:
+        with self._lock:
+            series = self._series[project_id].get(key)
+            if series is None:
+                series = _Series(filter, extract)
+                for snapshot_id, snapshot in self.state.snapshot_data.get(project_id, {}).items():
+                    series.update(snapshot_id, snapshot, {})
+                self._series[project_id][key] = series
+            return series
+
+    def update(self, project_id, snapshot_id):
+        """Update the series of the project for the snapshot, as it is now in the workspace."""
+        with self._lock:
+            if not self._series.get(project_id):
+                return
+            snapshot = self.state.snapshot_data.get(project_id, {}).get(snapshot_id)
+            suites = {}
+            for series in self._series[project_id].values():
+                series.update(snapshot_id, snapshot, suites)
+
+    def forget(self, project_id=None):
+        """Drop the series of the project, or of all projects: they are computed again when loaded."""
+        with self._lock:
+            if project_id is None:
+                self._series.clear()
+            else:
+                self._series.pop(project_id, None)
+
+    async def extract_points(self, project_id, snapshot):
+        self.update(project_id, snapshot.id)
+
+    async def load_points_as_type(
+        self, cls, project_id, filter, values, timestamp_start, timestamp_end
+    ):
+        points = [{} for _ in range(len(values))]
+        for i, value in enumerate(values):
+
+            def extract(snapshot, suites, value=value):
+                if not snapshot.is_report:
+                    return None
+                report = _as(suites, snapshot, "report")
+                if not filter.filter(report):
+                    return None
+                return report.timestamp, value.get(report)
+
+            key = ("values", filter.json(), value.json(exclude={"legend"}))
+            with self._lock:
+                series = self._get_series(project_id, key, filter, extract)
+                for snapshot_id, (timestamp, metric_values) in series.points.items():
+                    if (timestamp_start is not None and timestamp < timestamp_start) or (
+                        timestamp_end is not None and timestamp > timestamp_end
+                    ):
+                        continue
+                    for metric, metric_field_value in metric_values.items():
+                        points[i].setdefault(metric, []).append(
+                            PointInfo(timestamp, snapshot_id, self.parse_value(cls, metric_field_value))
+                        )
+        return points
+
+    async def load_test_results(
+        self, project_id, filter, test_filters, time_agg, timestamp_start, timestamp_end
+    ):
+        def extract(snapshot, suites):
+            if snapshot.is_report and not snapshot.is_new_report:
+                return None
+            suite = _as(suites, snapshot, "test_suite")
+            if not filter.filter(suite):
+                return None
+            results = {}
+            for test_filter in test_filters or [TestFilter()]:
+                results.update(test_filter.get(suite))
+            return suite.timestamp, results
+
+        key = ("tests", filter.json(), json.dumps([f.json() for f in test_filters]))
+        points = defaultdict(dict)
+        with self._lock:
+            series = self._get_series(project_id, key, filter, extract)
+            for timestamp, results in series.points.values():
+                if (timestamp_start is not None and timestamp < timestamp_start) or (
+                    timestamp_end is not None and timestamp > timestamp_end
+                ):
+                    continue
+                points[to_period(time_agg, timestamp)].update(results)
+        return points
+
+
+class IndexedLocalState(LocalState):
+    """`LocalState` telling the data storage about every snapshot it loads."""
+
+    data_storage: IndexedDataStorage = None
+
+    def reload(self, force: bool = False):
+        if self.data_storage is not None:
+            self.data_storage.forget()
+        super().reload(force)
+
+    def reload_snapshots(self, project_id, force: bool = False, skip_errors: bool = True):
+        if force and self.data_storage is not None:
+            self.data_storage.forget(project_id)
+        super().reload_snapshots(project_id, force, skip_errors)
+
+    def reload_snapshot(self, project, snapshot_id, skip_errors: bool = True):
+        super().reload_snapshot(project, snapshot_id, skip_errors)
+        if self.data_storage is not None:
+            self.data_storage.update(project.id, snapshot_id)
+
+
+class IndexedMetadataStorage(JsonFileProjectMetadataStorage):
+    """`JsonFileProjectMetadataStorage` telling the data storage about deletions."""
+
+    async def delete_project(self, project_id):
+        await super().delete_project(project_id)
+        self.state.data_storage.forget(project_id)
+
+    async def delete_snapshot(self, project_id, snapshot_id):
+        await super().delete_snapshot(project_id, snapshot_id)
+        self.state.data_storage.update(project_id, snapshot_id)
+
+
+class IndexedDirHandler(WorkspaceDirHandler):
+    """The workspace watcher, for snapshot files deleted outside of the UI.
+
+    Files still being written when their event comes are skipped, instead
+    of stopping the watcher thread: they are reloaded on their next
+    modified event.
+    """
+
+    def on_project_event(self, event):
+        try:
+            super().on_project_event(event)
+        except ValueError:
+            return
+        project_id = self.parse_project_id(event.src_path)
+        if project_id is not None:
+            self.state.data_storage.forget(uuid6.UUID(project_id))
+
+    def on_snapshot_event(self, event):
+        try:
+            super().on_snapshot_event(event)
+        except ValueError:
+            return
+        project_id, snapshot_id = self.parse_project_and_snapshot_id(event.src_path)
+        if project_id is not None and snapshot_id is not None:
+            self.state.data_storage.update(uuid6.UUID(project_id), uuid6.UUID(snapshot_id))
+
+
+def create_indexed_project_manager(path: str, autorefresh: bool, auth=None) -> ProjectManager:
+    """`create_local_project_manager` of Evidently, with `IndexedDataStorage`."""
+    state = IndexedLocalState(path, None)
+    state.location.makedirs("")
+    state.reload()
+    data = IndexedDataStorage(path=path, local_state=state)
+    state.data_storage = data
+    project_manager = ProjectManager(
+        project_metadata=IndexedMetadataStorage(path=path, local_state=state),
+        blob_storage=FSSpecBlobStorage(base_path=path),
+        data_storage=data,
+        auth_manager=auth or NoopAuthManager(),
+    )
+    state.project_manager = project_manager
+    if autorefresh and isinstance(state.location.fs, LocalFileSystem):
+        from watchdog.observers import Observer
+
+        observer = Observer()
+        observer.schedule(IndexedDirHandler(state), path, recursive=True)
+        observer.start()
+    return project_manager
+
+
+class IndexedStorageComponent(LocalStorageComponent):
+    def dependency_factory(self):
+        return lambda: create_indexed_project_manager(
+            self.path, autorefresh=self.autorefresh, auth=NoopAuthManager()
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Start the Evidently UI, like `evidently ui`, with the dashboard panels indexed."
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workspace", type=str, default="workspace")
+    parser.add_argument("--secret", type=str, default=None)
+    args = parser.parse_args()
+
+    config = get_config(host=args.host, port=args.port, workspace=args.workspace, secret=args.secret)
+    config.storage = IndexedStorageComponent(path=args.workspace)
+    run(config)
@@ -1,5 +1,3 @@
-import google.cloud.aiplatform as aip
-
 from kfp import dsl, compiler
 
 
@@ -9,92 +7,539 @@ from kfp import dsl, compiler
         "fsspec",
         "gcsfs",
         "pandas",
+        "pyarrow",
         "scikit-learn",
     ],
 )
 def load_data(
-    dataset_uri: str, features: dsl.Output[dsl.Dataset], target: dsl.Output[dsl.Dataset]
+    dataset_uri: str,
+    features: dsl.Output[dsl.Dataset],
+    target: dsl.Output[dsl.Dataset],
+    data_format: str = "parquet",
 ):
     import pandas as pd
 
+    # BEGIN INLINED kfp/module_6/dataset_io.py: write_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def write_dataset(df, dataset, data_format: str):
+        """Write `df` to the `dataset` artifact as "parquet", "arrow" or "csv".
+
+        The format is recorded in the `format` metadata of the artifact.
+        """
+        # Arrow IPC is written uncompressed and as a single record batch, so
+        # that readers can memory-map its columns without copying them.
+        dataset.metadata["format"] = data_format
+        if data_format == "parquet":
+            df.to_parquet(dataset.path, index=False)
+        elif data_format == "arrow":
+            df.reset_index(drop=True).to_feather(
+                dataset.path, compression="uncompressed", chunksize=max(len(df), 1)
+            )
+        elif data_format == "csv":
+            df.to_csv(dataset.path, index=False)
+        else:
+            raise ValueError(f"Unknown data format {data_format!r}")
+    # END INLINED
+
     df = pd.read_csv(dataset_uri)
     features_df = df.drop(columns=["Churn"])
     target_df = df[["Churn"]]
-    features_df.to_csv(features.path, index=False)
-    target_df.to_csv(target.path, index=False)
+    write_dataset(features_df, features, data_format)
+    write_dataset(target_df, target, data_format)
 
 
 @dsl.component(
-    base_image="python:3.11", packages_to_install=["pandas", "scikit-learn", "mlflow"]
+    base_image="python:3.11",
+    packages_to_install=["pandas", "pyarrow", "scikit-learn", "mlflow"],
 )
 def predict(
     features: dsl.Input[dsl.Dataset],
     model_name: str,
     tracking_uri: str,
     predictions: dsl.Output[dsl.Dataset],
+    metrics: dsl.Output[dsl.Metrics],
+    chunk_size: int = 0,
+    workers: int = 1,
+    data_format: str = "parquet",
 ):
+    import itertools
+    import resource
+    import time
+    import numpy as np
     import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
     import mlflow
 
     mlflow.set_tracking_uri(tracking_uri)
 
     production_model = mlflow.pyfunc.load_model(f"models:/{model_name}@production-live")
 
-    features_df = pd.read_csv(features.path)
-    pred = production_model.predict(features_df)
-    predictions_df = pd.DataFrame(pred, columns=["prediction"])
-    predictions_df.to_csv(predictions.path, index=False)
+    if data_format not in ("parquet", "arrow", "csv"):
+        raise ValueError(f"Unknown data format {data_format!r}")
+    with open(features.path, "rb") as f:
+        magic = f.read(6)
+    input_format = "parquet" if magic[:4] == b"PAR1" else "arrow" if magic == b"ARROW1" else "csv"
+    if workers > 1:
+        chunk_size = chunk_size or 100_000
+
+    def read_chunks(raw_csv=False):
+        # Yield the features by chunks of at most chunk_size rows, or all at once.
+        if input_format == "parquet":
+            if not chunk_size:
+                yield pd.read_parquet(features.path)
+                return
+            for batch in pq.ParquetFile(features.path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif input_format == "arrow":
+            # Memory-mapped, only the chunk being converted is read from disk.
+            table = pa.ipc.open_file(pa.memory_map(features.path)).read_all()
+            if not chunk_size:
+                yield table.to_pandas(split_blocks=True)
+                return
+            for batch in table.to_batches(max_chunksize=chunk_size):
+                yield batch.to_pandas()
+        elif raw_csv:
+            # Leave parsing to the workers. The features have no quoted
+            # fields, so a line is a row.
+            with open(features.path) as f:
+                header = f.readline()
+                while lines := list(itertools.islice(f, chunk_size)):
+                    yield header + "".join(lines)
+        elif chunk_size:
+            yield from pd.read_csv(features.path, chunksize=chunk_size)
+        else:
+            yield pd.read_csv(features.path)
+
+    predictions.metadata["format"] = data_format
+    writer = None
+
+    def write_predictions(pred):
+        # Append one chunk of predictions to the output artifact.
+        nonlocal writer
+        predictions_df = pd.DataFrame(pred, columns=["prediction"])
+        if data_format == "csv":
+            if writer is None:
+                writer = open(predictions.path, "w", newline="")
+                predictions_df.to_csv(writer, index=False)
+            else:
+                predictions_df.to_csv(writer, header=False, index=False)
+            return
+        table = pa.Table.from_pandas(predictions_df, preserve_index=False)
+        if writer is None:
+            if data_format == "parquet":
+                writer = pq.ParquetWriter(predictions.path, table.schema)
+            else:
+                writer = pa.ipc.new_file(predictions.path, table.schema)
+        writer.write_table(table)
+
+    start = time.perf_counter()
+    n_rows = 0
+    if workers > 1:
+        # Forked workers share the model loaded above and score the chunks,
+        # CSV ones are sent as raw text and parsed by the workers too.
+        import io
+        import multiprocessing
+        import queue
+
+        context = multiprocessing.get_context("fork")
+        tasks, results = context.Queue(), context.Queue()
+
+        def score_chunks():
+            while (task := tasks.get()) is not None:
+                i, chunk = task
+                try:
+                    if isinstance(chunk, str):
+                        chunk = pd.read_csv(io.StringIO(chunk))
+                    results.put((i, np.asarray(production_model.predict(chunk)), None))
+                except Exception as e:
+                    results.put((i, None, repr(e)))
+
+        def next_result(processes):
+            while True:
+                try:
+                    return results.get(timeout=1)
+                except queue.Empty:
+                    if not all(p.is_alive() for p in processes):
+                        raise RuntimeError("A scoring worker exited unexpectedly")
+
+        processes = [context.Process(target=score_chunks, daemon=True) for _ in range(workers)]
+        for p in processes:
+            p.start()
+        # Chunks are written in input order. At most two chunks per worker
+        # are in flight, which bounds the memory held by queues and by the
+        # results waiting for an earlier chunk.
+        chunks = read_chunks(raw_csv=True)
+        done, n_sent, n_written = {}, 0, 0
+        chunk = next(chunks, None)
+        while chunk is not None or n_written < n_sent:
+            if chunk is not None and n_sent - n_written < 2 * workers:
+                tasks.put((n_sent, chunk))
+                n_sent += 1
+                chunk = next(chunks, None)
+                continue
+            i, pred, error = next_result(processes)
+            if error is not None:
+                raise RuntimeError(f"Scoring chunk {i} failed: {error}")
+            done[i] = pred
+            while n_written in done:
+                pred = done.pop(n_written)
+                write_predictions(pred)
+                n_rows += len(pred)
+                n_written += 1
+        for p in processes:
+            tasks.put(None)
+        for p in processes:
+            p.join()
+    else:
+        for features_df in read_chunks():
+            write_predictions(production_model.predict(features_df))
+            n_rows += len(features_df)
+    if writer is None:
+        write_predictions([])
+    writer.close()
+    seconds = time.perf_counter() - start
+
+    metrics.log_metric("rows", n_rows)
+    metrics.log_metric("chunk_size", chunk_size)
+    metrics.log_metric("workers", workers)
+    metrics.log_metric("scoring_seconds", round(seconds, 3))
+    metrics.log_metric("rows_per_second", round(n_rows / seconds, 1) if seconds else 0.0)
+    # ru_maxrss is in KiB on Linux.
+    metrics.log_metric(
+        "peak_rss_mib", round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    )
+    if workers > 1:
+        metrics.log_metric(
+            "worker_peak_rss_mib",
+            round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        )
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "evidently==0.6.6"]
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
 )
 def data_quality(
     reference_features: dsl.Input[dsl.Dataset],
     current_features: dsl.Input[dsl.Dataset],
     report: dsl.Output[dsl.HTML],
+    snapshot_detail: dsl.Output[dsl.Artifact],
     workspace: str,
     project_id: str,
+    compact: bool = False,
 ):
     import pandas as pd
+    import pyarrow as pa
     from datetime import datetime
     from evidently.test_suite import TestSuite
-    from evidently.ui.remote import RemoteWorkspace
     from evidently.test_preset import DataStabilityTestPreset
 
-    ws = RemoteWorkspace(workspace)
-    project = ws.get_project(project_id)
+    # BEGIN INLINED evidently/module_5/workspace_client.py: open_session upload_snapshots prepare_snapshots
+    # Generated by sync_inlined.py, edit the file above instead.
+    import json
+    import requests
+    import urllib.parse
+    from concurrent.futures import ThreadPoolExecutor
+    from evidently.core import BaseResult, IncludeTags, get_all_fields_tags
+    from evidently.suite.base_suite import Snapshot
+    from evidently.utils import NumpyEncoder
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    def open_session(pool_size: int = 4, retries: int = 3) -> requests.Session:
+        """Return a session keeping up to `pool_size` connections alive and retrying failed requests.
+
+        Only the requests that the server did not process are retried, `retries`
+        times with exponential backoff: those whose connection could not be
+        opened, and those answered with a 429, 502 or 503 status. A request
+        that failed after being sent, or that timed out, is not retried, since
+        an upload may then have been stored already.
+        """
+        retry = Retry(
+            total=retries,
+            read=False,
+            other=0,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503],
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def upload_snapshots(session, workspace: str, project_id, snapshots: list):
+        """Upload `snapshots` concurrently, each with the request of `RemoteWorkspace.add_snapshot`."""
+        url = urllib.parse.urljoin(workspace, f"/api/projects/{project_id}/snapshots")
 
-    reference_df = pd.read_csv(reference_features.path)
-    current_df = pd.read_csv(current_features.path)
+        def upload(snapshot):
+            body = json.dumps(snapshot.dict(), allow_nan=True, cls=NumpyEncoder).encode("utf8")
+            response = session.post(
+                url, data=body, headers={"Content-Type": "application/json"}, timeout=60
+            )
+            response.raise_for_status()
+
+        if not snapshots:
+            return
+        with ThreadPoolExecutor(len(snapshots)) as executor:
+            list(executor.map(upload, snapshots))
+
+    def _strip_result(result):
+        # Optional fields only used to render the report (plots, distributions,
+        # examples) are reset to their default, at every level of the result.
+        update = {}
+        tags = get_all_fields_tags(type(result))
+        for name, field in result.__fields__.items():
+            value = getattr(result, name)
+            if tags.get(name, set()) & {IncludeTags.Render, IncludeTags.Extra} and not field.required:
+                update[name] = field.default
+            elif isinstance(value, BaseResult):
+                update[name] = _strip_result(value)
+            elif isinstance(value, dict):
+                update[name] = {
+                    k: _strip_result(v) if isinstance(v, BaseResult) else v for k, v in value.items()
+                }
+            elif isinstance(value, list):
+                update[name] = [_strip_result(v) if isinstance(v, BaseResult) else v for v in value]
+        return result.copy(update=update)
+
+    def compact_snapshot(snapshot: Snapshot, detail: str = None) -> Snapshot:
+        """Return `snapshot` with only what the dashboard panels read.
+
+        A report keeps its first level metrics, without the metrics they were
+        computed from, and a test suite its test results, without any metric.
+        In the results kept, the fields only used to render the report are
+        dropped. `detail` is the URI of the full snapshot, see `add_detail`.
+        """
+        suite = snapshot.suite
+        metadata = {**snapshot.metadata, "snapshot": "compact"}
+        if detail:
+            metadata["detail"] = detail
+        return snapshot.copy(
+            update={
+                "metadata": metadata,
+                "suite": suite.copy(
+                    update={
+                        "metrics": [suite.metrics[i] for i in snapshot.metrics_ids],
+                        "metric_results": [
+                            _strip_result(suite.metric_results[i]) for i in snapshot.metrics_ids
+                        ],
+                        "test_results": [_strip_result(r) for r in suite.test_results],
+                    }
+                ),
+                "metrics_ids": list(range(len(snapshot.metrics_ids))),
+            }
+        )
+
+    def prepare_snapshots(suites: list, detail, compact: bool = False) -> list:
+        """Return the snapshots of `suites` (reports, test suites or snapshots) to upload.
+
+        `detail` is the `snapshot_detail` output artifact of a component: a JSON
+        file mapping snapshot ids to full snapshots. With `compact`, the
+        snapshots returned are compact, and the full ones are saved in `detail`
+        to restore them, see `add_detail`. Otherwise the full snapshots are
+        uploaded as they are and `detail` is an empty mapping.
+        """
+        full = [s if isinstance(s, Snapshot) else s.to_snapshot() for s in suites]
+        with open(detail.path, "w") as f:
+            if not compact:
+                f.write("{}")
+                return full
+            json.dump({str(s.id): s.dict() for s in full}, f, allow_nan=True, cls=NumpyEncoder)
+        return [compact_snapshot(s, detail.uri) for s in full]
+    # END INLINED
+
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    reference_df = read_dataset(reference_features)
+    current_df = read_dataset(current_features)
     test_suite = TestSuite(tests=[DataStabilityTestPreset()], timestamp=datetime.now(), tags=["data_quality_test_suite"])
     test_suite.run(reference_data=reference_df, current_data=current_df)
-    ws.add_test_suite(project.id, test_suite)
+    snapshots = prepare_snapshots([test_suite], snapshot_detail, compact)
+    upload_snapshots(open_session(), workspace, project_id, snapshots)
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "evidently==0.6.6"]
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
 )
 def data_drift(
     reference_features: dsl.Input[dsl.Dataset],
     current_features: dsl.Input[dsl.Dataset],
     report: dsl.Output[dsl.HTML],
+    snapshot_detail: dsl.Output[dsl.Artifact],
     workspace: str,
     project_id: str,
+    compact: bool = False,
+    drift_report: bool = True,
 ):
+    """DataDriftTestPreset test suite and DatasetDriftMetric report.
+
+    Without `drift_report`, only the test suite is run and uploaded, for
+    the runs whose drift report is uploaded by profile_drift.
+    """
     import pandas as pd
+    import pyarrow as pa
     from datetime import datetime
     from evidently.report import Report
     from evidently.test_suite import TestSuite
-    from evidently.ui.remote import RemoteWorkspace
     from evidently.metrics import DatasetDriftMetric
     from evidently.test_preset import DataDriftTestPreset
-    
-    ws = RemoteWorkspace(workspace)
-    project = ws.get_project(project_id)
 
-    reference_df = pd.read_csv(reference_features.path)
-    current_df = pd.read_csv(current_features.path)
+    # BEGIN INLINED evidently/module_5/workspace_client.py: open_session upload_snapshots prepare_snapshots
+    # Generated by sync_inlined.py, edit the file above instead.
+    import json
+    import requests
+    import urllib.parse
+    from concurrent.futures import ThreadPoolExecutor
+    from evidently.core import BaseResult, IncludeTags, get_all_fields_tags
+    from evidently.suite.base_suite import Snapshot
+    from evidently.utils import NumpyEncoder
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    def open_session(pool_size: int = 4, retries: int = 3) -> requests.Session:
+        """Return a session keeping up to `pool_size` connections alive and retrying failed requests.
+
+        Only the requests that the server did not process are retried, `retries`
+        times with exponential backoff: those whose connection could not be
+        opened, and those answered with a 429, 502 or 503 status. A request
+        that failed after being sent, or that timed out, is not retried, since
+        an upload may then have been stored already.
+        """
+        retry = Retry(
+            total=retries,
+            read=False,
+            other=0,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503],
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def upload_snapshots(session, workspace: str, project_id, snapshots: list):
+        """Upload `snapshots` concurrently, each with the request of `RemoteWorkspace.add_snapshot`."""
+        url = urllib.parse.urljoin(workspace, f"/api/projects/{project_id}/snapshots")
+
+        def upload(snapshot):
+            body = json.dumps(snapshot.dict(), allow_nan=True, cls=NumpyEncoder).encode("utf8")
+            response = session.post(
+                url, data=body, headers={"Content-Type": "application/json"}, timeout=60
+            )
+            response.raise_for_status()
+
+        if not snapshots:
+            return
+        with ThreadPoolExecutor(len(snapshots)) as executor:
+            list(executor.map(upload, snapshots))
+
+    def _strip_result(result):
+        # Optional fields only used to render the report (plots, distributions,
+        # examples) are reset to their default, at every level of the result.
+        update = {}
+        tags = get_all_fields_tags(type(result))
+        for name, field in result.__fields__.items():
+            value = getattr(result, name)
+            if tags.get(name, set()) & {IncludeTags.Render, IncludeTags.Extra} and not field.required:
+                update[name] = field.default
+            elif isinstance(value, BaseResult):
+                update[name] = _strip_result(value)
+            elif isinstance(value, dict):
+                update[name] = {
+                    k: _strip_result(v) if isinstance(v, BaseResult) else v for k, v in value.items()
+                }
+            elif isinstance(value, list):
+                update[name] = [_strip_result(v) if isinstance(v, BaseResult) else v for v in value]
+        return result.copy(update=update)
+
+    def compact_snapshot(snapshot: Snapshot, detail: str = None) -> Snapshot:
+        """Return `snapshot` with only what the dashboard panels read.
+
+        A report keeps its first level metrics, without the metrics they were
+        computed from, and a test suite its test results, without any metric.
+        In the results kept, the fields only used to render the report are
+        dropped. `detail` is the URI of the full snapshot, see `add_detail`.
+        """
+        suite = snapshot.suite
+        metadata = {**snapshot.metadata, "snapshot": "compact"}
+        if detail:
+            metadata["detail"] = detail
+        return snapshot.copy(
+            update={
+                "metadata": metadata,
+                "suite": suite.copy(
+                    update={
+                        "metrics": [suite.metrics[i] for i in snapshot.metrics_ids],
+                        "metric_results": [
+                            _strip_result(suite.metric_results[i]) for i in snapshot.metrics_ids
+                        ],
+                        "test_results": [_strip_result(r) for r in suite.test_results],
+                    }
+                ),
+                "metrics_ids": list(range(len(snapshot.metrics_ids))),
+            }
+        )
+
+    def prepare_snapshots(suites: list, detail, compact: bool = False) -> list:
+        """Return the snapshots of `suites` (reports, test suites or snapshots) to upload.
+
+        `detail` is the `snapshot_detail` output artifact of a component: a JSON
+        file mapping snapshot ids to full snapshots. With `compact`, the
+        snapshots returned are compact, and the full ones are saved in `detail`
+        to restore them, see `add_detail`. Otherwise the full snapshots are
+        uploaded as they are and `detail` is an empty mapping.
+        """
+        full = [s if isinstance(s, Snapshot) else s.to_snapshot() for s in suites]
+        with open(detail.path, "w") as f:
+            if not compact:
+                f.write("{}")
+                return full
+            json.dump({str(s.id): s.dict() for s in full}, f, allow_nan=True, cls=NumpyEncoder)
+        return [compact_snapshot(s, detail.uri) for s in full]
+    # END INLINED
+
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    reference_df = read_dataset(reference_features)
+    current_df = read_dataset(current_features)
     test_suite = TestSuite(tests=[DataDriftTestPreset()], timestamp=datetime.now(), tags=["data_drift_test_suite"])
     report = Report(
         metrics=[
@@ -104,54 +549,1652 @@ def data_drift(
     )
     
     test_suite.run(reference_data=reference_df, current_data=current_df)
-    report.run(reference_data=reference_df, current_data=current_df)
-    ws.add_test_suite(project.id, test_suite)
-    ws.add_report(project.id, report)
+    suites = [test_suite]
+    if drift_report:
+        report.run(reference_data=reference_df, current_data=current_df)
+        suites.append(report)
+    snapshots = prepare_snapshots(suites, snapshot_detail, compact)
+    upload_snapshots(open_session(), workspace, project_id, snapshots)
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "evidently==0.6.6"]
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
 )
 def prediction_drift(
     reference_target: dsl.Input[dsl.Dataset],
     current_target: dsl.Input[dsl.Dataset],
     drift_report: dsl.Output[dsl.HTML],
+    snapshot_detail: dsl.Output[dsl.Artifact],
     workspace: str,
     project_id: str,
+    compact: bool = False,
 ):
     import pandas as pd
+    import pyarrow as pa
     from datetime import datetime
     from evidently.report import Report
     from evidently.metrics import ColumnDriftMetric
-    from evidently.ui.remote import RemoteWorkspace
 
-    ws = RemoteWorkspace(workspace)
-    project = ws.get_project(project_id)
+    # BEGIN INLINED evidently/module_5/workspace_client.py: open_session upload_snapshots prepare_snapshots
+    # Generated by sync_inlined.py, edit the file above instead.
+    import json
+    import requests
+    import urllib.parse
+    from concurrent.futures import ThreadPoolExecutor
+    from evidently.core import BaseResult, IncludeTags, get_all_fields_tags
+    from evidently.suite.base_suite import Snapshot
+    from evidently.utils import NumpyEncoder
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    def open_session(pool_size: int = 4, retries: int = 3) -> requests.Session:
+        """Return a session keeping up to `pool_size` connections alive and retrying failed requests.
+
+        Only the requests that the server did not process are retried, `retries`
+        times with exponential backoff: those whose connection could not be
+        opened, and those answered with a 429, 502 or 503 status. A request
+        that failed after being sent, or that timed out, is not retried, since
+        an upload may then have been stored already.
+        """
+        retry = Retry(
+            total=retries,
+            read=False,
+            other=0,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503],
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def upload_snapshots(session, workspace: str, project_id, snapshots: list):
+        """Upload `snapshots` concurrently, each with the request of `RemoteWorkspace.add_snapshot`."""
+        url = urllib.parse.urljoin(workspace, f"/api/projects/{project_id}/snapshots")
+
+        def upload(snapshot):
+            body = json.dumps(snapshot.dict(), allow_nan=True, cls=NumpyEncoder).encode("utf8")
+            response = session.post(
+                url, data=body, headers={"Content-Type": "application/json"}, timeout=60
+            )
+            response.raise_for_status()
+
+        if not snapshots:
+            return
+        with ThreadPoolExecutor(len(snapshots)) as executor:
+            list(executor.map(upload, snapshots))
+
+    def _strip_result(result):
+        # Optional fields only used to render the report (plots, distributions,
+        # examples) are reset to their default, at every level of the result.
+        update = {}
+        tags = get_all_fields_tags(type(result))
+        for name, field in result.__fields__.items():
+            value = getattr(result, name)
+            if tags.get(name, set()) & {IncludeTags.Render, IncludeTags.Extra} and not field.required:
+                update[name] = field.default
+            elif isinstance(value, BaseResult):
+                update[name] = _strip_result(value)
+            elif isinstance(value, dict):
+                update[name] = {
+                    k: _strip_result(v) if isinstance(v, BaseResult) else v for k, v in value.items()
+                }
+            elif isinstance(value, list):
+                update[name] = [_strip_result(v) if isinstance(v, BaseResult) else v for v in value]
+        return result.copy(update=update)
+
+    def compact_snapshot(snapshot: Snapshot, detail: str = None) -> Snapshot:
+        """Return `snapshot` with only what the dashboard panels read.
+
+        A report keeps its first level metrics, without the metrics they were
+        computed from, and a test suite its test results, without any metric.
+        In the results kept, the fields only used to render the report are
+        dropped. `detail` is the URI of the full snapshot, see `add_detail`.
+        """
+        suite = snapshot.suite
+        metadata = {**snapshot.metadata, "snapshot": "compact"}
+        if detail:
+            metadata["detail"] = detail
+        return snapshot.copy(
+            update={
+                "metadata": metadata,
+                "suite": suite.copy(
+                    update={
+                        "metrics": [suite.metrics[i] for i in snapshot.metrics_ids],
+                        "metric_results": [
+                            _strip_result(suite.metric_results[i]) for i in snapshot.metrics_ids
+                        ],
+                        "test_results": [_strip_result(r) for r in suite.test_results],
+                    }
+                ),
+                "metrics_ids": list(range(len(snapshot.metrics_ids))),
+            }
+        )
+
+    def prepare_snapshots(suites: list, detail, compact: bool = False) -> list:
+        """Return the snapshots of `suites` (reports, test suites or snapshots) to upload.
+
+        `detail` is the `snapshot_detail` output artifact of a component: a JSON
+        file mapping snapshot ids to full snapshots. With `compact`, the
+        snapshots returned are compact, and the full ones are saved in `detail`
+        to restore them, see `add_detail`. Otherwise the full snapshots are
+        uploaded as they are and `detail` is an empty mapping.
+        """
+        full = [s if isinstance(s, Snapshot) else s.to_snapshot() for s in suites]
+        with open(detail.path, "w") as f:
+            if not compact:
+                f.write("{}")
+                return full
+            json.dump({str(s.id): s.dict() for s in full}, f, allow_nan=True, cls=NumpyEncoder)
+        return [compact_snapshot(s, detail.uri) for s in full]
+    # END INLINED
 
-    reference_df = pd.read_csv(reference_target.path)
-    current_df = pd.read_csv(current_target.path)
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    reference_df = read_dataset(reference_target)
+    current_df = read_dataset(current_target)
     report = Report(
         metrics=[ColumnDriftMetric(column_name="prediction")], timestamp=datetime.now(), tags=["prediction_drift"]
     )
     report.run(reference_data=reference_df, current_data=current_df)
-    ws.add_report(project.id, report)
+    snapshots = prepare_snapshots([report], snapshot_detail, compact)
+    upload_snapshots(open_session(), workspace, project_id, snapshots)
+
+
+@dsl.component(
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
+)
+def monitoring(
+    reference_features: dsl.Input[dsl.Dataset],
+    current_features: dsl.Input[dsl.Dataset],
+    reference_predictions: dsl.Input[dsl.Dataset],
+    current_predictions: dsl.Input[dsl.Dataset],
+    workspace: str,
+    project_id: str,
+    metrics: dsl.Output[dsl.Metrics],
+    snapshot_detail: dsl.Output[dsl.Artifact],
+    compact: bool = False,
+):
+    """data_quality, data_drift and prediction_drift in a single step.
+
+    Each dataset is loaded once, and the snapshots are only uploaded once
+    all of them are computed. The features are tested for drift once, by
+    the DataDriftTable of the drift test suite, from which the
+    DatasetDriftMetric result is derived: only the prediction column is
+    tested again. The snapshots keep the tags of the three step version, so
+    the dashboard of batch_monitoring.py shows them the same way.
+    """
+    import time
+    import pandas as pd
+    import pyarrow as pa
+    from datetime import datetime
+    from evidently.metrics import ColumnDriftMetric, DataDriftTable
+    from evidently.report import Report
+    from evidently.test_preset import DataDriftTestPreset, DataStabilityTestPreset
+    from evidently.test_suite import TestSuite
+
+    # BEGIN INLINED evidently/module_5/workspace_client.py: open_session upload_snapshots prepare_snapshots
+    # Generated by sync_inlined.py, edit the file above instead.
+    import json
+    import requests
+    import urllib.parse
+    from concurrent.futures import ThreadPoolExecutor
+    from evidently.core import BaseResult, IncludeTags, get_all_fields_tags
+    from evidently.suite.base_suite import Snapshot
+    from evidently.utils import NumpyEncoder
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    def open_session(pool_size: int = 4, retries: int = 3) -> requests.Session:
+        """Return a session keeping up to `pool_size` connections alive and retrying failed requests.
+
+        Only the requests that the server did not process are retried, `retries`
+        times with exponential backoff: those whose connection could not be
+        opened, and those answered with a 429, 502 or 503 status. A request
+        that failed after being sent, or that timed out, is not retried, since
+        an upload may then have been stored already.
+        """
+        retry = Retry(
+            total=retries,
+            read=False,
+            other=0,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503],
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def upload_snapshots(session, workspace: str, project_id, snapshots: list):
+        """Upload `snapshots` concurrently, each with the request of `RemoteWorkspace.add_snapshot`."""
+        url = urllib.parse.urljoin(workspace, f"/api/projects/{project_id}/snapshots")
+
+        def upload(snapshot):
+            body = json.dumps(snapshot.dict(), allow_nan=True, cls=NumpyEncoder).encode("utf8")
+            response = session.post(
+                url, data=body, headers={"Content-Type": "application/json"}, timeout=60
+            )
+            response.raise_for_status()
+
+        if not snapshots:
+            return
+        with ThreadPoolExecutor(len(snapshots)) as executor:
+            list(executor.map(upload, snapshots))
+
+    def _strip_result(result):
+        # Optional fields only used to render the report (plots, distributions,
+        # examples) are reset to their default, at every level of the result.
+        update = {}
+        tags = get_all_fields_tags(type(result))
+        for name, field in result.__fields__.items():
+            value = getattr(result, name)
+            if tags.get(name, set()) & {IncludeTags.Render, IncludeTags.Extra} and not field.required:
+                update[name] = field.default
+            elif isinstance(value, BaseResult):
+                update[name] = _strip_result(value)
+            elif isinstance(value, dict):
+                update[name] = {
+                    k: _strip_result(v) if isinstance(v, BaseResult) else v for k, v in value.items()
+                }
+            elif isinstance(value, list):
+                update[name] = [_strip_result(v) if isinstance(v, BaseResult) else v for v in value]
+        return result.copy(update=update)
+
+    def compact_snapshot(snapshot: Snapshot, detail: str = None) -> Snapshot:
+        """Return `snapshot` with only what the dashboard panels read.
+
+        A report keeps its first level metrics, without the metrics they were
+        computed from, and a test suite its test results, without any metric.
+        In the results kept, the fields only used to render the report are
+        dropped. `detail` is the URI of the full snapshot, see `add_detail`.
+        """
+        suite = snapshot.suite
+        metadata = {**snapshot.metadata, "snapshot": "compact"}
+        if detail:
+            metadata["detail"] = detail
+        return snapshot.copy(
+            update={
+                "metadata": metadata,
+                "suite": suite.copy(
+                    update={
+                        "metrics": [suite.metrics[i] for i in snapshot.metrics_ids],
+                        "metric_results": [
+                            _strip_result(suite.metric_results[i]) for i in snapshot.metrics_ids
+                        ],
+                        "test_results": [_strip_result(r) for r in suite.test_results],
+                    }
+                ),
+                "metrics_ids": list(range(len(snapshot.metrics_ids))),
+            }
+        )
+
+    def prepare_snapshots(suites: list, detail, compact: bool = False) -> list:
+        """Return the snapshots of `suites` (reports, test suites or snapshots) to upload.
+
+        `detail` is the `snapshot_detail` output artifact of a component: a JSON
+        file mapping snapshot ids to full snapshots. With `compact`, the
+        snapshots returned are compact, and the full ones are saved in `detail`
+        to restore them, see `add_detail`. Otherwise the full snapshots are
+        uploaded as they are and `detail` is an empty mapping.
+        """
+        full = [s if isinstance(s, Snapshot) else s.to_snapshot() for s in suites]
+        with open(detail.path, "w") as f:
+            if not compact:
+                f.write("{}")
+                return full
+            json.dump({str(s.id): s.dict() for s in full}, f, allow_nan=True, cls=NumpyEncoder)
+        return [compact_snapshot(s, detail.uri) for s in full]
+    # END INLINED
+
+    # BEGIN INLINED kserve/module_2/drift_monitor.py: dataset_drift_result drift_snapshot
+    # Generated by sync_inlined.py, edit the file above instead.
+    from evidently.core import new_id
+    from evidently.metrics import DatasetDriftMetric
+    from evidently.metrics.data_drift.dataset_drift_metric import DatasetDriftMetricResults
+    from evidently.options.base import Options
+    from evidently.suite.base_suite import ContextPayload
+
+    def dataset_drift_result(by_column: list) -> DatasetDriftMetricResults:
+        """Return the `DatasetDriftMetric` result of the drift results of each feature.
+
+        The dataset drifts when at least half of the features drift, the
+        default drift share of `DatasetDriftMetric`.
+        """
+        n_drifted = sum(result.drift_detected for result in by_column)
+        return DatasetDriftMetricResults(
+            drift_share=0.5,
+            number_of_columns=len(by_column),
+            number_of_drifted_columns=n_drifted,
+            share_of_drifted_columns=n_drifted / len(by_column),
+            dataset_drift=n_drifted / len(by_column) >= 0.5,
+        )
+
+    def drift_snapshot(
+        results: tuple, timestamp: datetime, metadata: dict, snapshot_id=None
+    ) -> Snapshot:
+        """Return the `data_drift` and `prediction_drift` snapshot of `drift_results`.
+
+        The snapshot holds the same `DatasetDriftMetric` and `ColumnDriftMetric`
+        results as the reports of `batch_monitoring.py`, so that the panels of
+        its dashboard pick it up. It gets a new id unless `snapshot_id` is set.
+        """
+        by_column, dataset_result, prediction_result = results
+        columns = [result.column_name for result in by_column]
+        return Snapshot(
+            id=snapshot_id or new_id(),
+            timestamp=timestamp,
+            metadata=metadata,
+            tags=["data_drift", "prediction_drift"],
+            suite=ContextPayload(
+                metrics=[DatasetDriftMetric(columns=columns), ColumnDriftMetric(column_name="prediction")],
+                metric_results=[dataset_result, prediction_result],
+                tests=[],
+                test_results=[],
+            ),
+            metrics_ids=[0, 1],
+            options=Options(),
+        )
+    # END INLINED
+
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    session = open_session()
+
+    start = time.perf_counter()
+    reference_df = read_dataset(reference_features)
+    current_df = read_dataset(current_features)
+    reference_prediction_df = read_dataset(reference_predictions)[["prediction"]]
+    current_prediction_df = read_dataset(current_predictions)[["prediction"]]
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    timestamp = datetime.now()
+    data_quality_suite = TestSuite(
+        tests=[DataStabilityTestPreset()], timestamp=timestamp, tags=["data_quality_test_suite"]
+    )
+    data_quality_suite.run(reference_data=reference_df, current_data=current_df)
+    data_drift_suite = TestSuite(
+        tests=[DataDriftTestPreset()], timestamp=timestamp, tags=["data_drift_test_suite"]
+    )
+    data_drift_suite.run(reference_data=reference_df, current_data=current_df)
+    data_drift_snapshot = data_drift_suite.to_snapshot()
+    # Dataset drift stays computed on the features only, as in data_drift.
+    table = next(
+        result
+        for metric, result in zip(
+            data_drift_snapshot.suite.metrics, data_drift_snapshot.suite.metric_results
+        )
+        if isinstance(metric, DataDriftTable)
+    )
+    by_column = [table.drift_by_columns[name] for name in reference_df.columns]
+    dataset_result = dataset_drift_result(by_column)
+    prediction_report = Report(metrics=[ColumnDriftMetric(column_name="prediction")])
+    prediction_report.run(
+        reference_data=reference_prediction_df, current_data=current_prediction_df
+    )
+    (prediction_result,) = prediction_report.to_snapshot().suite.metric_results
+    drift_report = drift_snapshot((by_column, dataset_result, prediction_result), timestamp, {})
+    compute_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshots = prepare_snapshots(
+        [data_quality_suite, data_drift_snapshot, drift_report], snapshot_detail, compact
+    )
+    upload_snapshots(session, workspace, project_id, snapshots)
+    upload_seconds = time.perf_counter() - start
+
+    metrics.log_metric("load_seconds", round(load_seconds, 3))
+    metrics.log_metric("compute_seconds", round(compute_seconds, 3))
+    metrics.log_metric("upload_seconds", round(upload_seconds, 3))
+
+
+@dsl.component(
+    base_image="python:3.12",
+    packages_to_install=["fsspec", "gcsfs", "pandas", "pyarrow", "scikit-learn", "mlflow"],
+)
+def reference_profile(
+    reference_dataset_uri: str,
+    model_name: str,
+    tracking_uri: str,
+    profile_dir: str,
+    profile: dsl.Output[dsl.Artifact],
+    metrics: dsl.Output[dsl.Metrics],
+    chunk_size: int = 100_000,
+):
+    """Per-column sketches of the reference dataset and of its predictions.
+
+    Both are cached under `profile_dir`, the features by checksum of the
+    reference dataset and the predictions also by model version, so a run
+    only reloads or re-predicts the reference data when one of them changed.
+    """
+    import hashlib
+    import json
+    import posixpath
+    import fsspec
+    import pandas as pd
+    import mlflow
+    from mlflow.tracking import MlflowClient
+
+    # Part of the cache key, to bump whenever the content of a profile changes.
+    PROFILE_VERSION = 2
+
+    # BEGIN INLINED kserve/module_2/sketches.py: new_sketch sketch_update sketch_to_json
+    # Generated by sync_inlined.py, edit the file above instead.
+    import itertools
+    import numpy as np
+
+    # Columns with more distinct values only keep their quantile sketch.
+    MAX_DISTINCT_VALUES = 64
+    # Size of the KLL sketch: exact up to this many values.
+    KLL_K = 1000
+
+    def new_sketch() -> dict:
+        """Return an empty mergeable sketch of a numeric column.
+
+        Count, mean and sum of squared deviations, exact counts while the
+        column has at most `MAX_DISTINCT_VALUES` distinct values, and a KLL
+        quantile sketch whose level h holds items of weight 2**h. The
+        components of evidently/module_5 inline this module, see
+        sync_inlined.py.
+        """
+        return {"count": 0, "mean": 0.0, "m2": 0.0, "values": {}, "levels": [np.empty(0)]}
+
+    def _compact(levels: list, seed: int) -> list:
+        # A level over its capacity is sorted and every other item moves up
+        # with twice the weight.
+        h = 0
+        while h < len(levels):
+            capacity = max(2, int(KLL_K * (2 / 3) ** (len(levels) - 1 - h)))
+            if len(levels[h]) > capacity:
+                items = np.sort(levels[h])
+                odd = len(items) % 2
+                if h + 1 == len(levels):
+                    levels.append(np.empty(0))
+                promoted = items[odd:][(seed + h) % 2 :: 2]
+                levels[h + 1] = np.concatenate([levels[h + 1], promoted])
+                levels[h] = items[:odd]
+            h += 1
+        return levels
+
+    def sketch_merge(a: dict, b: dict) -> dict:
+        """Return the sketch of the union of the values of `a` and `b`."""
+        count = a["count"] + b["count"]
+        if not count:
+            return a
+        delta = b["mean"] - a["mean"]
+        values = None
+        if a["values"] is not None and b["values"] is not None:
+            values = dict(a["values"])
+            for value, n in b["values"].items():
+                values[value] = values.get(value, 0) + n
+            if len(values) > MAX_DISTINCT_VALUES:
+                values = None
+        empty = np.empty(0)
+        levels = [
+            np.concatenate(pair)
+            for pair in itertools.zip_longest(a["levels"], b["levels"], fillvalue=empty)
+        ]
+        return {
+            "count": count,
+            "mean": a["mean"] + delta * b["count"] / count,
+            "m2": a["m2"] + b["m2"] + delta**2 * a["count"] * b["count"] / count,
+            "values": values,
+            "levels": _compact(levels, count),
+        }
+
+    def sketch_update(sketch: dict, values) -> dict:
+        """Add a chunk of values to `sketch`, non-finite ones are ignored like in Evidently."""
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return sketch
+        distinct, counts = np.unique(values, return_counts=True)
+        mean = values.mean()
+        chunk = {
+            "count": len(values),
+            "mean": float(mean),
+            "m2": float(((values - mean) ** 2).sum()),
+            "values": (
+                dict(zip(distinct.tolist(), counts.tolist()))
+                if len(distinct) <= MAX_DISTINCT_VALUES
+                else None
+            ),
+            "levels": [values],
+        }
+        return sketch_merge(sketch, chunk)
+
+    def sketch_to_json(sketch: dict) -> dict:
+        values = sketch["values"]
+        return {
+            **sketch,
+            "values": None if values is None else [[v, n] for v, n in sorted(values.items())],
+            "levels": [level.tolist() for level in sketch["levels"]],
+        }
+    # END INLINED
+
+    fs, path = fsspec.core.url_to_fs(reference_dataset_uri)
+    key = hashlib.sha256(
+        f"{PROFILE_VERSION}:{reference_dataset_uri}:{fs.checksum(path)}".encode()
+    ).hexdigest()[:16]
+    cache_fs, cache_path = fsspec.core.url_to_fs(posixpath.join(profile_dir, key))
+
+    mlflow.set_tracking_uri(tracking_uri)
+    version = MlflowClient().get_model_version_by_alias(model_name, "production-live").version
+
+    def load_cached(name):
+        # The cached JSON file `name` of this reference dataset, if any.
+        path = posixpath.join(cache_path, name)
+        if not cache_fs.exists(path):
+            return None
+        with cache_fs.open(path) as f:
+            return json.load(f)
+
+    def store(name, value):
+        path = posixpath.join(cache_path, name)
+        cache_fs.makedirs(posixpath.dirname(path), exist_ok=True)
+        with cache_fs.open(path, "w") as f:
+            json.dump(value, f)
+
+    predictions_name = f"predictions/{model_name}/{version}.json"
+    features_profile = load_cached("features.json")
+    predictions_profile = load_cached(predictions_name)
+    features_hit, predictions_hit = features_profile is not None, predictions_profile is not None
+    if not (features_hit and predictions_hit):
+        # The reference dataset is scanned once, by chunks, for whatever is missing.
+        model = None
+        if not predictions_hit:
+            model = mlflow.pyfunc.load_model(f"models:/{model_name}/{version}")
+        columns, prediction = {}, new_sketch()
+        for chunk in pd.read_csv(reference_dataset_uri, chunksize=chunk_size):
+            chunk = chunk.drop(columns=["Churn"])
+            if not features_hit:
+                for name, values in chunk.items():
+                    columns[name] = sketch_update(columns.get(name, new_sketch()), values)
+            if not predictions_hit:
+                prediction = sketch_update(prediction, model.predict(chunk))
+        if not features_hit:
+            features_profile = {name: sketch_to_json(sketch) for name, sketch in columns.items()}
+            store("features.json", features_profile)
+        if not predictions_hit:
+            predictions_profile = sketch_to_json(prediction)
+            store(predictions_name, predictions_profile)
+
+    with open(profile.path, "w") as f:
+        json.dump(
+            {
+                "key": key,
+                "dataset_uri": reference_dataset_uri,
+                "model_name": model_name,
+                "model_version": version,
+                "columns": features_profile,
+                "prediction": predictions_profile,
+            },
+            f,
+        )
+    profile.metadata.update({"key": key, "model_version": version})
+    metrics.log_metric("features_cache_hit", int(features_hit))
+    metrics.log_metric("predictions_cache_hit", int(predictions_hit))
+
+
+@dsl.component(
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
+)
+def profile_drift(
+    profile: dsl.Input[dsl.Artifact],
+    current_features: dsl.Input[dsl.Dataset],
+    current_predictions: dsl.Input[dsl.Dataset],
+    workspace: str,
+    project_id: str,
+    current_profile: dsl.Output[dsl.Artifact],
+    metrics: dsl.Output[dsl.Metrics],
+    chunk_size: int = 100_000,
+):
+    """data_drift and prediction_drift against a profile from reference_profile.
+
+    Only the current data is scanned, once and by chunks, into sketches of
+    its columns. Each column is tested with the test Evidently picks by
+    default, computed from the sketches, and the results are uploaded as a
+    `DatasetDriftMetric` and `ColumnDriftMetric(prediction)` snapshot, which
+    the dashboard of batch_monitoring.py shows like the ones of the
+    Evidently reports.
+
+    The DataStabilityTestPreset and DataDriftTestPreset test suites need
+    the reference rows: the pipeline runs them with data_quality and
+    data_drift unless its `profile_test_suites` option is off.
+    """
+    import json
+    import time
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from datetime import datetime
+
+    # BEGIN INLINED evidently/module_5/workspace_client.py: open_session upload_snapshots
+    # Generated by sync_inlined.py, edit the file above instead.
+    import requests
+    import urllib.parse
+    from concurrent.futures import ThreadPoolExecutor
+    from evidently.utils import NumpyEncoder
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    def open_session(pool_size: int = 4, retries: int = 3) -> requests.Session:
+        """Return a session keeping up to `pool_size` connections alive and retrying failed requests.
+
+        Only the requests that the server did not process are retried, `retries`
+        times with exponential backoff: those whose connection could not be
+        opened, and those answered with a 429, 502 or 503 status. A request
+        that failed after being sent, or that timed out, is not retried, since
+        an upload may then have been stored already.
+        """
+        retry = Retry(
+            total=retries,
+            read=False,
+            other=0,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503],
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def upload_snapshots(session, workspace: str, project_id, snapshots: list):
+        """Upload `snapshots` concurrently, each with the request of `RemoteWorkspace.add_snapshot`."""
+        url = urllib.parse.urljoin(workspace, f"/api/projects/{project_id}/snapshots")
+
+        def upload(snapshot):
+            body = json.dumps(snapshot.dict(), allow_nan=True, cls=NumpyEncoder).encode("utf8")
+            response = session.post(
+                url, data=body, headers={"Content-Type": "application/json"}, timeout=60
+            )
+            response.raise_for_status()
+
+        if not snapshots:
+            return
+        with ThreadPoolExecutor(len(snapshots)) as executor:
+            list(executor.map(upload, snapshots))
+    # END INLINED
+
+    def read_chunks(dataset):
+        # Yield the dataset by chunks of at most chunk_size rows, whatever its format.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            for batch in pq.ParquetFile(dataset.path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif magic == b"ARROW1":
+            # Memory-mapped, only the chunk being converted is read from disk.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            for batch in table.to_batches(max_chunksize=chunk_size):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(dataset.path, chunksize=chunk_size)
+
+    # BEGIN INLINED kserve/module_2/sketches.py: new_sketch sketch_update sketch_to_json sketch_from_json
+    # Generated by sync_inlined.py, edit the file above instead.
+    import itertools
+    import numpy as np
+
+    # Columns with more distinct values only keep their quantile sketch.
+    MAX_DISTINCT_VALUES = 64
+    # Size of the KLL sketch: exact up to this many values.
+    KLL_K = 1000
+
+    def new_sketch() -> dict:
+        """Return an empty mergeable sketch of a numeric column.
+
+        Count, mean and sum of squared deviations, exact counts while the
+        column has at most `MAX_DISTINCT_VALUES` distinct values, and a KLL
+        quantile sketch whose level h holds items of weight 2**h. The
+        components of evidently/module_5 inline this module, see
+        sync_inlined.py.
+        """
+        return {"count": 0, "mean": 0.0, "m2": 0.0, "values": {}, "levels": [np.empty(0)]}
+
+    def _compact(levels: list, seed: int) -> list:
+        # A level over its capacity is sorted and every other item moves up
+        # with twice the weight.
+        h = 0
+        while h < len(levels):
+            capacity = max(2, int(KLL_K * (2 / 3) ** (len(levels) - 1 - h)))
+            if len(levels[h]) > capacity:
+                items = np.sort(levels[h])
+                odd = len(items) % 2
+                if h + 1 == len(levels):
+                    levels.append(np.empty(0))
+                promoted = items[odd:][(seed + h) % 2 :: 2]
+                levels[h + 1] = np.concatenate([levels[h + 1], promoted])
+                levels[h] = items[:odd]
+            h += 1
+        return levels
+
+    def sketch_merge(a: dict, b: dict) -> dict:
+        """Return the sketch of the union of the values of `a` and `b`."""
+        count = a["count"] + b["count"]
+        if not count:
+            return a
+        delta = b["mean"] - a["mean"]
+        values = None
+        if a["values"] is not None and b["values"] is not None:
+            values = dict(a["values"])
+            for value, n in b["values"].items():
+                values[value] = values.get(value, 0) + n
+            if len(values) > MAX_DISTINCT_VALUES:
+                values = None
+        empty = np.empty(0)
+        levels = [
+            np.concatenate(pair)
+            for pair in itertools.zip_longest(a["levels"], b["levels"], fillvalue=empty)
+        ]
+        return {
+            "count": count,
+            "mean": a["mean"] + delta * b["count"] / count,
+            "m2": a["m2"] + b["m2"] + delta**2 * a["count"] * b["count"] / count,
+            "values": values,
+            "levels": _compact(levels, count),
+        }
+
+    def sketch_update(sketch: dict, values) -> dict:
+        """Add a chunk of values to `sketch`, non-finite ones are ignored like in Evidently."""
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return sketch
+        distinct, counts = np.unique(values, return_counts=True)
+        mean = values.mean()
+        chunk = {
+            "count": len(values),
+            "mean": float(mean),
+            "m2": float(((values - mean) ** 2).sum()),
+            "values": (
+                dict(zip(distinct.tolist(), counts.tolist()))
+                if len(distinct) <= MAX_DISTINCT_VALUES
+                else None
+            ),
+            "levels": [values],
+        }
+        return sketch_merge(sketch, chunk)
+
+    def sketch_to_json(sketch: dict) -> dict:
+        values = sketch["values"]
+        return {
+            **sketch,
+            "values": None if values is None else [[v, n] for v, n in sorted(values.items())],
+            "levels": [level.tolist() for level in sketch["levels"]],
+        }
+
+    def sketch_from_json(data: dict) -> dict:
+        values = data["values"]
+        return {
+            **data,
+            "values": None if values is None else {v: n for v, n in values},
+            "levels": [np.array(level, dtype=float) for level in data["levels"]],
+        }
+    # END INLINED
+
+    # BEGIN INLINED kserve/module_2/drift_monitor.py: drift_results drift_snapshot
+    # Generated by sync_inlined.py, edit the file above instead.
+    from evidently.calculations.data_drift import ColumnDataDriftMetrics, DriftStatsField
+    from evidently.core import new_id
+    from evidently.metric_results import DistributionIncluded
+    from evidently.metrics import ColumnDriftMetric, DatasetDriftMetric
+    from evidently.metrics.data_drift.dataset_drift_metric import DatasetDriftMetricResults
+    from evidently.options.base import Options
+    from evidently.suite.base_suite import ContextPayload, Snapshot
+    from scipy import stats
+    from scipy.spatial import distance
+
+    def _weighted_items(sketch: dict):
+        # Sorted values and their weights: exact counts, or the KLL items.
+        if sketch["values"] is not None:
+            items, weights = zip(*sorted(sketch["values"].items()))
+            return np.array(items, dtype=float), np.array(weights, dtype=float)
+        items = np.concatenate(sketch["levels"])
+        weights = np.concatenate(
+            [np.full(len(level), 2.0**h) for h, level in enumerate(sketch["levels"])]
+        )
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def _cdf(sketch: dict, x):
+        # Share of the values lower than or equal to x.
+        items, weights = _weighted_items(sketch)
+        shares = np.concatenate([[0], np.cumsum(weights)]) / weights.sum()
+        return shares[np.searchsorted(items, x, side="right")]
+
+    def column_drift(reference: dict, current: dict, column_type: str = "num") -> tuple:
+        """Return the (stattest name, threshold, score, drift detected) of a column.
+
+        The test and its threshold are the ones Evidently picks by default for
+        the same data, `column_type` being `"num"` or `"cat"`.
+        """
+        n_ref, n_cur = reference["count"], current["count"]
+        if not n_ref or not n_cur:
+            raise ValueError("Cannot compute drift on an empty sketch")
+        keys = None
+        if reference["values"] is not None and current["values"] is not None:
+            keys = sorted(set(reference["values"]) | set(current["values"]))
+            ref_counts, cur_counts = (
+                np.array([sketch["values"].get(k, 0) for k in keys], dtype=float)
+                for sketch in (reference, current)
+            )
+        elif column_type == "cat":
+            raise ValueError(
+                f"Categorical columns are limited to {MAX_DISTINCT_VALUES} distinct values"
+            )
+        categorical = keys is not None and (column_type == "cat" or len(keys) <= 5)
+        if n_ref <= 1000 and categorical and len(keys) <= 2:
+            if len(keys) == 1:
+                p_value = 1.0
+            else:
+                p_ref, p_cur = 1 - ref_counts[0] / n_ref, 1 - cur_counts[0] / n_cur
+                p = (p_ref * n_ref + p_cur * n_cur) / (n_ref + n_cur)
+                z = (p_ref - p_cur) / np.sqrt(p * (1 - p) * (1 / n_ref + 1 / n_cur))
+                p_value = 2 * (1 - stats.norm.cdf(abs(z)))
+            return "Z-test p_value", 0.05, float(p_value), bool(p_value < 0.05)
+        if n_ref <= 1000 and categorical:
+            p_value = stats.chisquare(cur_counts, ref_counts * n_cur / n_ref)[1]
+            return "chi-square p_value", 0.05, float(p_value), bool(p_value < 0.05)
+        if n_ref <= 1000:
+            points = np.union1d(_weighted_items(reference)[0], _weighted_items(current)[0])
+            d = np.max(np.abs(_cdf(reference, points) - _cdf(current, points)))
+            p_value = stats.kstwo.sf(d, np.round(n_ref * n_cur / (n_ref + n_cur)))
+            return "K-S p_value", 0.05, float(p_value), bool(p_value <= 0.05)
+        if categorical:
+            score = distance.jensenshannon(ref_counts / n_ref, cur_counts / n_cur)
+            return "Jensen-Shannon distance", 0.1, float(score), bool(score >= 0.1)
+        ref_items, ref_weights = _weighted_items(reference)
+        cur_items, cur_weights = _weighted_items(current)
+        score = stats.wasserstein_distance(ref_items, cur_items, ref_weights, cur_weights)
+        # Evidently's np.std is the population standard deviation too.
+        score /= max(np.sqrt(reference["m2"] / n_ref), 0.001)
+        return "Wasserstein distance (normed)", 0.1, float(score), bool(score >= 0.1)
+
+    def _drift_result(name: str, reference: dict, current: dict, column_type: str):
+        stattest_name, threshold, score, detected = column_drift(reference, current, column_type)
+
+        def stats_field(sketch):
+            if column_type != "cat":
+                return DriftStatsField()
+            x, y = zip(*sorted(sketch["values"].items()))
+            return DriftStatsField(small_distribution=DistributionIncluded(x=list(x), y=list(y)))
+
+        return ColumnDataDriftMetrics(
+            column_name=name,
+            column_type=column_type,
+            stattest_name=stattest_name,
+            stattest_threshold=threshold,
+            drift_score=score,
+            drift_detected=detected,
+            current=stats_field(current),
+            reference=stats_field(reference),
+        )
+
+    def dataset_drift_result(by_column: list) -> DatasetDriftMetricResults:
+        """Return the `DatasetDriftMetric` result of the drift results of each feature.
+
+        The dataset drifts when at least half of the features drift, the
+        default drift share of `DatasetDriftMetric`.
+        """
+        n_drifted = sum(result.drift_detected for result in by_column)
+        return DatasetDriftMetricResults(
+            drift_share=0.5,
+            number_of_columns=len(by_column),
+            number_of_drifted_columns=n_drifted,
+            share_of_drifted_columns=n_drifted / len(by_column),
+            dataset_drift=n_drifted / len(by_column) >= 0.5,
+        )
+
+    def drift_results(reference: dict, current: dict) -> tuple:
+        """Return the drift results of each feature, of the dataset and of the prediction.
+
+        `reference` and `current` are profiles in the layout of the
+        `reference_profile` component of evidently/module_5, with their
+        sketches loaded.
+        """
+        by_column = [
+            _drift_result(name, reference["columns"][name], current["columns"][name], "num")
+            for name in reference["columns"]
+        ]
+        dataset_result = dataset_drift_result(by_column)
+        prediction_result = _drift_result(
+            "prediction", reference["prediction"], current["prediction"], "cat"
+        )
+        return by_column, dataset_result, prediction_result
+
+    def drift_snapshot(
+        results: tuple, timestamp: datetime, metadata: dict, snapshot_id=None
+    ) -> Snapshot:
+        """Return the `data_drift` and `prediction_drift` snapshot of `drift_results`.
+
+        The snapshot holds the same `DatasetDriftMetric` and `ColumnDriftMetric`
+        results as the reports of `batch_monitoring.py`, so that the panels of
+        its dashboard pick it up. It gets a new id unless `snapshot_id` is set.
+        """
+        by_column, dataset_result, prediction_result = results
+        columns = [result.column_name for result in by_column]
+        return Snapshot(
+            id=snapshot_id or new_id(),
+            timestamp=timestamp,
+            metadata=metadata,
+            tags=["data_drift", "prediction_drift"],
+            suite=ContextPayload(
+                metrics=[DatasetDriftMetric(columns=columns), ColumnDriftMetric(column_name="prediction")],
+                metric_results=[dataset_result, prediction_result],
+                tests=[],
+                test_results=[],
+            ),
+            metrics_ids=[0, 1],
+            options=Options(),
+        )
+    # END INLINED
+
+    with open(profile.path) as f:
+        reference = json.load(f)
+    columns = list(reference["columns"])
+    reference_sketches = {
+        "columns": {name: sketch_from_json(reference["columns"][name]) for name in columns},
+        "prediction": sketch_from_json(reference["prediction"]),
+    }
+    session = open_session()
+
+    # The current data is never held in memory at once, only one chunk
+    # and the sketches, which are merged chunk after chunk.
+    start = time.perf_counter()
+    current_columns = {name: new_sketch() for name in columns}
+    for chunk in read_chunks(current_features):
+        for name in columns:
+            current_columns[name] = sketch_update(current_columns[name], chunk[name])
+    current_prediction = new_sketch()
+    for chunk in read_chunks(current_predictions):
+        current_prediction = sketch_update(current_prediction, chunk["prediction"])
+    scan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = drift_results(
+        reference_sketches, {"columns": current_columns, "prediction": current_prediction}
+    )
+    by_column, dataset_result, prediction_result = results
+    snapshot = drift_snapshot(
+        results,
+        datetime.now(),
+        {"reference_profile": reference["key"], "model_version": reference["model_version"]},
+    )
+    compute_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    upload_snapshots(session, workspace, project_id, [snapshot])
+    upload_seconds = time.perf_counter() - start
+
+    # Same layout as the reference profile, so that the sketches of several
+    # runs can be merged, or serve as the reference of a later one.
+    with open(current_profile.path, "w") as f:
+        json.dump(
+            {
+                "key": reference["key"],
+                "model_name": reference["model_name"],
+                "model_version": reference["model_version"],
+                "columns": {name: sketch_to_json(current_columns[name]) for name in columns},
+                "prediction": sketch_to_json(current_prediction),
+            },
+            f,
+        )
+
+    metrics.log_metric("rows", current_prediction["count"])
+    metrics.log_metric("share_of_drifted_columns", dataset_result.share_of_drifted_columns)
+    for result in by_column:
+        metrics.log_metric(f"drift_score_{result.column_name}", result.drift_score)
+    metrics.log_metric("prediction_drift_score", prediction_result.drift_score)
+    metrics.log_metric("scan_seconds", round(scan_seconds, 3))
+    metrics.log_metric("compute_seconds", round(compute_seconds, 3))
+    metrics.log_metric("upload_seconds", round(upload_seconds, 3))
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "evidently==0.6.6"]
+    base_image="python:3.12",
+    packages_to_install=[
+        "fsspec",
+        "gcsfs",
+        "pandas",
+        "pyarrow",
+        "scikit-learn",
+        "mlflow",
+        "evidently==0.6.6",
+    ],
+)
+def incremental_drift(
+    profile: dsl.Input[dsl.Artifact],
+    partitions_uri: str,
+    model_name: str,
+    tracking_uri: str,
+    state_dir: str,
+    workspace: str,
+    project_id: str,
+    running_profile: dsl.Output[dsl.Artifact],
+    metrics: dsl.Output[dsl.Metrics],
+    chunk_size: int = 100_000,
+):
+    """data_drift and prediction_drift per partition, only for new partitions.
+
+    `partitions_uri` is a glob of CSV or Parquet files, one per window, whose
+    date is read from their path, such as `churn_data_2025_*.csv` or
+    `date=*/part.parquet`. The sketches of each partition are kept under
+    `state_dir` with its checksum, so that a run only scans and predicts the
+    partitions added or changed since the last one, and uploads one snapshot
+    per such window. The running sketches of all windows are updated from
+    the stored ones, without reading past partitions again.
+    """
+    import hashlib
+    import json
+    import posixpath
+    import re
+    import time
+    import uuid
+    import fsspec
+    import pandas as pd
+    import pyarrow.parquet as pq
+    import mlflow
+    from datetime import datetime
+    from mlflow.tracking import MlflowClient
+
+    # BEGIN INLINED evidently/module_5/workspace_client.py: open_session upload_snapshots delete_snapshot
+    # Generated by sync_inlined.py, edit the file above instead.
+    import requests
+    import urllib.parse
+    from concurrent.futures import ThreadPoolExecutor
+    from evidently.utils import NumpyEncoder
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    def open_session(pool_size: int = 4, retries: int = 3) -> requests.Session:
+        """Return a session keeping up to `pool_size` connections alive and retrying failed requests.
+
+        Only the requests that the server did not process are retried, `retries`
+        times with exponential backoff: those whose connection could not be
+        opened, and those answered with a 429, 502 or 503 status. A request
+        that failed after being sent, or that timed out, is not retried, since
+        an upload may then have been stored already.
+        """
+        retry = Retry(
+            total=retries,
+            read=False,
+            other=0,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503],
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def upload_snapshots(session, workspace: str, project_id, snapshots: list):
+        """Upload `snapshots` concurrently, each with the request of `RemoteWorkspace.add_snapshot`."""
+        url = urllib.parse.urljoin(workspace, f"/api/projects/{project_id}/snapshots")
+
+        def upload(snapshot):
+            body = json.dumps(snapshot.dict(), allow_nan=True, cls=NumpyEncoder).encode("utf8")
+            response = session.post(
+                url, data=body, headers={"Content-Type": "application/json"}, timeout=60
+            )
+            response.raise_for_status()
+
+        if not snapshots:
+            return
+        with ThreadPoolExecutor(len(snapshots)) as executor:
+            list(executor.map(upload, snapshots))
+
+    def delete_snapshot(session, workspace: str, project_id, snapshot_id):
+        """Delete a snapshot with the request of `RemoteWorkspace.delete_snapshot`.
+
+        A snapshot already deleted, for instance by a run that failed before
+        recording it, is not an error.
+        """
+        url = urllib.parse.urljoin(workspace, f"/api/projects/{project_id}/{snapshot_id}")
+        response = session.delete(url, timeout=60)
+        if response.status_code != 404:
+            response.raise_for_status()
+    # END INLINED
+
+    def read_chunks(fs, path):
+        # Yield a partition by chunks of at most chunk_size rows.
+        with fs.open(path, "rb") as f:
+            if path.endswith(".parquet"):
+                for batch in pq.ParquetFile(f).iter_batches(batch_size=chunk_size):
+                    yield batch.to_pandas()
+            else:
+                yield from pd.read_csv(f, chunksize=chunk_size)
+
+    def window_start(fs, path):
+        # The last date in the path, such as 2025_05 or date=2025-05-01,
+        # otherwise the modification time of the partition.
+        dates = re.findall(r"(?<!\d)(\d{4})[-_]?(\d{2})(?:[-_]?(\d{2}))?(?!\d)", path)
+        if not dates:
+            return fs.modified(path).replace(tzinfo=None)
+        year, month, day = dates[-1]
+        return datetime(int(year), int(month), int(day or 1))
+
+    # BEGIN INLINED kserve/module_2/sketches.py: new_sketch sketch_update sketch_merge sketch_to_json sketch_from_json
+    # Generated by sync_inlined.py, edit the file above instead.
+    import itertools
+    import numpy as np
+
+    # Columns with more distinct values only keep their quantile sketch.
+    MAX_DISTINCT_VALUES = 64
+    # Size of the KLL sketch: exact up to this many values.
+    KLL_K = 1000
+
+    def new_sketch() -> dict:
+        """Return an empty mergeable sketch of a numeric column.
+
+        Count, mean and sum of squared deviations, exact counts while the
+        column has at most `MAX_DISTINCT_VALUES` distinct values, and a KLL
+        quantile sketch whose level h holds items of weight 2**h. The
+        components of evidently/module_5 inline this module, see
+        sync_inlined.py.
+        """
+        return {"count": 0, "mean": 0.0, "m2": 0.0, "values": {}, "levels": [np.empty(0)]}
+
+    def _compact(levels: list, seed: int) -> list:
+        # A level over its capacity is sorted and every other item moves up
+        # with twice the weight.
+        h = 0
+        while h < len(levels):
+            capacity = max(2, int(KLL_K * (2 / 3) ** (len(levels) - 1 - h)))
+            if len(levels[h]) > capacity:
+                items = np.sort(levels[h])
+                odd = len(items) % 2
+                if h + 1 == len(levels):
+                    levels.append(np.empty(0))
+                promoted = items[odd:][(seed + h) % 2 :: 2]
+                levels[h + 1] = np.concatenate([levels[h + 1], promoted])
+                levels[h] = items[:odd]
+            h += 1
+        return levels
+
+    def sketch_merge(a: dict, b: dict) -> dict:
+        """Return the sketch of the union of the values of `a` and `b`."""
+        count = a["count"] + b["count"]
+        if not count:
+            return a
+        delta = b["mean"] - a["mean"]
+        values = None
+        if a["values"] is not None and b["values"] is not None:
+            values = dict(a["values"])
+            for value, n in b["values"].items():
+                values[value] = values.get(value, 0) + n
+            if len(values) > MAX_DISTINCT_VALUES:
+                values = None
+        empty = np.empty(0)
+        levels = [
+            np.concatenate(pair)
+            for pair in itertools.zip_longest(a["levels"], b["levels"], fillvalue=empty)
+        ]
+        return {
+            "count": count,
+            "mean": a["mean"] + delta * b["count"] / count,
+            "m2": a["m2"] + b["m2"] + delta**2 * a["count"] * b["count"] / count,
+            "values": values,
+            "levels": _compact(levels, count),
+        }
+
+    def sketch_update(sketch: dict, values) -> dict:
+        """Add a chunk of values to `sketch`, non-finite ones are ignored like in Evidently."""
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return sketch
+        distinct, counts = np.unique(values, return_counts=True)
+        mean = values.mean()
+        chunk = {
+            "count": len(values),
+            "mean": float(mean),
+            "m2": float(((values - mean) ** 2).sum()),
+            "values": (
+                dict(zip(distinct.tolist(), counts.tolist()))
+                if len(distinct) <= MAX_DISTINCT_VALUES
+                else None
+            ),
+            "levels": [values],
+        }
+        return sketch_merge(sketch, chunk)
+
+    def sketch_to_json(sketch: dict) -> dict:
+        values = sketch["values"]
+        return {
+            **sketch,
+            "values": None if values is None else [[v, n] for v, n in sorted(values.items())],
+            "levels": [level.tolist() for level in sketch["levels"]],
+        }
+
+    def sketch_from_json(data: dict) -> dict:
+        values = data["values"]
+        return {
+            **data,
+            "values": None if values is None else {v: n for v, n in values},
+            "levels": [np.array(level, dtype=float) for level in data["levels"]],
+        }
+    # END INLINED
+
+    # BEGIN INLINED kserve/module_2/drift_monitor.py: drift_results drift_snapshot
+    # Generated by sync_inlined.py, edit the file above instead.
+    from evidently.calculations.data_drift import ColumnDataDriftMetrics, DriftStatsField
+    from evidently.core import new_id
+    from evidently.metric_results import DistributionIncluded
+    from evidently.metrics import ColumnDriftMetric, DatasetDriftMetric
+    from evidently.metrics.data_drift.dataset_drift_metric import DatasetDriftMetricResults
+    from evidently.options.base import Options
+    from evidently.suite.base_suite import ContextPayload, Snapshot
+    from scipy import stats
+    from scipy.spatial import distance
+
+    def _weighted_items(sketch: dict):
+        # Sorted values and their weights: exact counts, or the KLL items.
+        if sketch["values"] is not None:
+            items, weights = zip(*sorted(sketch["values"].items()))
+            return np.array(items, dtype=float), np.array(weights, dtype=float)
+        items = np.concatenate(sketch["levels"])
+        weights = np.concatenate(
+            [np.full(len(level), 2.0**h) for h, level in enumerate(sketch["levels"])]
+        )
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def _cdf(sketch: dict, x):
+        # Share of the values lower than or equal to x.
+        items, weights = _weighted_items(sketch)
+        shares = np.concatenate([[0], np.cumsum(weights)]) / weights.sum()
+        return shares[np.searchsorted(items, x, side="right")]
+
+    def column_drift(reference: dict, current: dict, column_type: str = "num") -> tuple:
+        """Return the (stattest name, threshold, score, drift detected) of a column.
+
+        The test and its threshold are the ones Evidently picks by default for
+        the same data, `column_type` being `"num"` or `"cat"`.
+        """
+        n_ref, n_cur = reference["count"], current["count"]
+        if not n_ref or not n_cur:
+            raise ValueError("Cannot compute drift on an empty sketch")
+        keys = None
+        if reference["values"] is not None and current["values"] is not None:
+            keys = sorted(set(reference["values"]) | set(current["values"]))
+            ref_counts, cur_counts = (
+                np.array([sketch["values"].get(k, 0) for k in keys], dtype=float)
+                for sketch in (reference, current)
+            )
+        elif column_type == "cat":
+            raise ValueError(
+                f"Categorical columns are limited to {MAX_DISTINCT_VALUES} distinct values"
+            )
+        categorical = keys is not None and (column_type == "cat" or len(keys) <= 5)
+        if n_ref <= 1000 and categorical and len(keys) <= 2:
+            if len(keys) == 1:
+                p_value = 1.0
+            else:
+                p_ref, p_cur = 1 - ref_counts[0] / n_ref, 1 - cur_counts[0] / n_cur
+                p = (p_ref * n_ref + p_cur * n_cur) / (n_ref + n_cur)
+                z = (p_ref - p_cur) / np.sqrt(p * (1 - p) * (1 / n_ref + 1 / n_cur))
+                p_value = 2 * (1 - stats.norm.cdf(abs(z)))
+            return "Z-test p_value", 0.05, float(p_value), bool(p_value < 0.05)
+        if n_ref <= 1000 and categorical:
+            p_value = stats.chisquare(cur_counts, ref_counts * n_cur / n_ref)[1]
+            return "chi-square p_value", 0.05, float(p_value), bool(p_value < 0.05)
+        if n_ref <= 1000:
+            points = np.union1d(_weighted_items(reference)[0], _weighted_items(current)[0])
+            d = np.max(np.abs(_cdf(reference, points) - _cdf(current, points)))
+            p_value = stats.kstwo.sf(d, np.round(n_ref * n_cur / (n_ref + n_cur)))
+            return "K-S p_value", 0.05, float(p_value), bool(p_value <= 0.05)
+        if categorical:
+            score = distance.jensenshannon(ref_counts / n_ref, cur_counts / n_cur)
+            return "Jensen-Shannon distance", 0.1, float(score), bool(score >= 0.1)
+        ref_items, ref_weights = _weighted_items(reference)
+        cur_items, cur_weights = _weighted_items(current)
+        score = stats.wasserstein_distance(ref_items, cur_items, ref_weights, cur_weights)
+        # Evidently's np.std is the population standard deviation too.
+        score /= max(np.sqrt(reference["m2"] / n_ref), 0.001)
+        return "Wasserstein distance (normed)", 0.1, float(score), bool(score >= 0.1)
+
+    def _drift_result(name: str, reference: dict, current: dict, column_type: str):
+        stattest_name, threshold, score, detected = column_drift(reference, current, column_type)
+
+        def stats_field(sketch):
+            if column_type != "cat":
+                return DriftStatsField()
+            x, y = zip(*sorted(sketch["values"].items()))
+            return DriftStatsField(small_distribution=DistributionIncluded(x=list(x), y=list(y)))
+
+        return ColumnDataDriftMetrics(
+            column_name=name,
+            column_type=column_type,
+            stattest_name=stattest_name,
+            stattest_threshold=threshold,
+            drift_score=score,
+            drift_detected=detected,
+            current=stats_field(current),
+            reference=stats_field(reference),
+        )
+
+    def dataset_drift_result(by_column: list) -> DatasetDriftMetricResults:
+        """Return the `DatasetDriftMetric` result of the drift results of each feature.
+
+        The dataset drifts when at least half of the features drift, the
+        default drift share of `DatasetDriftMetric`.
+        """
+        n_drifted = sum(result.drift_detected for result in by_column)
+        return DatasetDriftMetricResults(
+            drift_share=0.5,
+            number_of_columns=len(by_column),
+            number_of_drifted_columns=n_drifted,
+            share_of_drifted_columns=n_drifted / len(by_column),
+            dataset_drift=n_drifted / len(by_column) >= 0.5,
+        )
+
+    def drift_results(reference: dict, current: dict) -> tuple:
+        """Return the drift results of each feature, of the dataset and of the prediction.
+
+        `reference` and `current` are profiles in the layout of the
+        `reference_profile` component of evidently/module_5, with their
+        sketches loaded.
+        """
+        by_column = [
+            _drift_result(name, reference["columns"][name], current["columns"][name], "num")
+            for name in reference["columns"]
+        ]
+        dataset_result = dataset_drift_result(by_column)
+        prediction_result = _drift_result(
+            "prediction", reference["prediction"], current["prediction"], "cat"
+        )
+        return by_column, dataset_result, prediction_result
+
+    def drift_snapshot(
+        results: tuple, timestamp: datetime, metadata: dict, snapshot_id=None
+    ) -> Snapshot:
+        """Return the `data_drift` and `prediction_drift` snapshot of `drift_results`.
+
+        The snapshot holds the same `DatasetDriftMetric` and `ColumnDriftMetric`
+        results as the reports of `batch_monitoring.py`, so that the panels of
+        its dashboard pick it up. It gets a new id unless `snapshot_id` is set.
+        """
+        by_column, dataset_result, prediction_result = results
+        columns = [result.column_name for result in by_column]
+        return Snapshot(
+            id=snapshot_id or new_id(),
+            timestamp=timestamp,
+            metadata=metadata,
+            tags=["data_drift", "prediction_drift"],
+            suite=ContextPayload(
+                metrics=[DatasetDriftMetric(columns=columns), ColumnDriftMetric(column_name="prediction")],
+                metric_results=[dataset_result, prediction_result],
+                tests=[],
+                test_results=[],
+            ),
+            metrics_ids=[0, 1],
+            options=Options(),
+        )
+    # END INLINED
+
+    with open(profile.path) as f:
+        reference = json.load(f)
+    columns = list(reference["columns"])
+    reference_sketches = {
+        "columns": {name: sketch_from_json(reference["columns"][name]) for name in columns},
+        "prediction": sketch_from_json(reference["prediction"]),
+    }
+
+    # The state of a reference profile: the checksum and results of each
+    # partition already processed, and the running sketches of all of them.
+    state_fs, state_path = fsspec.core.url_to_fs(posixpath.join(state_dir, reference["key"]))
+    state_file = posixpath.join(state_path, "state.json")
+    state = {"partitions": {}, "running": None, "running_partitions": []}
+    if state_fs.exists(state_file):
+        with state_fs.open(state_file) as f:
+            state = json.load(f)
+
+    def save_state():
+        state_fs.makedirs(state_path, exist_ok=True)
+        with state_fs.open(state_file, "w") as f:
+            json.dump(state, f)
+
+    def window_file(uri):
+        name = hashlib.sha256(uri.encode()).hexdigest()[:16]
+        return posixpath.join(state_path, "windows", f"{name}.json")
+
+    fs, pattern = fsspec.core.url_to_fs(partitions_uri)
+    protocol = partitions_uri.split("://")[0] + "://" if "://" in partitions_uri else ""
+    partitions = {protocol + path: path for path in sorted(fs.glob(pattern))}
+    checksums = {uri: str(fs.checksum(path)) for uri, path in partitions.items()}
+    new = [
+        uri
+        for uri in partitions
+        if state["partitions"].get(uri, {}).get("checksum") != checksums[uri]
+    ]
+    removed = set(state["partitions"]) - set(partitions)
+
+    session = open_session()
+    model = None
+    n_rows, scan_seconds, upload_seconds = 0, 0.0, 0.0
+    for uri in new:
+        if model is None:
+            mlflow.set_tracking_uri(tracking_uri)
+            version = MlflowClient().get_model_version_by_alias(
+                model_name, "production-live"
+            ).version
+            model = mlflow.pyfunc.load_model(f"models:/{model_name}/{version}")
+
+        start = time.perf_counter()
+        current_columns = {name: new_sketch() for name in columns}
+        current_prediction = new_sketch()
+        for chunk in read_chunks(fs, partitions[uri]):
+            chunk = chunk.drop(columns=["Churn"], errors="ignore")
+            for name in columns:
+                current_columns[name] = sketch_update(current_columns[name], chunk[name])
+            current_prediction = sketch_update(current_prediction, model.predict(chunk))
+        scan_seconds += time.perf_counter() - start
+        n_rows += current_prediction["count"]
+
+        timestamp = window_start(fs, partitions[uri])
+        snapshot = drift_snapshot(
+            drift_results(
+                reference_sketches, {"columns": current_columns, "prediction": current_prediction}
+            ),
+            timestamp,
+            {
+                "reference_profile": reference["key"],
+                "model_version": str(version),
+                "partition": uri,
+            },
+            # The id only depends on the partition and its content: a run that
+            # failed before saving the state uploaded a snapshot with the same
+            # id, which is replaced instead of left as a duplicate.
+            uuid.uuid5(uuid.NAMESPACE_URL, f"{reference['key']}:{uri}:{checksums[uri]}"),
+        )
+        start = time.perf_counter()
+        upload_snapshots(session, workspace, project_id, [snapshot])
+        # A changed partition replaces the snapshot of its window.
+        previous = state["partitions"].get(uri, {}).get("snapshot_id")
+        if previous and previous != str(snapshot.id):
+            delete_snapshot(session, workspace, project_id, previous)
+        upload_seconds += time.perf_counter() - start
+
+        # The state is saved after each window, so that a failed run
+        # resumes after the last partition whose snapshot was uploaded.
+        state_fs.makedirs(posixpath.dirname(window_file(uri)), exist_ok=True)
+        with state_fs.open(window_file(uri), "w") as f:
+            json.dump(
+                {
+                    "columns": {name: sketch_to_json(current_columns[name]) for name in columns},
+                    "prediction": sketch_to_json(current_prediction),
+                },
+                f,
+            )
+        dataset_result, prediction_result = snapshot.suite.metric_results
+        state["partitions"][uri] = {
+            "checksum": checksums[uri],
+            "snapshot_id": str(snapshot.id),
+            "window_start": timestamp.isoformat(),
+            "rows": current_prediction["count"],
+            "model_version": str(version),
+            "share_of_drifted_columns": dataset_result.share_of_drifted_columns,
+            "prediction_drift_score": prediction_result.drift_score,
+        }
+        save_state()
+
+    # The snapshot of a removed partition is deleted. A changed or removed
+    # partition cannot be taken out of the running sketches, which are then
+    # merged again from all the stored windows.
+    for uri in removed:
+        snapshot_id = state["partitions"].pop(uri)["snapshot_id"]
+        delete_snapshot(session, workspace, project_id, snapshot_id)
+    merged = set(state["running_partitions"])
+    if removed or merged & set(new):
+        merged, running = set(), None
+    else:
+        running = state["running"]
+    if running is None:
+        running = {"columns": {name: new_sketch() for name in columns}, "prediction": new_sketch()}
+    else:
+        running = {
+            "columns": {name: sketch_from_json(running["columns"][name]) for name in columns},
+            "prediction": sketch_from_json(running["prediction"]),
+        }
+    for uri in state["partitions"]:
+        if uri in merged:
+            continue
+        with state_fs.open(window_file(uri)) as f:
+            window = json.load(f)
+        for name in columns:
+            running["columns"][name] = sketch_merge(
+                running["columns"][name], sketch_from_json(window["columns"][name])
+            )
+        running["prediction"] = sketch_merge(
+            running["prediction"], sketch_from_json(window["prediction"])
+        )
+    state["running"] = {
+        "columns": {name: sketch_to_json(s) for name, s in running["columns"].items()},
+        "prediction": sketch_to_json(running["prediction"]),
+    }
+    state["running_partitions"] = list(state["partitions"])
+    save_state()
+
+    # Same layout as the reference profile.
+    with open(running_profile.path, "w") as f:
+        json.dump(
+            {
+                "key": reference["key"],
+                "model_name": reference["model_name"],
+                "model_version": reference["model_version"],
+                **state["running"],
+            },
+            f,
+        )
+
+    metrics.log_metric("partitions", len(partitions))
+    metrics.log_metric("new_partitions", len(new))
+    metrics.log_metric("rows", n_rows)
+    metrics.log_metric("running_rows", running["prediction"]["count"])
+    metrics.log_metric("scan_seconds", round(scan_seconds, 3))
+    metrics.log_metric("upload_seconds", round(upload_seconds, 3))
+
+
+@dsl.component(
+    base_image="python:3.12", packages_to_install=["pandas", "pyarrow", "evidently==0.6.6"]
 )
 def post_process(
     features: dsl.Input[dsl.Dataset],
     target: dsl.Input[dsl.Dataset],
     predictions: dsl.Input[dsl.Dataset],
     output_dataset: dsl.Output[dsl.Dataset],
+    data_format: str = "parquet",
 ):
     import pandas as pd
+    import pyarrow as pa
 
-    df = pd.read_csv(features.path)
-    df["predictions"] = pd.read_csv(predictions.path)
-    df["Churn"] = pd.read_csv(target.path)
-    df.to_csv(output_dataset.path, index=False)
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset write_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def write_dataset(df, dataset, data_format: str):
+        """Write `df` to the `dataset` artifact as "parquet", "arrow" or "csv".
+
+        The format is recorded in the `format` metadata of the artifact.
+        """
+        # Arrow IPC is written uncompressed and as a single record batch, so
+        # that readers can memory-map its columns without copying them.
+        dataset.metadata["format"] = data_format
+        if data_format == "parquet":
+            df.to_parquet(dataset.path, index=False)
+        elif data_format == "arrow":
+            df.reset_index(drop=True).to_feather(
+                dataset.path, compression="uncompressed", chunksize=max(len(df), 1)
+            )
+        elif data_format == "csv":
+            df.to_csv(dataset.path, index=False)
+        else:
+            raise ValueError(f"Unknown data format {data_format!r}")
+
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    df = read_dataset(features)
+    df["predictions"] = read_dataset(predictions)
+    df["Churn"] = read_dataset(target)
+    write_dataset(df, output_dataset, data_format)
 
 
 @dsl.pipeline(name="inference_pipeline")
@@ -162,53 +2205,147 @@ def inference_pipeline(
     reference_dataset_uri: str,
     workspace: str,
     project_id: str,
+    chunk_size: int = 0,
+    workers: int = 1,
+    data_format: str = "parquet",
+    fused_monitoring: bool = False,
+    reference_profile_dir: str = "",
+    compact_snapshots: bool = False,
+    profile_test_suites: bool = True,
 ):
-    load_reference_data_task = load_data(
-        dataset_uri=reference_dataset_uri
-    ).set_display_name("Load Reference Data")
-    load_data_task = load_data(dataset_uri=churn_dataset_uri).set_display_name(
-        "Load Current Data"
-    )
-    data_quality_task = data_quality(
-        reference_features=load_reference_data_task.outputs["features"],
-        current_features=load_data_task.outputs["features"],
-        workspace=workspace,
-        project_id=project_id,
-    ).set_display_name("Data Quality")
-    data_drift_task = data_drift(
-        reference_features=load_reference_data_task.outputs["features"],
-        current_features=load_data_task.outputs["features"],
-        workspace=workspace,
-        project_id=project_id,
-    ).set_display_name("Data Drift")
-
+    load_data_task = load_data(
+        dataset_uri=churn_dataset_uri, data_format=data_format
+    ).set_display_name("Load Current Data")
     predict_current_task = predict(
         features=load_data_task.outputs["features"],
         model_name=model_name,
         tracking_uri=tracking_uri,
+        chunk_size=chunk_size,
+        workers=workers,
+        data_format=data_format,
     ).set_display_name("Predict Current")
 
-    # If Reference Predictions weren't saved, we need to predict them
-    predict_reference_task = predict(
-        features=load_reference_data_task.outputs["features"],
-        model_name=model_name,
-        tracking_uri=tracking_uri,
-    ).set_display_name("Predict Reference")
+    # With a profile directory, the reference data is only loaded and
+    # predicted again when it or the production model changed.
+    with dsl.If(reference_profile_dir != ""):
+        reference_profile_task = reference_profile(
+            reference_dataset_uri=reference_dataset_uri,
+            model_name=model_name,
+            tracking_uri=tracking_uri,
+            profile_dir=reference_profile_dir,
+        ).set_display_name("Reference Profile")
+        profile_drift_task = profile_drift(
+            profile=reference_profile_task.outputs["profile"],
+            current_features=load_data_task.outputs["features"],
+            current_predictions=predict_current_task.outputs["predictions"],
+            workspace=workspace,
+            project_id=project_id,
+        ).set_display_name("Profile Drift")
+        # The test suites need the reference rows, but not their predictions.
+        with dsl.If(profile_test_suites == True):
+            load_profiled_reference_task = load_data(
+                dataset_uri=reference_dataset_uri, data_format=data_format
+            ).set_display_name("Load Reference Data")
+            profile_data_quality_task = data_quality(
+                reference_features=load_profiled_reference_task.outputs["features"],
+                current_features=load_data_task.outputs["features"],
+                workspace=workspace,
+                project_id=project_id,
+                compact=compact_snapshots,
+            ).set_display_name("Data Quality")
+            profile_data_drift_task = data_drift(
+                reference_features=load_profiled_reference_task.outputs["features"],
+                current_features=load_data_task.outputs["features"],
+                workspace=workspace,
+                project_id=project_id,
+                compact=compact_snapshots,
+                drift_report=False,
+            ).set_display_name("Data Drift Test Suite")
+    with dsl.Else():
+        load_reference_data_task = load_data(
+            dataset_uri=reference_dataset_uri, data_format=data_format
+        ).set_display_name("Load Reference Data")
 
-    target_drift_task = prediction_drift(
-        reference_target=predict_reference_task.outputs["predictions"],
-        current_target=predict_current_task.outputs["predictions"],
-        workspace=workspace,
-        project_id=project_id,
-    ).set_display_name("Target Drift")
+        # If Reference Predictions weren't saved, we need to predict them
+        predict_reference_task = predict(
+            features=load_reference_data_task.outputs["features"],
+            model_name=model_name,
+            tracking_uri=tracking_uri,
+            chunk_size=chunk_size,
+            workers=workers,
+            data_format=data_format,
+        ).set_display_name("Predict Reference")
+
+        with dsl.If(fused_monitoring == True):
+            monitoring_task = monitoring(
+                reference_features=load_reference_data_task.outputs["features"],
+                current_features=load_data_task.outputs["features"],
+                reference_predictions=predict_reference_task.outputs["predictions"],
+                current_predictions=predict_current_task.outputs["predictions"],
+                workspace=workspace,
+                project_id=project_id,
+                compact=compact_snapshots,
+            ).set_display_name("Monitoring")
+        with dsl.Else():
+            data_quality_task = data_quality(
+                reference_features=load_reference_data_task.outputs["features"],
+                current_features=load_data_task.outputs["features"],
+                workspace=workspace,
+                project_id=project_id,
+                compact=compact_snapshots,
+            ).set_display_name("Data Quality")
+            data_drift_task = data_drift(
+                reference_features=load_reference_data_task.outputs["features"],
+                current_features=load_data_task.outputs["features"],
+                workspace=workspace,
+                project_id=project_id,
+                compact=compact_snapshots,
+            ).set_display_name("Data Drift")
+            target_drift_task = prediction_drift(
+                reference_target=predict_reference_task.outputs["predictions"],
+                current_target=predict_current_task.outputs["predictions"],
+                workspace=workspace,
+                project_id=project_id,
+                compact=compact_snapshots,
+            ).set_display_name("Target Drift")
 
     post_process_task = post_process(
         features=load_data_task.outputs["features"],
         target=load_data_task.outputs["target"],
         predictions=predict_current_task.outputs["predictions"],
+        data_format=data_format,
     ).set_display_name("Post Process")
 
 
+@dsl.pipeline(name="incremental_monitoring_pipeline")
+def incremental_monitoring_pipeline(
+    partitions_uri: str,
+    model_name: str,
+    tracking_uri: str,
+    reference_dataset_uri: str,
+    workspace: str,
+    project_id: str,
+    reference_profile_dir: str,
+    state_dir: str,
+):
+    # Each run only scans the partitions that arrived since the previous one.
+    reference_profile_task = reference_profile(
+        reference_dataset_uri=reference_dataset_uri,
+        model_name=model_name,
+        tracking_uri=tracking_uri,
+        profile_dir=reference_profile_dir,
+    ).set_display_name("Reference Profile")
+    incremental_drift_task = incremental_drift(
+        profile=reference_profile_task.outputs["profile"],
+        partitions_uri=partitions_uri,
+        model_name=model_name,
+        tracking_uri=tracking_uri,
+        state_dir=state_dir,
+        workspace=workspace,
+        project_id=project_id,
+    ).set_display_name("Incremental Drift")
+
+
 if __name__ == "__main__":
 
     PIPELINE_PACKAGE_PATH = "pipeline.yaml"
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+from datetime import timedelta
+
+import pytest
+from evidently.core import new_id
+from evidently.ui.dashboards import DashboardPanelPlot
+from evidently.ui.storage.common import NO_USER
+from evidently.ui.storage.local import create_local_project_manager
+from evidently.ui.workspace import Workspace
+from evidently.utils import NumpyEncoder
+from watchdog.events import FileCreatedEvent, FileModifiedEvent
+
+from batch_monitoring import create_project
+from benchmark_dashboard_index import START, add_runs, as_json, run_snapshots
+from dashboard_index import IndexedDirHandler, create_indexed_project_manager
+
+
+@pytest.fixture(scope="module")
+def snapshots():
+    return run_snapshots()
+
+
+@pytest.fixture
+def workspace(tmp_path, snapshots):
+    path = str(tmp_path)
+    project_id = create_project(Workspace(path)).id
+    add_runs(path, project_id, snapshots, 0, 3)
+    return path, project_id
+
+
+async def load_dashboard(project_manager, project_id, timestamp_start=None):
+    """The points of the plot panels, by `load_points`, and the dashboard sent by the UI."""
+    project = await project_manager.get_project(NO_USER.id, project_id)
+    points = []
+    for panel in project.dashboard.panels:
+        if not isinstance(panel, DashboardPanelPlot):
+            continue
+        values = await project_manager.data_storage.load_points(
+            project_id, panel.filter, panel.values, timestamp_start, None
+        )
+        points.append(
+            [
+                {
+                    metric.get_fingerprint(): sorted(
+                        (p.timestamp, p.snapshot_id, p.value) for p in metric_points
+                    )
+                    for metric, metric_points in by_metric.items()
+                }
+                for by_metric in values
+            ]
+        )
+    dashboard = await project.build_dashboard_info_async(timestamp_start, None)
+    return points, as_json(dashboard)
+
+
+def assert_same_dashboard(indexed, path, project_id):
+    # A new stock project manager reads the workspace as it is now on disk.
+    stock = create_local_project_manager(path, autorefresh=False)
+    for timestamp_start in [None, START + timedelta(days=1)]:
+        expected = asyncio.run(load_dashboard(stock, project_id, timestamp_start))
+        assert asyncio.run(load_dashboard(indexed, project_id, timestamp_start)) == expected
+        assert any(expected[0])
+
+
+def test_indexed_storage_matches_stock_storage(workspace, snapshots):
+    path, project_id = workspace
+    indexed = create_indexed_project_manager(path, autorefresh=False)
+    assert_same_dashboard(indexed, path, project_id)
+
+    added = [
+        s.copy(update={"id": new_id(), "timestamp": START + timedelta(days=3)}) for s in snapshots
+    ]
+    for s in added:
+        asyncio.run(indexed.add_snapshot(NO_USER.id, project_id, s))
+    assert_same_dashboard(indexed, path, project_id)
+
+    asyncio.run(indexed.delete_snapshot(NO_USER.id, project_id, added[2].id))
+    assert_same_dashboard(indexed, path, project_id)
+
+
+def test_watcher_updates_the_index(workspace, snapshots):
+    path, project_id = workspace
+    indexed = create_indexed_project_manager(path, autorefresh=False)
+    handler = IndexedDirHandler(indexed.data_storage.state)
+    assert_same_dashboard(indexed, path, project_id)
+
+    # A run written by another process, seen first while its file is being written.
+    snapshot = snapshots[2].copy(update={"id": new_id(), "timestamp": START + timedelta(days=3)})
+    snapshot_path = os.path.join(path, str(project_id), "snapshots", f"{snapshot.id}.json")
+    content = json.dumps(snapshot.dict(), cls=NumpyEncoder)
+    with open(snapshot_path, "w") as f:
+        f.write(content[: len(content) // 2])
+    handler.dispatch(FileCreatedEvent(snapshot_path))
+    with open(snapshot_path, "w") as f:
+        f.write(content)
+    handler.dispatch(FileModifiedEvent(snapshot_path))
+    assert_same_dashboard(indexed, path, project_id)
@@ -0,0 +1,265 @@
+import json
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import fsspec
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from evidently._pydantic_compat import parse_obj_as
+from evidently.core import BaseResult, IncludeTags, get_all_fields_tags
+from evidently.errors import EvidentlyError
+from evidently.suite.base_suite import Snapshot
+from evidently.ui.managers.projects import ProjectManager
+from evidently.ui.storage.common import NoopAuthManager
+from evidently.ui.workspace.remote import (
+    NoopBlobStorage,
+    NoopDataStorage,
+    RemoteProjectMetadataStorage,
+    RemoteWorkspace,
+)
+from evidently.utils import NumpyEncoder
+
+
+def open_session(pool_size: int = 4, retries: int = 3) -> requests.Session:
+    """Return a session keeping up to `pool_size` connections alive and retrying failed requests.
+
+    Only the requests that the server did not process are retried, `retries`
+    times with exponential backoff: those whose connection could not be
+    opened, and those answered with a 429, 502 or 503 status. A request
+    that failed after being sent, or that timed out, is not retried, since
+    an upload may then have been stored already.
+    """
+    retry = Retry(
+        total=retries,
+        read=False,
+        other=0,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503],
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def upload_snapshots(session, workspace: str, project_id, snapshots: list):
+    """Upload `snapshots` concurrently, each with the request of `RemoteWorkspace.add_snapshot`."""
+    url = urllib.parse.urljoin(workspace, f"/api/projects/{project_id}/snapshots")
+
+    def upload(snapshot):
+        body = json.dumps(snapshot.dict(), allow_nan=True, cls=NumpyEncoder).encode("utf8")
+        response = session.post(
+            url, data=body, headers={"Content-Type": "application/json"}, timeout=60
+        )
+        response.raise_for_status()
+
+    if not snapshots:
+        return
+    with ThreadPoolExecutor(len(snapshots)) as executor:
+        list(executor.map(upload, snapshots))
+
+
+def delete_snapshot(session, workspace: str, project_id, snapshot_id):
+    """Delete a snapshot with the request of `RemoteWorkspace.delete_snapshot`.
+
+    A snapshot already deleted, for instance by a run that failed before
+    recording it, is not an error.
+    """
+    url = urllib.parse.urljoin(workspace, f"/api/projects/{project_id}/{snapshot_id}")
+    response = session.delete(url, timeout=60)
+    if response.status_code != 404:
+        response.raise_for_status()
+
+
+def _strip_result(result):
+    # Optional fields only used to render the report (plots, distributions,
+    # examples) are reset to their default, at every level of the result.
+    update = {}
+    tags = get_all_fields_tags(type(result))
+    for name, field in result.__fields__.items():
+        value = getattr(result, name)
+        if tags.get(name, set()) & {IncludeTags.Render, IncludeTags.Extra} and not field.required:
+            update[name] = field.default
+        elif isinstance(value, BaseResult):
+            update[name] = _strip_result(value)
+        elif isinstance(value, dict):
+            update[name] = {
+                k: _strip_result(v) if isinstance(v, BaseResult) else v for k, v in value.items()
+            }
+        elif isinstance(value, list):
+            update[name] = [_strip_result(v) if isinstance(v, BaseResult) else v for v in value]
+    return result.copy(update=update)
+
+
+def compact_snapshot(snapshot: Snapshot, detail: str = None) -> Snapshot:
+    """Return `snapshot` with only what the dashboard panels read.
+
+    A report keeps its first level metrics, without the metrics they were
+    computed from, and a test suite its test results, without any metric.
+    In the results kept, the fields only used to render the report are
+    dropped. `detail` is the URI of the full snapshot, see `add_detail`.
+    """
+    suite = snapshot.suite
+    metadata = {**snapshot.metadata, "snapshot": "compact"}
+    if detail:
+        metadata["detail"] = detail
+    return snapshot.copy(
+        update={
+            "metadata": metadata,
+            "suite": suite.copy(
+                update={
+                    "metrics": [suite.metrics[i] for i in snapshot.metrics_ids],
+                    "metric_results": [
+                        _strip_result(suite.metric_results[i]) for i in snapshot.metrics_ids
+                    ],
+                    "test_results": [_strip_result(r) for r in suite.test_results],
+                }
+            ),
+            "metrics_ids": list(range(len(snapshot.metrics_ids))),
+        }
+    )
+
+
+def prepare_snapshots(suites: list, detail, compact: bool = False) -> list:
+    """Return the snapshots of `suites` (reports, test suites or snapshots) to upload.
+
+    `detail` is the `snapshot_detail` output artifact of a component: a JSON
+    file mapping snapshot ids to full snapshots. With `compact`, the
+    snapshots returned are compact, and the full ones are saved in `detail`
+    to restore them, see `add_detail`. Otherwise the full snapshots are
+    uploaded as they are and `detail` is an empty mapping.
+    """
+    full = [s if isinstance(s, Snapshot) else s.to_snapshot() for s in suites]
+    with open(detail.path, "w") as f:
+        if not compact:
+            f.write("{}")
+            return full
+        json.dump({str(s.id): s.dict() for s in full}, f, allow_nan=True, cls=NumpyEncoder)
+    return [compact_snapshot(s, detail.uri) for s in full]
+
+
+class PooledProjectMetadataStorage(RemoteProjectMetadataStorage):
+    """RemoteWorkspace storage sending all requests through one `requests.Session`.
+
+    Evidently opens a new session, and thus a new connection, for every
+    request. Here connections are kept alive and reused, failed requests are
+    retried, and project lookups are cached.
+    """
+
+    def __init__(self, base_url: str, secret: str, session, timeout: float):
+        super().__init__(base_url, secret)
+        self.session = session
+        self.timeout = timeout
+        self._projects = {}
+
+    def _request(
+        self,
+        path,
+        method,
+        query_params=None,
+        body=None,
+        response_model=None,
+        cookies=None,
+        headers=None,
+        form_data=False,
+    ):
+        request = self.session.prepare_request(
+            self._prepare_request(path, method, query_params, body, cookies, headers, form_data)
+        )
+        response = self.session.send(request, timeout=self.timeout)
+        if response.status_code >= 400:
+            try:
+                raise EvidentlyError(response.json()["detail"])
+            except (ValueError, KeyError, TypeError):
+                pass
+        response.raise_for_status()
+        if response_model is not None:
+            return parse_obj_as(response_model, response.json())
+        return response
+
+    async def get_project(self, project_id):
+        if project_id not in self._projects:
+            project = await super().get_project(project_id)
+            if project is None:
+                return None
+            self._projects[project_id] = project
+        return self._projects[project_id]
+
+    async def update_project(self, project):
+        project = await super().update_project(project)
+        self._projects[project.id] = project
+        return project
+
+    async def delete_project(self, project_id):
+        self._projects.pop(project_id, None)
+        return await super().delete_project(project_id)
+
+
+class PooledWorkspace(RemoteWorkspace):
+    """`RemoteWorkspace` with pooled connections, retries and batched snapshot uploads.
+
+    Failed requests are retried `retries` times, see `open_session`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        secret: str = None,
+        pool_size: int = 4,
+        retries: int = 3,
+        timeout: float = 60.0,
+    ):
+        self.base_url = base_url
+        self.secret = secret
+        self.pool_size = pool_size
+        self.session = open_session(pool_size, retries)
+        self.storage = PooledProjectMetadataStorage(base_url, secret, self.session, timeout)
+        project_manager = ProjectManager(
+            project_metadata=self.storage,
+            blob_storage=NoopBlobStorage(),
+            data_storage=NoopDataStorage(),
+            auth_manager=NoopAuthManager(),
+        )
+        super(RemoteWorkspace, self).__init__(None, project_manager)
+        self.verify()
+
+    def add_snapshots(self, project_id, snapshots: list, compact: bool = False):
+        """Upload `snapshots` (or reports and test suites) concurrently over the pooled connections.
+
+        With `compact`, only what the dashboard panels read is uploaded, see `compact_snapshot`.
+        """
+        snapshots = [s if isinstance(s, Snapshot) else s.to_snapshot() for s in snapshots]
+        if compact:
+            snapshots = [compact_snapshot(s) for s in snapshots]
+        path = f"/api/projects/{project_id}/snapshots"
+
+        def upload(snapshot):
+            self.storage._request(path, "POST", body=snapshot.dict())
+
+        if len(snapshots) <= 1 or self.pool_size <= 1:
+            for snapshot in snapshots:
+                upload(snapshot)
+            return
+        with ThreadPoolExecutor(min(self.pool_size, len(snapshots))) as executor:
+            list(executor.map(upload, snapshots))
+
+    def add_detail(self, project_id, detail: str, snapshot_id=None):
+        """Replace compact snapshots by the full ones stored at `detail`.
+
+        `detail` is the `detail` metadata of a compact snapshot: a JSON file
+        mapping snapshot ids to full snapshots, like the `snapshot_detail`
+        output of the module-5 components. The full snapshots keep their ids, so
+        they replace the compact ones in the workspace.
+        """
+        with fsspec.open(detail) as f:
+            snapshots = json.load(f)
+        if snapshot_id is not None:
+            snapshots = {str(snapshot_id): snapshots[str(snapshot_id)]}
+        self.add_snapshots(project_id, [parse_obj_as(Snapshot, s) for s in snapshots.values()])
+
+    def close(self):
+        self.session.close()
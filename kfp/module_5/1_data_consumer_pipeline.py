@@ -1,4 +1,3 @@
-import google.cloud.aiplatform as aip
 from kfp import dsl
 from kfp import compiler
 
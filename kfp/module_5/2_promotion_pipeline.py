@@ -1,5 +1,3 @@
-import google.cloud.aiplatform as aip
-
 from kfp import dsl
 from kfp import compiler
 
@@ -42,6 +40,8 @@ if __name__ == "__main__":
     LOCATION = "europe-west9"
     PROJECT_ID = "formation-mlops"
     compiler.Compiler().compile(model_promotion_decision_pipeline, PIPELINE_PACKAGE_PATH)
+    import google.cloud.aiplatform as aip
+
     aip.init(
         project=PROJECT_ID,
         location=LOCATION,
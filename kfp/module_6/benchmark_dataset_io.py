@@ -0,0 +1,83 @@
+import argparse
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import inference_pipeline
+import training_pipeline
+from benchmark_predict import DATA_DIR, Metrics, enlarge, register_model
+from dataset_io import read_dataset
+
+FORMATS = ["csv", "parquet", "arrow"]
+
+
+def dataset(tmp_dir: str, name: str):
+    return SimpleNamespace(path=os.path.join(tmp_dir, name), metadata={})
+
+
+def run(data_format: str, dataset_path: str, tracking_uri: str, tmp_dir: str) -> dict:
+    """Time the dataset hops of the training and inference pipelines for one format."""
+    timings = {}
+    splits = {name: dataset(tmp_dir, name) for name in ["x_train", "y_train", "x_test", "y_test"]}
+    start = time.perf_counter()
+    training_pipeline.load_data.python_func(
+        test_size_ratio=0.2, dataset_uri=dataset_path, data_format=data_format, **splits
+    )
+    timings["load_data"] = time.perf_counter() - start
+
+    # train_model reads the four splits and evaluate_model the two test ones.
+    start = time.perf_counter()
+    for name in ["x_train", "y_train", "x_test", "y_test", "x_test", "y_test"]:
+        read_dataset(splits[name])
+    timings["train+evaluate reads"] = time.perf_counter() - start
+
+    features = dataset(tmp_dir, "features")
+    predictions = dataset(tmp_dir, "predictions")
+    inference_pipeline.load_data.python_func(
+        dataset_uri=dataset_path, features=features, data_format=data_format
+    )
+    metrics = Metrics()
+    inference_pipeline.predict.python_func(
+        features=features,
+        model_name="ChurnPrediction",
+        tracking_uri=tracking_uri,
+        predictions=predictions,
+        metrics=metrics,
+        data_format=data_format,
+    )
+    timings["predict"] = metrics.values["scoring_seconds"]
+
+    artifacts = list(splits.values()) + [features, predictions]
+    timings["size_mib"] = sum(os.path.getsize(a.path) for a in artifacts) / 1024**2
+    for artifact in artifacts:
+        os.remove(artifact.path)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the I/O time and size of the datasets passed between the "
+        "pipeline components for each data_format."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--dataset", type=str, default=os.path.join(DATA_DIR, "churn_data_2025_03.csv")
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tracking_uri = f"sqlite:///{tmp_dir}/mlflow.db"
+        register_model(tracking_uri, os.path.join(tmp_dir, "artifacts"), "ChurnPrediction", 5, 2)
+        dataset_path = os.path.join(tmp_dir, "dataset.csv")
+        enlarge(args.dataset, args.rows, dataset_path, keep_target=True)
+
+        print(f"{args.rows} rows, load_data includes parsing the source CSV")
+        print(f"{'format':<8} {'load_data':>10} {'train+evaluate reads':>21} {'predict':>8} {'size':>9}")
+        for data_format in FORMATS:
+            timings = run(data_format, dataset_path, tracking_uri, tmp_dir)
+            print(
+                f"{data_format:<8} {timings['load_data']:>9.2f}s "
+                f"{timings['train+evaluate reads']:>20.2f}s {timings['predict']:>7.2f}s "
+                f"{timings['size_mib']:>6.1f} MiB"
+            )
@@ -0,0 +1,120 @@
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+from inference_pipeline import predict
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+
+
+class Metrics:
+    """Stand-in for the `dsl.Metrics` artifact when calling the component locally."""
+
+    def __init__(self):
+        self.values = {}
+
+    def log_metric(self, metric: str, value):
+        self.values[metric] = value
+
+
+def register_model(
+    tracking_uri: str, artifact_location: str, model_name: str, n_estimators: int, max_depth: int
+):
+    import mlflow
+    from mlflow.tracking import MlflowClient
+    from sklearn.ensemble import RandomForestClassifier
+
+    mlflow.set_tracking_uri(tracking_uri)
+    df = pd.read_csv(os.path.join(DATA_DIR, "churn_data_2025_03.csv"))
+    model = RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=max_depth, random_state=42
+    ).fit(df.drop(columns=["Churn"]), df["Churn"])
+    experiment_id = mlflow.create_experiment("benchmark_predict", artifact_location)
+    with mlflow.start_run(experiment_id=experiment_id):
+        model_info = mlflow.sklearn.log_model(
+            model, "model", registered_model_name=model_name
+        )
+    MlflowClient().set_registered_model_alias(
+        model_name, "production-live", model_info.registered_model_version
+    )
+
+
+def enlarge(dataset_path: str, rows: int, output_path: str, keep_target: bool = False):
+    """Write the features of `dataset_path` repeated up to `rows` rows."""
+    df = pd.read_csv(dataset_path)
+    if not keep_target:
+        df = df.drop(columns=["Churn"])
+    block = pd.concat([df] * max(1, 100_000 // len(df)))
+    with open(output_path, "w", newline="") as f:
+        written = 0
+        while written < rows:
+            part = block.iloc[: rows - written]
+            part.to_csv(f, header=written == 0, index=False)
+            written += len(part)
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Score an enlarged churn dataset with the predict component "
+        "for several numbers of worker processes."
+    )
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=str, default=f"1,2,4,{os.cpu_count()}")
+    parser.add_argument("--chunk_size", type=int, default=100_000)
+    parser.add_argument(
+        "--dataset", type=str, default=os.path.join(DATA_DIR, "churn_data_2025_05.csv")
+    )
+    parser.add_argument("--n_estimators", type=int, default=5)
+    parser.add_argument("--max_depth", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tracking_uri = f"sqlite:///{tmp_dir}/mlflow.db"
+        register_model(
+            tracking_uri,
+            os.path.join(tmp_dir, "artifacts"),
+            "ChurnPrediction",
+            args.n_estimators,
+            args.max_depth,
+        )
+        features_path = os.path.join(tmp_dir, "features.csv")
+        enlarge(args.dataset, args.rows, features_path)
+        print(f"{args.rows} rows, {os.path.getsize(features_path) / 1024**2:.0f} MiB of CSV, "
+              f"{os.cpu_count()} CPUs")
+
+        reference_digest = None
+        for workers in sorted({int(w) for w in args.workers.split(",") if w}):
+            predictions_path = os.path.join(tmp_dir, f"predictions_{workers}.csv")
+            metrics = Metrics()
+            start = time.perf_counter()
+            predict.python_func(
+                features=SimpleNamespace(path=features_path),
+                model_name="ChurnPrediction",
+                tracking_uri=tracking_uri,
+                predictions=SimpleNamespace(path=predictions_path),
+                metrics=metrics,
+                chunk_size=args.chunk_size,
+                workers=workers,
+            )
+            total = time.perf_counter() - start
+            digest = file_digest(predictions_path)
+            reference_digest = reference_digest or digest
+            os.remove(predictions_path)
+            print(
+                f"workers={workers:>2}  {metrics.values['rows_per_second']:>10.0f} rows/s  "
+                f"scoring {metrics.values['scoring_seconds']:6.1f}s  total {total:6.1f}s  "
+                f"same output: {digest == reference_digest}"
+            )
+            if digest != reference_digest:
+                sys.exit(1)
@@ -0,0 +1,38 @@
+import pandas as pd
+import pyarrow as pa
+
+
+def write_dataset(df, dataset, data_format: str):
+    """Write `df` to the `dataset` artifact as "parquet", "arrow" or "csv".
+
+    The format is recorded in the `format` metadata of the artifact.
+    """
+    # Arrow IPC is written uncompressed and as a single record batch, so
+    # that readers can memory-map its columns without copying them.
+    dataset.metadata["format"] = data_format
+    if data_format == "parquet":
+        df.to_parquet(dataset.path, index=False)
+    elif data_format == "arrow":
+        df.reset_index(drop=True).to_feather(
+            dataset.path, compression="uncompressed", chunksize=max(len(df), 1)
+        )
+    elif data_format == "csv":
+        df.to_csv(dataset.path, index=False)
+    else:
+        raise ValueError(f"Unknown data format {data_format!r}")
+
+
+def read_dataset(dataset):
+    """Read the `dataset` artifact written by `write_dataset`, in any format."""
+    # Detect the format from the file itself, so that CSV artifacts of
+    # previous runs can still be read.
+    with open(dataset.path, "rb") as f:
+        magic = f.read(6)
+    if magic[:4] == b"PAR1":
+        return pd.read_parquet(dataset.path)
+    if magic == b"ARROW1":
+        # The columns point into the memory-mapped file, whose pages are
+        # shared by every reader on the node, instead of private copies.
+        table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+        return table.to_pandas(split_blocks=True)
+    return pd.read_csv(dataset.path)
@@ -1,5 +1,3 @@
-import google.cloud.aiplatform as aip
-
 from kfp import dsl, compiler
 
 
@@ -9,46 +7,408 @@ from kfp import dsl, compiler
         "fsspec",
         "gcsfs",
         "pandas",
+        "pyarrow",
         "scikit-learn",
     ],
 )
-def load_data(dataset_uri: str, features: dsl.Output[dsl.Dataset]):
+def load_data(
+    dataset_uri: str, features: dsl.Output[dsl.Dataset], data_format: str = "parquet"
+):
     import pandas as pd
 
+    # BEGIN INLINED kfp/module_6/dataset_io.py: write_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def write_dataset(df, dataset, data_format: str):
+        """Write `df` to the `dataset` artifact as "parquet", "arrow" or "csv".
+
+        The format is recorded in the `format` metadata of the artifact.
+        """
+        # Arrow IPC is written uncompressed and as a single record batch, so
+        # that readers can memory-map its columns without copying them.
+        dataset.metadata["format"] = data_format
+        if data_format == "parquet":
+            df.to_parquet(dataset.path, index=False)
+        elif data_format == "arrow":
+            df.reset_index(drop=True).to_feather(
+                dataset.path, compression="uncompressed", chunksize=max(len(df), 1)
+            )
+        elif data_format == "csv":
+            df.to_csv(dataset.path, index=False)
+        else:
+            raise ValueError(f"Unknown data format {data_format!r}")
+    # END INLINED
+
     df = pd.read_csv(dataset_uri)
     features_df = df.drop(columns=["Churn"])
-    features_df.to_csv(features.path, index=False)
+    write_dataset(features_df, features, data_format)
 
 
 @dsl.component(
-    base_image="python:3.11", packages_to_install=["pandas", "scikit-learn", "mlflow"]
+    base_image="python:3.11",
+    packages_to_install=["pandas", "pyarrow", "scikit-learn", "mlflow"],
 )
 def predict(
     features: dsl.Input[dsl.Dataset],
     model_name: str,
     tracking_uri: str,
     predictions: dsl.Output[dsl.Dataset],
+    metrics: dsl.Output[dsl.Metrics],
+    model_cache_dir: str = "",
+    model_cache_max_bytes: int = 2 * 1024**3,
+    chunk_size: int = 0,
+    workers: int = 1,
+    data_format: str = "parquet",
 ):
+    import itertools
+    import resource
+    import time
+    import numpy as np
     import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
     import mlflow
 
+    # BEGIN INLINED kserve/module_2/model_cache.py: ModelCache
+    # Generated by sync_inlined.py, edit the file above instead.
+    import hashlib
+    import json
+    import os
+    import shutil
+    import tempfile
+
+    MANIFEST = "cache_manifest.json"
+
+    def _tree_checksum(path: str) -> str:
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file_name in sorted(files):
+                if file_name == MANIFEST:
+                    continue
+                file_path = os.path.join(root, file_name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                with open(file_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+        return digest.hexdigest()
+
+    def _tree_stat(path: str) -> list:
+        """The relative path, size and modification time of each file of `path`."""
+        stat = []
+        for root, _, files in os.walk(path):
+            for file_name in files:
+                if file_name == MANIFEST:
+                    continue
+                file_path = os.path.join(root, file_name)
+                file_stat = os.stat(file_path)
+                stat.append(
+                    [os.path.relpath(file_path, path), file_stat.st_size, file_stat.st_mtime_ns]
+                )
+        return sorted(stat)
+
+    def _tree_size(path: str) -> int:
+        return sum(
+            os.path.getsize(os.path.join(root, file_name))
+            for root, _, files in os.walk(path)
+            for file_name in files
+        )
+
+    class ModelCache:
+        """Content-addressed on-disk cache of registered MLflow models.
+
+        Entries are keyed by model name, resolved version and the model source, so
+        `models:/<name>@<alias>` only hits the tracking server to resolve the alias.
+        The artifact checksum is computed once, when an entry is downloaded, and
+        stored next to it with the size and modification time of its files. A
+        read only hashes the files again if one of those changed.
+        The least recently used entries are evicted once `max_bytes` is exceeded.
+
+        `client` resolves the versions, with the `get_model_version_by_alias` and
+        `get_model_version` methods of an `MlflowClient` or functions of `registry`.
+        """
+
+        def __init__(
+            self, cache_dir: str, client, max_bytes: int = 2 * 1024**3, verify: bool = True
+        ):
+            self.cache_dir = cache_dir
+            self.client = client
+            self.max_bytes = max_bytes
+            self.verify = verify
+            os.makedirs(cache_dir, exist_ok=True)
+
+        def _model_version(self, model_uri: str):
+            reference = model_uri[len("models:/"):]
+            if "@" in reference:
+                registered_name, alias = reference.split("@", 1)
+                return self.client.get_model_version_by_alias(registered_name, alias)
+            registered_name, version = reference.split("/", 1)
+            return self.client.get_model_version(registered_name, version)
+
+        def _entry_path(self, model_version) -> str:
+            key = hashlib.sha256(
+                f"{model_version.name}\0{model_version.version}\0{model_version.source}".encode()
+            ).hexdigest()
+            return os.path.join(self.cache_dir, key)
+
+        def _read_manifest(self, entry: str):
+            try:
+                with open(os.path.join(entry, MANIFEST)) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+
+        def _write_manifest(self, entry: str, manifest: dict):
+            with open(os.path.join(entry, MANIFEST), "w") as f:
+                json.dump(manifest, f)
+
+        def _is_intact(self, entry: str, manifest: dict) -> bool:
+            if not self.verify:
+                return True
+            stat = _tree_stat(entry)
+            if manifest.get("stat") == stat:
+                return True
+            if manifest["checksum"] != _tree_checksum(entry):
+                return False
+            # Same content, but touched or copied: no need to hash it again next time.
+            manifest["stat"] = stat
+            self._write_manifest(entry, manifest)
+            return True
+
+        def local_path(self, model_uri: str) -> str:
+            """Return a local copy of `model_uri`, downloading it on a cache miss."""
+            if not model_uri.startswith("models:/"):
+                return model_uri
+            model_version = self._model_version(model_uri)
+            entry = self._entry_path(model_version)
+            manifest = self._read_manifest(entry)
+            if manifest is not None and self._is_intact(entry, manifest):
+                os.utime(os.path.join(entry, MANIFEST))
+                return entry
+            shutil.rmtree(entry, ignore_errors=True)
+
+            import mlflow
+
+            staging = tempfile.mkdtemp(dir=self.cache_dir, prefix=".download-")
+            try:
+                mlflow.artifacts.download_artifacts(
+                    artifact_uri=f"models:/{model_version.name}/{model_version.version}",
+                    dst_path=staging,
+                )
+                manifest = {
+                    "name": model_version.name,
+                    "version": model_version.version,
+                    "source": model_version.source,
+                    "checksum": _tree_checksum(staging),
+                    "stat": _tree_stat(staging),
+                    "size": _tree_size(staging),
+                }
+                self._write_manifest(staging, manifest)
+                # Another process may have filled the same entry in the meantime.
+                try:
+                    os.rename(staging, entry)
+                except OSError:
+                    shutil.rmtree(staging, ignore_errors=True)
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            self.evict(keep=entry)
+            return entry
+
+        def load_model(self, model_uri: str):
+            import mlflow
+
+            return mlflow.pyfunc.load_model(self.local_path(model_uri))
+
+        def evict(self, keep: str = None):
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                entry = os.path.join(self.cache_dir, name)
+                manifest = self._read_manifest(entry)
+                if manifest is None:
+                    continue
+                last_used = os.path.getmtime(os.path.join(entry, MANIFEST))
+                entries.append((last_used, entry, manifest["size"]))
+            total = sum(size for _, _, size in entries)
+            for _, entry, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if entry == keep:
+                    continue
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+    # END INLINED
+
     mlflow.set_tracking_uri(tracking_uri)
+    model_uri = f"models:/{model_name}@production-live"
+    if model_cache_dir:
+        # Reuse the copy of this version downloaded by a previous run on the mounted volume.
+        from mlflow.tracking import MlflowClient
+
+        model_cache = ModelCache(model_cache_dir, MlflowClient(), model_cache_max_bytes)
+        production_model = model_cache.load_model(model_uri)
+    else:
+        production_model = mlflow.pyfunc.load_model(model_uri)
+
+    if data_format not in ("parquet", "arrow", "csv"):
+        raise ValueError(f"Unknown data format {data_format!r}")
+    with open(features.path, "rb") as f:
+        magic = f.read(6)
+    input_format = "parquet" if magic[:4] == b"PAR1" else "arrow" if magic == b"ARROW1" else "csv"
+    if workers > 1:
+        chunk_size = chunk_size or 100_000
+
+    def read_chunks(raw_csv=False):
+        # Yield the features by chunks of at most chunk_size rows, or all at once.
+        if input_format == "parquet":
+            if not chunk_size:
+                yield pd.read_parquet(features.path)
+                return
+            for batch in pq.ParquetFile(features.path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif input_format == "arrow":
+            # Memory-mapped, only the chunk being converted is read from disk.
+            table = pa.ipc.open_file(pa.memory_map(features.path)).read_all()
+            if not chunk_size:
+                yield table.to_pandas(split_blocks=True)
+                return
+            for batch in table.to_batches(max_chunksize=chunk_size):
+                yield batch.to_pandas()
+        elif raw_csv:
+            # Leave parsing to the workers. The features have no quoted
+            # fields, so a line is a row.
+            with open(features.path) as f:
+                header = f.readline()
+                while lines := list(itertools.islice(f, chunk_size)):
+                    yield header + "".join(lines)
+        elif chunk_size:
+            yield from pd.read_csv(features.path, chunksize=chunk_size)
+        else:
+            yield pd.read_csv(features.path)
+
+    predictions.metadata["format"] = data_format
+    writer = None
+
+    def write_predictions(pred):
+        # Append one chunk of predictions to the output artifact.
+        nonlocal writer
+        predictions_df = pd.DataFrame(pred, columns=["prediction"])
+        if data_format == "csv":
+            if writer is None:
+                writer = open(predictions.path, "w", newline="")
+                predictions_df.to_csv(writer, index=False)
+            else:
+                predictions_df.to_csv(writer, header=False, index=False)
+            return
+        table = pa.Table.from_pandas(predictions_df, preserve_index=False)
+        if writer is None:
+            if data_format == "parquet":
+                writer = pq.ParquetWriter(predictions.path, table.schema)
+            else:
+                writer = pa.ipc.new_file(predictions.path, table.schema)
+        writer.write_table(table)
 
-    production_model = mlflow.pyfunc.load_model(f"models:/{model_name}@production-live")
+    start = time.perf_counter()
+    n_rows = 0
+    if workers > 1:
+        # Forked workers share the model loaded above and score the chunks,
+        # CSV ones are sent as raw text and parsed by the workers too.
+        import io
+        import multiprocessing
+        import queue
 
-    features_df = pd.read_csv(features.path)
-    pred = production_model.predict(features_df)
-    predictions_df = pd.DataFrame(pred, columns=["prediction"])
-    predictions_df.to_csv(predictions.path, index=False)
+        context = multiprocessing.get_context("fork")
+        tasks, results = context.Queue(), context.Queue()
+
+        def score_chunks():
+            while (task := tasks.get()) is not None:
+                i, chunk = task
+                try:
+                    if isinstance(chunk, str):
+                        chunk = pd.read_csv(io.StringIO(chunk))
+                    results.put((i, np.asarray(production_model.predict(chunk)), None))
+                except Exception as e:
+                    results.put((i, None, repr(e)))
+
+        def next_result(processes):
+            while True:
+                try:
+                    return results.get(timeout=1)
+                except queue.Empty:
+                    if not all(p.is_alive() for p in processes):
+                        raise RuntimeError("A scoring worker exited unexpectedly")
+
+        processes = [context.Process(target=score_chunks, daemon=True) for _ in range(workers)]
+        for p in processes:
+            p.start()
+        # Chunks are written in input order. At most two chunks per worker
+        # are in flight, which bounds the memory held by queues and by the
+        # results waiting for an earlier chunk.
+        chunks = read_chunks(raw_csv=True)
+        done, n_sent, n_written = {}, 0, 0
+        chunk = next(chunks, None)
+        while chunk is not None or n_written < n_sent:
+            if chunk is not None and n_sent - n_written < 2 * workers:
+                tasks.put((n_sent, chunk))
+                n_sent += 1
+                chunk = next(chunks, None)
+                continue
+            i, pred, error = next_result(processes)
+            if error is not None:
+                raise RuntimeError(f"Scoring chunk {i} failed: {error}")
+            done[i] = pred
+            while n_written in done:
+                pred = done.pop(n_written)
+                write_predictions(pred)
+                n_rows += len(pred)
+                n_written += 1
+        for p in processes:
+            tasks.put(None)
+        for p in processes:
+            p.join()
+    else:
+        for features_df in read_chunks():
+            write_predictions(production_model.predict(features_df))
+            n_rows += len(features_df)
+    if writer is None:
+        write_predictions([])
+    writer.close()
+    seconds = time.perf_counter() - start
+
+    metrics.log_metric("rows", n_rows)
+    metrics.log_metric("chunk_size", chunk_size)
+    metrics.log_metric("workers", workers)
+    metrics.log_metric("scoring_seconds", round(seconds, 3))
+    metrics.log_metric("rows_per_second", round(n_rows / seconds, 1) if seconds else 0.0)
+    # ru_maxrss is in KiB on Linux.
+    metrics.log_metric(
+        "peak_rss_mib", round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    )
+    if workers > 1:
+        metrics.log_metric(
+            "worker_peak_rss_mib",
+            round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        )
 
 
 @dsl.pipeline(name="inference_pipeline")
-def inference_pipeline(churn_dataset_uri: str, model_name: str, tracking_uri: str):
-    load_data_task = load_data(dataset_uri=churn_dataset_uri)
+def inference_pipeline(
+    churn_dataset_uri: str,
+    model_name: str,
+    tracking_uri: str,
+    model_cache_dir: str = "",
+    chunk_size: int = 0,
+    workers: int = 1,
+    data_format: str = "parquet",
+):
+    load_data_task = load_data(dataset_uri=churn_dataset_uri, data_format=data_format)
     predict_task = predict(
         features=load_data_task.outputs["features"],
         model_name=model_name,
         tracking_uri=tracking_uri,
+        model_cache_dir=model_cache_dir,
+        chunk_size=chunk_size,
+        workers=workers,
+        data_format=data_format,
     )
 
 
@@ -67,6 +427,8 @@ if __name__ == "__main__":
             "tracking_uri": "https://mlflow-server-instance-ezxhpzskva-od.a.run.app",
         },
     )
+    import google.cloud.aiplatform as aip
+
     aip.init(
         project=PROJECT_ID,
         location=LOCATION,
@@ -1,5 +1,3 @@
-import google.cloud.aiplatform as aip
-
 from kfp import dsl, compiler
 from typing import NamedTuple
 
@@ -10,6 +8,7 @@ from typing import NamedTuple
         "fsspec",
         "gcsfs",
         "pandas",
+        "pyarrow",
         "scikit-learn",
     ],
 )
@@ -20,10 +19,33 @@ def load_data(
     y_train: dsl.Output[dsl.Dataset],
     x_test: dsl.Output[dsl.Dataset],
     y_test: dsl.Output[dsl.Dataset],
+    data_format: str = "parquet",
 ):
     import pandas as pd
     from sklearn.model_selection import train_test_split
 
+    # BEGIN INLINED kfp/module_6/dataset_io.py: write_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def write_dataset(df, dataset, data_format: str):
+        """Write `df` to the `dataset` artifact as "parquet", "arrow" or "csv".
+
+        The format is recorded in the `format` metadata of the artifact.
+        """
+        # Arrow IPC is written uncompressed and as a single record batch, so
+        # that readers can memory-map its columns without copying them.
+        dataset.metadata["format"] = data_format
+        if data_format == "parquet":
+            df.to_parquet(dataset.path, index=False)
+        elif data_format == "arrow":
+            df.reset_index(drop=True).to_feather(
+                dataset.path, compression="uncompressed", chunksize=max(len(df), 1)
+            )
+        elif data_format == "csv":
+            df.to_csv(dataset.path, index=False)
+        else:
+            raise ValueError(f"Unknown data format {data_format!r}")
+    # END INLINED
+
     df = pd.read_csv(dataset_uri)
     x_train_df, x_test_df, y_train_df, y_test_df = train_test_split(
         df.drop(columns=["Churn"]),
@@ -31,14 +53,15 @@ def load_data(
         test_size=test_size_ratio,
         random_state=42,
     )
-    x_train_df.to_csv(x_train.path, index=False)
-    y_train_df.to_csv(y_train.path, index=False)
-    x_test_df.to_csv(x_test.path, index=False)
-    y_test_df.to_csv(y_test.path, index=False)
+    write_dataset(x_train_df, x_train, data_format)
+    write_dataset(y_train_df.to_frame(), y_train, data_format)
+    write_dataset(x_test_df, x_test, data_format)
+    write_dataset(y_test_df.to_frame(), y_test, data_format)
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "scikit-learn", "mlflow"]
+    base_image="python:3.12",
+    packages_to_install=["pandas", "pyarrow", "scikit-learn", "mlflow"],
 )
 def train_model(
     x_train: dsl.Input[dsl.Dataset],
@@ -49,26 +72,146 @@ def train_model(
     model_name: str,
     mlflow_tracking_uri: str,
     mlflow_experiment_name: str,
+    compiled_flavor: bool = False,
 ) -> NamedTuple("outputs", accuracy=float):
     import mlflow
     import pandas as pd
+    import pyarrow as pa
     from mlflow.tracking import MlflowClient
     from sklearn.metrics import accuracy_score
     from sklearn.ensemble import RandomForestClassifier
 
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    # BEGIN INLINED kserve/module_2/tree_engine.py: log_model
+    # Generated by sync_inlined.py, edit the file above instead.
+    import numpy as np
+    import os
+    from types import SimpleNamespace
+
+    FLAVOR_NAME = "compiled_forest"
+    DATA_FILE = "compiled_forest.npz"
+
+    def _breadth_first(tree) -> np.ndarray:
+        """Order the nodes of `tree` so that the two children of a node are adjacent."""
+        order = [0]
+        for node in order:
+            if tree.children_left[node] != -1:
+                order += [tree.children_left[node], tree.children_right[node]]
+        return np.asarray(order)
+
+    def compile_forest(forest) -> dict:
+        """Flatten the trees of a fitted forest classifier into packed node arrays.
+
+        The nodes of all trees are concatenated and renumbered so that the right
+        child of a node directly follows its left child, which is the only one
+        stored. Leaves point to themselves and have an infinite threshold.
+        """
+        if forest.n_outputs_ != 1:
+            raise ValueError("Only single output forests can be compiled")
+        roots, feature, threshold, left, missing_right, value = [], [], [], [], [], []
+        n_nodes = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            order = _breadth_first(tree)
+            position = np.empty_like(order)
+            position[order] = n_nodes + np.arange(len(order))
+            is_leaf = tree.children_left[order] == -1
+            roots.append(n_nodes)
+            feature.append(np.where(is_leaf, 0, tree.feature[order]))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+            left.append(np.where(is_leaf, position[order], position[tree.children_left[order]]))
+            # Before missing value support, NaN features always went right.
+            missing_go_to_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count))
+            missing_right.append(~is_leaf & (missing_go_to_left[order] == 0))
+            # Same normalization as DecisionTreeClassifier.predict_proba.
+            proba = tree.value[order, 0, :]
+            normalizer = proba.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(proba / normalizer)
+            n_nodes += len(order)
+        arrays = {
+            "roots": np.asarray(roots, dtype=np.int32),
+            "feature": np.concatenate(feature).astype(np.int32),
+            "threshold": np.concatenate(threshold).astype(np.float64),
+            "left": np.concatenate(left).astype(np.int32),
+            "missing_right": np.concatenate(missing_right),
+            "value": np.concatenate(value).astype(np.float64),
+            "classes": forest.classes_,
+            "n_features": np.int32(forest.n_features_in_),
+        }
+        if hasattr(forest, "feature_names_in_"):
+            arrays["feature_names"] = np.asarray(forest.feature_names_in_, dtype=str)
+        return arrays
+
+    def save_model(sk_model, path: str, mlflow_model=None, **kwargs):
+        """Save `sk_model` with the sklearn flavor plus its compiled form.
+
+        The model stays loadable with `mlflow.sklearn` and `mlflow.pyfunc`, the
+        serving runtime picks the `compiled_forest` flavor when present.
+        """
+        import mlflow
+        from mlflow.models import Model
+
+        if mlflow_model is None:
+            mlflow_model = Model()
+        mlflow.sklearn.save_model(sk_model, path, mlflow_model=mlflow_model, **kwargs)
+        arrays = compile_forest(sk_model)
+        np.savez(os.path.join(path, DATA_FILE), **arrays)
+        mlflow_model.add_flavor(
+            FLAVOR_NAME,
+            data=DATA_FILE,
+            n_trees=len(arrays["roots"]),
+            n_nodes=len(arrays["left"]),
+        )
+        mlflow_model.save(os.path.join(path, "MLmodel"))
+
+    def log_model(sk_model, artifact_path: str, **kwargs):
+        """Log `sk_model` with `save_model` to the active run, as `mlflow.sklearn.log_model` does."""
+        from mlflow.models import Model
+
+        return Model.log(
+            artifact_path=artifact_path,
+            flavor=SimpleNamespace(save_model=save_model),
+            sk_model=sk_model,
+            **kwargs,
+        )
+    # END INLINED
+
     client = MlflowClient(tracking_uri=mlflow_tracking_uri)
     mlflow.set_tracking_uri(mlflow_tracking_uri)
     mlflow.set_experiment(mlflow_experiment_name)
 
-    x_train_df = pd.read_csv(x_train.path)
-    y_train_df = pd.read_csv(y_train.path)
-    x_test_df = pd.read_csv(x_test.path)
-    y_test_df = pd.read_csv(y_test.path)
+    x_train_df = read_dataset(x_train)
+    y_train_df = read_dataset(y_train)
+    x_test_df = read_dataset(x_test)
+    y_test_df = read_dataset(y_test)
 
     with mlflow.start_run() as run:
         model = RandomForestClassifier(n_estimators=5, max_depth=2, random_state=42)
         model.fit(x_train_df, y_train_df)
-        mlflow.sklearn.log_model(model, "model", registered_model_name=model_name)
+        if compiled_flavor:
+            # Also save the packed trees evaluated by kserve/module_2/tree_engine.py,
+            # as a `compiled_forest` flavor of the logged model.
+            log_model(model, "model", registered_model_name=model_name)
+        else:
+            mlflow.sklearn.log_model(model, "model", registered_model_name=model_name)
 
     run_id = run.info.run_id
     model_version = client.create_model_version(
@@ -90,7 +233,8 @@ def train_model(
 
 
 @dsl.component(
-    base_image="python:3.12", packages_to_install=["pandas", "scikit-learn", "mlflow"]
+    base_image="python:3.12",
+    packages_to_install=["pandas", "pyarrow", "scikit-learn", "mlflow"],
 )
 def evaluate_model(
     x_test: dsl.Input[dsl.Dataset],
@@ -98,15 +242,214 @@ def evaluate_model(
     model_name: str,
     tracking_uri: str,
     metrics: dsl.Output[dsl.Metrics],
+    model_cache_dir: str = "",
+    model_cache_max_bytes: int = 2 * 1024**3,
 ) -> NamedTuple("outputs", accuracy=float):
     import mlflow
     import pandas as pd
+    import pyarrow as pa
     from sklearn.metrics import accuracy_score
 
-    x_test_df = pd.read_csv(x_test.path)
-    y_test_df = pd.read_csv(y_test.path)
+    # BEGIN INLINED kfp/module_6/dataset_io.py: read_dataset
+    # Generated by sync_inlined.py, edit the file above instead.
+    def read_dataset(dataset):
+        """Read the `dataset` artifact written by `write_dataset`, in any format."""
+        # Detect the format from the file itself, so that CSV artifacts of
+        # previous runs can still be read.
+        with open(dataset.path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == b"PAR1":
+            return pd.read_parquet(dataset.path)
+        if magic == b"ARROW1":
+            # The columns point into the memory-mapped file, whose pages are
+            # shared by every reader on the node, instead of private copies.
+            table = pa.ipc.open_file(pa.memory_map(dataset.path)).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_csv(dataset.path)
+    # END INLINED
+
+    # BEGIN INLINED kserve/module_2/model_cache.py: ModelCache
+    # Generated by sync_inlined.py, edit the file above instead.
+    import hashlib
+    import json
+    import os
+    import shutil
+    import tempfile
+
+    MANIFEST = "cache_manifest.json"
+
+    def _tree_checksum(path: str) -> str:
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file_name in sorted(files):
+                if file_name == MANIFEST:
+                    continue
+                file_path = os.path.join(root, file_name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                with open(file_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+        return digest.hexdigest()
+
+    def _tree_stat(path: str) -> list:
+        """The relative path, size and modification time of each file of `path`."""
+        stat = []
+        for root, _, files in os.walk(path):
+            for file_name in files:
+                if file_name == MANIFEST:
+                    continue
+                file_path = os.path.join(root, file_name)
+                file_stat = os.stat(file_path)
+                stat.append(
+                    [os.path.relpath(file_path, path), file_stat.st_size, file_stat.st_mtime_ns]
+                )
+        return sorted(stat)
+
+    def _tree_size(path: str) -> int:
+        return sum(
+            os.path.getsize(os.path.join(root, file_name))
+            for root, _, files in os.walk(path)
+            for file_name in files
+        )
+
+    class ModelCache:
+        """Content-addressed on-disk cache of registered MLflow models.
+
+        Entries are keyed by model name, resolved version and the model source, so
+        `models:/<name>@<alias>` only hits the tracking server to resolve the alias.
+        The artifact checksum is computed once, when an entry is downloaded, and
+        stored next to it with the size and modification time of its files. A
+        read only hashes the files again if one of those changed.
+        The least recently used entries are evicted once `max_bytes` is exceeded.
+
+        `client` resolves the versions, with the `get_model_version_by_alias` and
+        `get_model_version` methods of an `MlflowClient` or functions of `registry`.
+        """
+
+        def __init__(
+            self, cache_dir: str, client, max_bytes: int = 2 * 1024**3, verify: bool = True
+        ):
+            self.cache_dir = cache_dir
+            self.client = client
+            self.max_bytes = max_bytes
+            self.verify = verify
+            os.makedirs(cache_dir, exist_ok=True)
+
+        def _model_version(self, model_uri: str):
+            reference = model_uri[len("models:/"):]
+            if "@" in reference:
+                registered_name, alias = reference.split("@", 1)
+                return self.client.get_model_version_by_alias(registered_name, alias)
+            registered_name, version = reference.split("/", 1)
+            return self.client.get_model_version(registered_name, version)
+
+        def _entry_path(self, model_version) -> str:
+            key = hashlib.sha256(
+                f"{model_version.name}\0{model_version.version}\0{model_version.source}".encode()
+            ).hexdigest()
+            return os.path.join(self.cache_dir, key)
+
+        def _read_manifest(self, entry: str):
+            try:
+                with open(os.path.join(entry, MANIFEST)) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+
+        def _write_manifest(self, entry: str, manifest: dict):
+            with open(os.path.join(entry, MANIFEST), "w") as f:
+                json.dump(manifest, f)
+
+        def _is_intact(self, entry: str, manifest: dict) -> bool:
+            if not self.verify:
+                return True
+            stat = _tree_stat(entry)
+            if manifest.get("stat") == stat:
+                return True
+            if manifest["checksum"] != _tree_checksum(entry):
+                return False
+            # Same content, but touched or copied: no need to hash it again next time.
+            manifest["stat"] = stat
+            self._write_manifest(entry, manifest)
+            return True
+
+        def local_path(self, model_uri: str) -> str:
+            """Return a local copy of `model_uri`, downloading it on a cache miss."""
+            if not model_uri.startswith("models:/"):
+                return model_uri
+            model_version = self._model_version(model_uri)
+            entry = self._entry_path(model_version)
+            manifest = self._read_manifest(entry)
+            if manifest is not None and self._is_intact(entry, manifest):
+                os.utime(os.path.join(entry, MANIFEST))
+                return entry
+            shutil.rmtree(entry, ignore_errors=True)
+
+            import mlflow
+
+            staging = tempfile.mkdtemp(dir=self.cache_dir, prefix=".download-")
+            try:
+                mlflow.artifacts.download_artifacts(
+                    artifact_uri=f"models:/{model_version.name}/{model_version.version}",
+                    dst_path=staging,
+                )
+                manifest = {
+                    "name": model_version.name,
+                    "version": model_version.version,
+                    "source": model_version.source,
+                    "checksum": _tree_checksum(staging),
+                    "stat": _tree_stat(staging),
+                    "size": _tree_size(staging),
+                }
+                self._write_manifest(staging, manifest)
+                # Another process may have filled the same entry in the meantime.
+                try:
+                    os.rename(staging, entry)
+                except OSError:
+                    shutil.rmtree(staging, ignore_errors=True)
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            self.evict(keep=entry)
+            return entry
+
+        def load_model(self, model_uri: str):
+            import mlflow
+
+            return mlflow.pyfunc.load_model(self.local_path(model_uri))
+
+        def evict(self, keep: str = None):
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                entry = os.path.join(self.cache_dir, name)
+                manifest = self._read_manifest(entry)
+                if manifest is None:
+                    continue
+                last_used = os.path.getmtime(os.path.join(entry, MANIFEST))
+                entries.append((last_used, entry, manifest["size"]))
+            total = sum(size for _, _, size in entries)
+            for _, entry, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if entry == keep:
+                    continue
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+    # END INLINED
+
+    x_test_df = read_dataset(x_test)
+    y_test_df = read_dataset(y_test)
     mlflow.set_tracking_uri(tracking_uri)
-    production_model = mlflow.pyfunc.load_model(f"models:/{model_name}@production-live")
+    model_uri = f"models:/{model_name}@production-live"
+    if model_cache_dir:
+        # Reuse the copy of this version downloaded by a previous run on the mounted volume.
+        from mlflow.tracking import MlflowClient
+
+        model_cache = ModelCache(model_cache_dir, MlflowClient(), model_cache_max_bytes)
+        production_model = model_cache.load_model(model_uri)
+    else:
+        production_model = mlflow.pyfunc.load_model(model_uri)
 
     y_pred = production_model.predict(x_test_df)
     accuracy = accuracy_score(y_test_df, y_pred)
@@ -135,8 +478,13 @@ def training_pipeline(
     mlflow_tracking_uri: str,
     mlflow_experiment_name: str,
     model_name: str,
+    model_cache_dir: str = "",
+    compile_forest: bool = False,
+    data_format: str = "parquet",
 ):
-    load_data_task = load_data(test_size_ratio=0.2, dataset_uri=churn_dataset_uri)
+    load_data_task = load_data(
+        test_size_ratio=0.2, dataset_uri=churn_dataset_uri, data_format=data_format
+    )
     train_model_task = train_model(
         x_train=load_data_task.outputs["x_train"],
         y_train=load_data_task.outputs["y_train"],
@@ -145,6 +493,7 @@ def training_pipeline(
         mlflow_tracking_uri=mlflow_tracking_uri,
         mlflow_experiment_name=mlflow_experiment_name,
         model_name=model_name,
+        compiled_flavor=compile_forest,
     )
 
     evaluate_model_task = evaluate_model(
@@ -152,6 +501,7 @@ def training_pipeline(
         y_test=load_data_task.outputs["y_test"],
         model_name=model_name,
         tracking_uri=mlflow_tracking_uri,
+        model_cache_dir=model_cache_dir,
     )
     with dsl.If(
         train_model_task.outputs["accuracy"] <= evaluate_model_task.outputs["accuracy"]
@@ -188,4 +538,4 @@ if __name__ == "__main__":
 
     )
     
-   
\ No newline at end of file
+   
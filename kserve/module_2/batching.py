@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class MicroBatcher:
+    """Coalesce concurrent predict calls into a single vectorized model call.
+
+    Requests are queued and flushed either when `max_batch_size` rows are
+    pending or when the oldest request has waited `max_wait_ms`. Each flushed
+    batch is handed to the `predict_fn` coroutine, so several batches can be in
+    flight at once when the model call runs on an executor.
+    """
+
+    def __init__(self, predict_fn, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+        self._in_flight = set()
+
+    async def submit(self, inputs):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((inputs, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while n_rows < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch):
+        inputs = [item[0] for item in batch]
+        futures = [item[1] for item in batch]
+        try:
+            results = await self._predict(inputs)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _predict(self, inputs):
+        if all(isinstance(x, pd.DataFrame) for x in inputs):
+            batch = pd.concat(inputs, ignore_index=True)
+        else:
+            batch = np.concatenate([np.asarray(x) for x in inputs])
+        result = np.asarray(await self.predict_fn(batch))
+        offsets = np.cumsum([len(x) for x in inputs])[:-1]
+        return np.split(result, offsets)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import time
+import warnings
+
+from server import SampleModel
+from benchmark_utils import load_features, make_request, percentile_ms, save_local_model
+
+
+async def run_load(model: SampleModel, requests, concurrency: int):
+    latencies = []
+    queue = list(requests)
+
+    async def client():
+        while queue:
+            request = queue.pop()
+            start = time.perf_counter()
+            await model.predict(request)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    if model.batcher is not None:
+        await model.batcher.close()
+    return latencies, elapsed
+
+
+def report(label: str, latencies, elapsed: float):
+    print(
+        f"{label:<12} p50={percentile_ms(latencies, 50):7.2f}ms "
+        f"p99={percentile_ms(latencies, 99):7.2f}ms "
+        f"throughput={len(latencies) / elapsed:8.1f} req/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max_batch_size", type=int, default=64)
+    parser.add_argument("--max_batch_wait_ms", type=float, default=2.0)
+    parser.add_argument("--n_estimators", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    model_uri = save_local_model(n_estimators=args.n_estimators)
+    features = load_features().to_numpy()
+    requests = [
+        make_request(features[i % len(features)][None, :]) for i in range(args.requests)
+    ]
+
+    for label, max_batch_size in [("unbatched", 1), ("batched", args.max_batch_size)]:
+        model = SampleModel(
+            "ChurnPrediction",
+            model_uri=model_uri,
+            max_batch_size=max_batch_size,
+            max_batch_wait_ms=args.max_batch_wait_ms,
+        )
+        latencies, elapsed = asyncio.run(run_load(model, requests, args.concurrency))
+        report(label, latencies, elapsed)
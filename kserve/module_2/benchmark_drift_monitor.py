@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+from kserve import ModelRepository
+from kserve.constants.constants import INFERENCE_CONTENT_LENGTH_HEADER
+
+from server import SampleModel
+from protocol import BinaryTensorDataPlane
+from benchmark_payloads import round_trip
+from benchmark_utils import load_features, make_binary_body, percentile_ms, save_local_model
+
+
+def write_profile(path: str, model) -> str:
+    """Write the reference profile of the reference data, like the reference_profile component."""
+    from sketches import new_sketch, sketch_to_json, sketch_update
+
+    features = load_features()
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "key": "benchmark",
+                "model_name": "ChurnPrediction",
+                "model_version": "1",
+                "columns": {
+                    name: sketch_to_json(sketch_update(new_sketch(), features[name]))
+                    for name in features.columns
+                },
+                "prediction": sketch_to_json(
+                    sketch_update(new_sketch(), model.model.predict(features.to_numpy()))
+                ),
+            },
+            f,
+        )
+    return path
+
+
+async def measure(dataplane, models: dict, body: bytes, headers, iterations: int) -> dict:
+    # Requests alternate between the models, so that both see the same noise.
+    latencies = {label: [] for label in models}
+    for _ in range(iterations):
+        for label, model in models.items():
+            start = time.perf_counter()
+            await round_trip(dataplane, model, body, headers)
+            latencies[label].append(time.perf_counter() - start)
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the predict latency with and without the drift monitor."
+    )
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--window_seconds", type=float, default=5.0)
+    parser.add_argument("--workspace", type=str, default=None, help="URL of an Evidently UI")
+    parser.add_argument("--project_id", type=str, default="")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    model_uri = save_local_model()
+    off = SampleModel("ChurnPrediction", model_uri=model_uri)
+    profile = write_profile(os.path.join(tempfile.mkdtemp(), "profile.json"), off)
+    project_id = args.project_id
+    if args.workspace and not project_id:
+        from evidently.ui.remote import RemoteWorkspace
+
+        project_id = str(RemoteWorkspace(args.workspace).create_project("benchmark").id)
+    on = SampleModel(
+        "ChurnPrediction",
+        model_uri=model_uri,
+        drift_profile=profile,
+        drift_window_seconds=args.window_seconds,
+        drift_workspace=args.workspace,
+        drift_project_id=project_id,
+    )
+    on.start()
+    models = {"off": off, "on": on}
+    registry = ModelRepository()
+    registry.update(off)
+    dataplane = BinaryTensorDataPlane(model_registry=registry)
+    features = load_features().to_numpy()
+
+    print(f"{args.iterations} binary requests per case, windows of {args.window_seconds}s")
+    for n_rows in args.rows:
+        rows = features[np.arange(n_rows) % len(features)]
+        body, json_length = make_binary_body(rows)
+        headers = {INFERENCE_CONTENT_LENGTH_HEADER: str(json_length)}
+        start = time.perf_counter()
+        latencies = asyncio.run(measure(dataplane, models, body, headers, args.iterations))
+        seconds = time.perf_counter() - start
+        for label, values in latencies.items():
+            print(
+                f"rows={n_rows:<6} monitor={label:<4} "
+                f"mean={np.mean(values) * 1000:8.3f}ms "
+                f"p50={percentile_ms(values, 50):8.3f}ms "
+                f"p99={percentile_ms(values, 99):8.3f}ms"
+            )
+        overhead = np.mean(latencies["on"]) - np.mean(latencies["off"])
+        print(f"rows={n_rows:<6} overhead {overhead * 1e6:+.1f}µs per request over {seconds:.1f}s")
+
+    # Time the work on the request path and in the background apart.
+    monitor = on.drift_monitor
+    on.stop()
+    batch = features[:100]
+    predictions = np.zeros(len(batch), dtype=np.int64)
+    start = time.perf_counter()
+    for _ in range(1000):
+        monitor.observe(batch, predictions, "1")
+    print(f"observe: {(time.perf_counter() - start) * 1000:.2f}µs per request")
+    monitor.drain()
+    for _ in range(1000):
+        monitor.observe(batch, predictions, "1")
+    start = time.perf_counter()
+    monitor.drain()
+    drain_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    monitor.flush()
+    print(
+        f"background: drain of 1000 requests of 100 rows {drain_seconds * 1000:.1f}ms, "
+        f"flush {(time.perf_counter() - start) * 1000:.1f}ms"
+    )
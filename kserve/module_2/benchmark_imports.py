@@ -0,0 +1,58 @@
+import argparse
+import os
+import subprocess
+import sys
+from collections import Counter
+
+
+def import_times(module: str, path: str) -> list:
+    """Return the (self_us, cumulative_us, name) rows of `python -X importtime -c 'import module'`."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Report the import time of a module by top-level package, "
+        "and fail if it imports a forbidden package."
+    )
+    parser.add_argument("module", type=str, nargs="?", default="server")
+    parser.add_argument("--path", type=str, default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbid", type=str, nargs="*", default=[])
+    args = parser.parse_args()
+
+    # The fastest run is the least disturbed by the rest of the machine.
+    rows = min(
+        (import_times(args.module, args.path) for _ in range(args.runs)),
+        key=lambda rows: rows[-1][1],
+    )
+    packages = Counter()
+    for self_us, _, name in rows:
+        packages[name.split(".")[0]] += self_us
+
+    print(f"import {args.module}: {rows[-1][1] / 1000:.0f}ms, {len(rows)} modules")
+    for package, self_us in packages.most_common(args.top):
+        print(f"  {package:<30} {self_us / 1000:8.1f}ms")
+
+    names = {name for _, _, name in rows}
+    imported = [
+        package
+        for package in args.forbid
+        if any(name == package or name.startswith(package + ".") for name in names)
+    ]
+    if imported:
+        sys.exit(f"import {args.module} imports {', '.join(imported)}")
@@ -0,0 +1,49 @@
+import argparse
+import time
+import warnings
+
+import mlflow
+import numpy as np
+
+from predictors import load_predictor
+from benchmark_utils import load_features, percentile_ms, save_local_model
+
+
+def measure(model, input_features, iterations: int):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        model.predict(input_features)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 1000])
+    parser.add_argument("--n_estimators", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    model_path = save_local_model(n_estimators=args.n_estimators)
+    predictors = [
+        ("pyfunc", mlflow.pyfunc.load_model(model_path)),
+        ("native", load_predictor(model_path)),
+    ]
+    features = load_features()
+
+    for n_rows in args.rows:
+        batch = features.iloc[np.arange(n_rows) % len(features)]
+        # The server gets a DataFrame from V2 requests carrying column names
+        # and a numpy array otherwise, time both.
+        for input_label, input_features in [("frame", batch), ("array", batch.to_numpy())]:
+            expected = predictors[0][1].predict(batch)
+            for label, model in predictors:
+                assert np.array_equal(model.predict(input_features), expected)
+                latencies = measure(model, input_features, args.iterations)
+                print(
+                    f"rows={n_rows:<5} {input_label:<5} {label:<6} "
+                    f"p50={percentile_ms(latencies, 50):7.3f}ms "
+                    f"p99={percentile_ms(latencies, 99):7.3f}ms"
+                )
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import time
+import warnings
+
+import numpy as np
+import orjson
+from kserve import ModelRepository
+from kserve.constants.constants import INFERENCE_CONTENT_LENGTH_HEADER
+from kserve.protocol.rest.v2_datamodels import InferenceRequest
+
+from server import SampleModel
+from protocol import BinaryTensorDataPlane
+from benchmark_utils import (
+    load_features,
+    make_binary_body,
+    make_json_body,
+    percentile_ms,
+    save_local_model,
+)
+
+
+async def round_trip(dataplane, model, body: bytes, headers):
+    """Decode, predict and encode one request the way the REST v2 endpoint does."""
+    if INFERENCE_CONTENT_LENGTH_HEADER not in headers:
+        body = InferenceRequest.model_validate_json(body)
+    request, _ = dataplane.decode(body, headers, "v2", model.name)
+    response = await model.predict(request)
+    response, _ = dataplane.encode(model.name, response, headers, {})
+    return response if isinstance(response, bytes) else orjson.dumps(response)
+
+
+async def measure(dataplane, model, body: bytes, headers, iterations: int):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await round_trip(dataplane, model, body, headers)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 10_000])
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    model = SampleModel("ChurnPrediction", model_uri=save_local_model())
+    registry = ModelRepository()
+    registry.update(model)
+    dataplane = BinaryTensorDataPlane(model_registry=registry)
+    features = load_features().to_numpy()
+
+    for n_rows in args.rows:
+        rows = features[np.arange(n_rows) % len(features)]
+        json_body = make_json_body(rows)
+        binary_body, json_length = make_binary_body(rows)
+        cases = [
+            ("json", json_body, {}),
+            ("binary", binary_body, {INFERENCE_CONTENT_LENGTH_HEADER: str(json_length)}),
+        ]
+        for label, body, headers in cases:
+            latencies = asyncio.run(
+                measure(dataplane, model, body, headers, args.iterations)
+            )
+            print(
+                f"rows={n_rows:<6} {label:<7} payload={len(body):>9} B "
+                f"p50={percentile_ms(latencies, 50):8.3f}ms "
+                f"p99={percentile_ms(latencies, 99):8.3f}ms"
+            )
@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import httpx
+import numpy as np
+import psutil
+from kserve.constants.constants import INFERENCE_CONTENT_LENGTH_HEADER
+
+from benchmark_utils import load_features, make_binary_body, percentile_ms, save_local_model
+
+
+async def _client(url: str, body: bytes, headers, concurrency: int, duration: float):
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post(url, content=body, headers=headers)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies
+
+
+def run_client(url: str, body: bytes, headers, concurrency: int, duration: float):
+    return asyncio.run(_client(url, body, headers, concurrency, duration))
+
+
+def wait_until_ready(url: str, server: subprocess.Popen, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Server exited before being ready")
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def worker_memory(server_pid: int):
+    """RSS and PSS in MiB of each process serving requests."""
+    server = psutil.Process(server_pid)
+    # With a single worker, the server process handles requests itself.
+    processes = server.children() or [server]
+    mib = 1024**2
+    return [
+        (info.rss / mib, info.pss / mib)
+        for info in (process.memory_full_info() for process in processes)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--client_processes", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=1)
+    parser.add_argument("--n_estimators", type=int, default=300)
+    parser.add_argument("--http_port", type=int, default=8090)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    workers = args.workers or sorted({1, 2, os.cpu_count() // 2 or 1, os.cpu_count()})
+
+    # A fully grown forest, so that the model weighs in the worker memory.
+    model_uri = save_local_model(n_estimators=args.n_estimators, max_depth=None)
+    features = load_features().to_numpy()
+    body, json_length = make_binary_body(features[np.arange(args.rows) % len(features)])
+    headers = {
+        INFERENCE_CONTENT_LENGTH_HEADER: str(json_length),
+        "Content-Type": "application/octet-stream",
+    }
+    base_url = f"http://127.0.0.1:{args.http_port}/v2/models/ChurnPrediction"
+
+    for n_workers in workers:
+        metrics_dir = tempfile.mkdtemp(prefix="prometheus-")
+        env = dict(
+            os.environ,
+            MODEL_URI=model_uri,
+            PREFORK_WORKERS=str(n_workers),
+            PROMETHEUS_MULTIPROC_DIR=metrics_dir,
+        )
+        server = subprocess.Popen(
+            [sys.executable, "server.py", "--http_port", str(args.http_port), "--enable_grpc", "false"],
+            env=env,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(f"{base_url}/ready", server)
+            concurrency = max(1, args.concurrency // args.client_processes)
+            with multiprocessing.get_context("spawn").Pool(args.client_processes) as pool:
+                results = pool.starmap(
+                    run_client,
+                    [(f"{base_url}/infer", body, headers, concurrency, args.duration)]
+                    * args.client_processes,
+                )
+            memory = worker_memory(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+        latencies = [latency for result in results for latency in result]
+        print(
+            f"workers={n_workers:<3} {len(latencies) / args.duration:8.1f} req/s "
+            f"p50={percentile_ms(latencies, 50):7.2f}ms p99={percentile_ms(latencies, 99):7.2f}ms "
+            f"rss/worker={np.mean([rss for rss, _ in memory]):6.1f}MiB "
+            f"pss/worker={np.mean([pss for _, pss in memory]):6.1f}MiB"
+        )
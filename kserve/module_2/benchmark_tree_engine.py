@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import mlflow
+import numpy as np
+
+import tree_engine
+from predictors import load_predictor
+from benchmark_utils import load_features, percentile_ms, save_local_model
+
+
+def measure(model, input_features, iterations: int):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        model.predict(input_features)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--n_estimators", type=int, nargs="+", default=[5, 100])
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    features = load_features().to_numpy()
+    for n_estimators in args.n_estimators:
+        # Trees of the KFP pipeline are depth 2, the DVC ones are fully grown.
+        max_depth = 2 if n_estimators == 5 else None
+        sklearn_path = save_local_model(n_estimators=n_estimators, max_depth=max_depth)
+        compiled_path = os.path.join(tempfile.mkdtemp(), "model")
+        tree_engine.save_model(mlflow.sklearn.load_model(sklearn_path), compiled_path)
+        predictors = [
+            ("sklearn", load_predictor(sklearn_path)),
+            ("compiled", load_predictor(compiled_path)),
+        ]
+        for n_rows in args.rows:
+            rows = features[np.arange(n_rows) % len(features)]
+            expected = predictors[0][1].predict(rows)
+            for label, model in predictors:
+                assert np.array_equal(model.predict(rows), expected)
+                latencies = measure(model, rows, args.iterations)
+                print(
+                    f"trees={n_estimators:<4} depth={str(max_depth):<5} rows={n_rows:<5} "
+                    f"{label:<8} p50={percentile_ms(latencies, 50):7.3f}ms "
+                    f"p99={percentile_ms(latencies, 99):7.3f}ms"
+                )
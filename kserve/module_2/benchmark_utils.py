@@ -0,0 +1,72 @@
+import os
+import tempfile
+
+import numpy as np
+import orjson
+import pandas as pd
+import mlflow
+from kserve import InferInput, InferRequest
+from sklearn.ensemble import RandomForestClassifier
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+REFERENCE_DATASET = os.path.join(DATA_DIR, "churn_data_2025_03.csv")
+
+
+def load_features(path: str = REFERENCE_DATASET) -> pd.DataFrame:
+    return pd.read_csv(path).drop(columns=["Churn"])
+
+
+def save_local_model(n_estimators: int = 5, max_depth: int = 2) -> str:
+    """Train the churn model like `train_model` does and save it as a local MLflow model."""
+    df = pd.read_csv(REFERENCE_DATASET)
+    model = RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=max_depth, random_state=42
+    )
+    model.fit(df.drop(columns=["Churn"]), df["Churn"])
+    model_path = os.path.join(tempfile.mkdtemp(), "model")
+    mlflow.sklearn.save_model(model, model_path)
+    return model_path
+
+
+def make_request(rows: np.ndarray) -> InferRequest:
+    rows = np.ascontiguousarray(rows, dtype=np.float64)
+    infer_input = InferInput(name="input-0", shape=list(rows.shape), datatype="FP64")
+    infer_input.set_data_from_numpy(rows, binary_data=False)
+    return InferRequest(model_name="ChurnPrediction", infer_inputs=[infer_input])
+
+
+def make_json_body(rows: np.ndarray) -> bytes:
+    rows = np.asarray(rows, dtype=np.float64)
+    request = {
+        "inputs": [
+            {
+                "name": "input-0",
+                "shape": list(rows.shape),
+                "datatype": "FP64",
+                "data": rows.ravel().tolist(),
+            }
+        ]
+    }
+    return orjson.dumps(request)
+
+
+def make_binary_body(rows: np.ndarray):
+    """Return a V2 binary tensor extension body and its JSON header length."""
+    rows = np.ascontiguousarray(rows, dtype=np.float64)
+    request = {
+        "inputs": [
+            {
+                "name": "input-0",
+                "shape": list(rows.shape),
+                "datatype": "FP64",
+                "parameters": {"binary_data_size": rows.nbytes},
+            }
+        ],
+        "parameters": {"binary_data_output": True},
+    }
+    header = orjson.dumps(request)
+    return header + rows.tobytes(), len(header)
+
+
+def percentile_ms(latencies, q: float) -> float:
+    return float(np.percentile(latencies, q) * 1000)
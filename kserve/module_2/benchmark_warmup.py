@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def measure(model_uri: str, warmup_batch_sizes, n_rows: int, executor: str):
+    """Time startup and the first requests of a fresh server, in this process."""
+    start = time.perf_counter()
+    import asyncio
+    import warnings
+
+    import numpy as np
+    from kserve import ModelRepository
+    from kserve.constants.constants import INFERENCE_CONTENT_LENGTH_HEADER
+
+    from benchmark_payloads import round_trip
+    from benchmark_utils import load_features, make_binary_body
+    from protocol import BinaryTensorDataPlane
+    from server import SampleModel
+
+    warnings.filterwarnings("ignore")
+    model = SampleModel(
+        "ChurnPrediction",
+        model_uri=model_uri,
+        executor=executor,
+        executor_workers=2,
+        warmup_batch_sizes=warmup_batch_sizes,
+    )
+    model.start()
+    startup = time.perf_counter() - start
+    registry = ModelRepository()
+    registry.update(model)
+    dataplane = BinaryTensorDataPlane(model_registry=registry)
+    features = load_features().to_numpy()
+    body, json_length = make_binary_body(features[np.arange(n_rows) % len(features)])
+    headers = {INFERENCE_CONTENT_LENGTH_HEADER: str(json_length)}
+
+    async def requests():
+        latencies = []
+        for _ in range(3):
+            start = time.perf_counter()
+            await round_trip(dataplane, model, body, headers)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    latencies = asyncio.run(requests())
+    model.stop()
+    print(json.dumps({"startup": startup, "latencies": latencies}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=16)
+    parser.add_argument("--warmup_batch_sizes", type=int, nargs="*", default=[1, 16, 256])
+    parser.add_argument("--model_uri", type=str, default=None)
+    parser.add_argument("--executor", type=str, default=None, choices=["thread", "process"])
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.model_uri, args.warmup_batch_sizes, args.rows, args.executor)
+        sys.exit()
+
+    import statistics
+
+    from benchmark_utils import save_local_model
+
+    model_uri = args.model_uri or save_local_model()
+    for label, batch_sizes in [("cold", []), ("warmed", args.warmup_batch_sizes)]:
+        results = []
+        # Each trial is a fresh interpreter, so nothing is warm but the OS page cache.
+        for _ in range(args.trials):
+            output = subprocess.run(
+                [sys.executable, __file__, "--measure", "--model_uri", model_uri,
+                 "--rows", str(args.rows), "--warmup_batch_sizes", *map(str, batch_sizes)]
+                + (["--executor", args.executor] if args.executor else []),
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+        startup = statistics.median(result["startup"] for result in results)
+        first = statistics.median(result["latencies"][0] for result in results)
+        steady = statistics.median(result["latencies"][-1] for result in results)
+        print(
+            f"{label:<7} startup={startup:6.2f}s first request={first * 1000:7.2f}ms "
+            f"third request={steady * 1000:7.2f}ms"
+        )
@@ -0,0 +1,405 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from evidently.calculations.data_drift import ColumnDataDriftMetrics, DriftStatsField
+from evidently.core import new_id
+from evidently.metric_results import DistributionIncluded
+from evidently.metrics import ColumnDriftMetric, DatasetDriftMetric
+from evidently.metrics.data_drift.dataset_drift_metric import DatasetDriftMetricResults
+from evidently.options.base import Options
+from evidently.suite.base_suite import ContextPayload, Snapshot
+from evidently.ui.remote import RemoteWorkspace
+from kserve.logging import logger
+from prometheus_client import Counter, Gauge
+
+from sketches import (
+    column_drift,
+    new_sketch,
+    sketch_from_json,
+    sketch_merge,
+    sketch_to_json,
+    sketch_update,
+)
+
+DRIFT_ROWS = Counter(
+    "drift_monitor_rows", "Rows seen by the drift monitor", ["model_name", "result"]
+)
+DRIFT_SHARE = Gauge(
+    "drift_monitor_share_of_drifted_columns",
+    "Share of drifted features in the last window",
+    ["model_name"],
+    multiprocess_mode="livemostrecent",
+)
+DRIFT_PREDICTION_SCORE = Gauge(
+    "drift_monitor_prediction_drift_score",
+    "Drift score of the predictions in the last window",
+    ["model_name"],
+    multiprocess_mode="livemostrecent",
+)
+DRIFT_FLUSH_SECONDS = Gauge(
+    "drift_monitor_flush_seconds",
+    "Compute and upload time of the last window",
+    ["model_name"],
+    multiprocess_mode="livemostrecent",
+)
+
+
+def _drift_result(name: str, reference: dict, current: dict, column_type: str):
+    stattest_name, threshold, score, detected = column_drift(reference, current, column_type)
+
+    def stats_field(sketch):
+        if column_type != "cat":
+            return DriftStatsField()
+        x, y = zip(*sorted(sketch["values"].items()))
+        return DriftStatsField(small_distribution=DistributionIncluded(x=list(x), y=list(y)))
+
+    return ColumnDataDriftMetrics(
+        column_name=name,
+        column_type=column_type,
+        stattest_name=stattest_name,
+        stattest_threshold=threshold,
+        drift_score=score,
+        drift_detected=detected,
+        current=stats_field(current),
+        reference=stats_field(reference),
+    )
+
+
+def dataset_drift_result(by_column: list) -> DatasetDriftMetricResults:
+    """Return the `DatasetDriftMetric` result of the drift results of each feature.
+
+    The dataset drifts when at least half of the features drift, the
+    default drift share of `DatasetDriftMetric`.
+    """
+    n_drifted = sum(result.drift_detected for result in by_column)
+    return DatasetDriftMetricResults(
+        drift_share=0.5,
+        number_of_columns=len(by_column),
+        number_of_drifted_columns=n_drifted,
+        share_of_drifted_columns=n_drifted / len(by_column),
+        dataset_drift=n_drifted / len(by_column) >= 0.5,
+    )
+
+
+def drift_results(reference: dict, current: dict) -> tuple:
+    """Return the drift results of each feature, of the dataset and of the prediction.
+
+    `reference` and `current` are profiles in the layout of the
+    `reference_profile` component of evidently/module_5, with their
+    sketches loaded.
+    """
+    by_column = [
+        _drift_result(name, reference["columns"][name], current["columns"][name], "num")
+        for name in reference["columns"]
+    ]
+    dataset_result = dataset_drift_result(by_column)
+    prediction_result = _drift_result(
+        "prediction", reference["prediction"], current["prediction"], "cat"
+    )
+    return by_column, dataset_result, prediction_result
+
+
+def drift_snapshot(
+    results: tuple, timestamp: datetime, metadata: dict, snapshot_id=None
+) -> Snapshot:
+    """Return the `data_drift` and `prediction_drift` snapshot of `drift_results`.
+
+    The snapshot holds the same `DatasetDriftMetric` and `ColumnDriftMetric`
+    results as the reports of `batch_monitoring.py`, so that the panels of
+    its dashboard pick it up. It gets a new id unless `snapshot_id` is set.
+    """
+    by_column, dataset_result, prediction_result = results
+    columns = [result.column_name for result in by_column]
+    return Snapshot(
+        id=snapshot_id or new_id(),
+        timestamp=timestamp,
+        metadata=metadata,
+        tags=["data_drift", "prediction_drift"],
+        suite=ContextPayload(
+            metrics=[DatasetDriftMetric(columns=columns), ColumnDriftMetric(column_name="prediction")],
+            metric_results=[dataset_result, prediction_result],
+            tests=[],
+            test_results=[],
+        ),
+        metrics_ids=[0, 1],
+        options=Options(),
+    )
+
+
+class DriftMonitor:
+    """Sketches of the served features and predictions, flushed as drift snapshots per window.
+
+    `observe` only appends references to the request inputs and results to
+    a bounded buffer, without locking or waking anything up. A background
+    thread drains it every `drain_interval` seconds, updates the sketches of
+    the current window, and at the end of each window compares them with
+    the reference profile and uploads the snapshot to the Evidently
+    workspace. Windows are aligned on the wall clock, so that the windows of
+    several workers or pods cover the same periods.
+
+    When started in one of several prefork workers, each worker writes the
+    sketches of its window to `merge_dir` and the first worker merges them
+    into the single snapshot of the window. It waits at most `merge_timeout`
+    seconds for the other workers.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        reference_profile: str,
+        window_seconds: float = 3600.0,
+        workspace: str = None,
+        project_id: str = None,
+        sketch_dir: str = None,
+        max_pending: int = 10_000,
+        drain_interval: float = 1.0,
+        merge_dir: str = None,
+        merge_timeout: float = 30.0,
+    ):
+        self.model_name = model_name
+        with open(reference_profile) as f:
+            profile = json.load(f)
+        self.reference = {
+            **profile,
+            "columns": {name: sketch_from_json(s) for name, s in profile["columns"].items()},
+            "prediction": sketch_from_json(profile["prediction"]),
+        }
+        self.columns = list(profile["columns"])
+        self.window_seconds = window_seconds
+        self.workspace = workspace
+        self.project_id = project_id
+        self.sketch_dir = sketch_dir
+        self.max_pending = max_pending
+        self.drain_interval = drain_interval
+        # The parent process of the prefork workers keeps the servers apart.
+        self.merge_dir = merge_dir or os.path.join(
+            tempfile.gettempdir(), f"drift-windows-{os.getppid()}"
+        )
+        self.merge_timeout = merge_timeout
+        self.worker_index = 0
+        self.workers = 1
+        self.dropped = 0
+        self._pending = deque()
+        self._workspace = None
+        self._stopping = threading.Event()
+        self._thread = None
+        self._new_window(time.time())
+
+    def _new_window(self, now: float):
+        self.window_start = now // self.window_seconds * self.window_seconds
+        self.window_end = self.window_start + self.window_seconds
+        self.current = {name: new_sketch() for name in self.columns}
+        self.current_prediction = new_sketch()
+        self.versions = set()
+
+    def observe(self, input_features, predictions, model_version=None):
+        """Queue a scored batch, called on the request path: it must stay cheap."""
+        if len(self._pending) >= self.max_pending:
+            # Counted here rather than in Prometheus, which takes a lock.
+            self.dropped += len(predictions)
+            return
+        self._pending.append((time.time(), input_features, predictions, model_version))
+
+    def start(self, worker_index: int = 0, workers: int = 1):
+        """Start the background thread, in each worker after a fork.
+
+        Only the worker of index 0 out of `workers` uploads the snapshots.
+        """
+        self.worker_index = worker_index
+        self.workers = workers
+        self._stopping.clear()
+        self._new_window(time.time())
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and flush the window in progress."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.drain()
+        self._next_window(time.time())
+
+    def _run(self):
+        while not self._stopping.wait(self.drain_interval):
+            try:
+                self.drain()
+            except Exception:
+                logger.exception(f"Drift monitor of {self.model_name} failed")
+            if time.time() >= self.window_end:
+                self._next_window(time.time())
+
+    def _next_window(self, now: float):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception(f"Failed to flush the drift window of {self.model_name}")
+        self._new_window(now)
+
+    def _features(self, input_features) -> np.ndarray:
+        if isinstance(input_features, pd.DataFrame) and set(self.columns) <= set(
+            input_features.columns
+        ):
+            input_features = input_features[self.columns]
+        # Unnamed inputs are in the column order of the training data.
+        return np.asarray(input_features, dtype=np.float64)
+
+    def drain(self):
+        """Add the queued batches to the sketches of their window, in one update per window."""
+        dropped, self.dropped = self.dropped, 0
+        if dropped:
+            DRIFT_ROWS.labels(self.model_name, "dropped").inc(dropped)
+        features, predictions = [], []
+        while self._pending:
+            observed_at, input_features, batch_predictions, version = self._pending.popleft()
+            if observed_at >= self.window_end:
+                self._update(features, predictions)
+                features, predictions = [], []
+                self._next_window(observed_at)
+            features.append(self._features(input_features))
+            predictions.append(np.asarray(batch_predictions, dtype=np.float64).ravel())
+            if version is not None:
+                self.versions.add(str(version))
+        self._update(features, predictions)
+
+    def _update(self, features: list, predictions: list):
+        if not predictions:
+            return
+        features = np.concatenate(features)
+        for j, name in enumerate(self.columns):
+            self.current[name] = sketch_update(self.current[name], features[:, j])
+        predictions = np.concatenate(predictions)
+        self.current_prediction = sketch_update(self.current_prediction, predictions)
+        DRIFT_ROWS.labels(self.model_name, "observed").inc(len(predictions))
+
+    def flush(self):
+        """Upload the snapshot of the current window and write its sketches, if it has rows.
+
+        Returns the snapshot, or None for an empty window or in the workers
+        other than the first one.
+        """
+        window_start = datetime.fromtimestamp(self.window_start)
+        current = {
+            "key": self.reference["key"],
+            "model_name": self.model_name,
+            "model_versions": sorted(self.versions),
+            "window_start": window_start.isoformat(),
+            "window_end": datetime.fromtimestamp(min(self.window_end, time.time())).isoformat(),
+            "columns": self.current,
+            "prediction": self.current_prediction,
+        }
+        if self.workers > 1:
+            current = self._merge_workers(current)
+            if current is None:
+                return None
+        if not current["prediction"]["count"]:
+            return None
+        start = time.perf_counter()
+        snapshot = drift_snapshot(
+            drift_results(self.reference, current),
+            window_start,
+            {
+                "reference_profile": self.reference["key"],
+                "model_version": str(self.reference["model_version"]),
+                "served_model_versions": current["model_versions"],
+                "window_start": current["window_start"],
+                "window_end": current["window_end"],
+            },
+        )
+        dataset_result, prediction_result = snapshot.suite.metric_results
+        DRIFT_SHARE.labels(self.model_name).set(dataset_result.share_of_drifted_columns)
+        DRIFT_PREDICTION_SCORE.labels(self.model_name).set(prediction_result.drift_score)
+        if self.sketch_dir:
+            # Same layout as the reference profile, so that the windows of
+            # several pods can be merged. The pid keeps their files apart.
+            self._write_sketches(current, self.sketch_dir, os.getpid())
+        if self.workspace:
+            try:
+                self._upload(snapshot)
+            except Exception:
+                # The window is dropped rather than retried, so that an
+                # unavailable workspace does not hold the sketches back.
+                logger.exception(f"Failed to upload the drift snapshot of {self.model_name}")
+        DRIFT_FLUSH_SECONDS.labels(self.model_name).set(time.perf_counter() - start)
+        logger.info(
+            f"Drift of {self.model_name} from {current['window_start']} to {current['window_end']}: "
+            f"{current['prediction']['count']} rows, "
+            f"{dataset_result.share_of_drifted_columns:.0%} of the features drifted, "
+            f"prediction drift score {prediction_result.drift_score:.4f}"
+        )
+        return snapshot
+
+    def _window_stamp(self) -> str:
+        return datetime.fromtimestamp(self.window_start).strftime("%Y%m%dT%H%M%S")
+
+    def _merge_workers(self, current: dict):
+        """Return the window of all the workers in the first one, None in the others."""
+        # Empty windows are written too, so that the first worker does not
+        # wait for them.
+        self._write_sketches(current, self.merge_dir, self.worker_index)
+        if self.worker_index != 0:
+            return None
+        prefix = os.path.join(self.merge_dir, f"{self.model_name}-{self._window_stamp()}-")
+        pattern = f"{prefix}*.json"
+        deadline = time.monotonic() + self.merge_timeout
+        paths = glob.glob(pattern)
+        while len(paths) < self.workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+            paths = glob.glob(pattern)
+        if len(paths) < self.workers:
+            logger.warning(
+                f"Only {len(paths)} of {self.workers} workers wrote the drift window of "
+                f"{self.model_name} within {self.merge_timeout}s"
+            )
+        merged = {**current, "model_versions": set()}
+        merged["columns"] = {name: new_sketch() for name in self.columns}
+        merged["prediction"] = new_sketch()
+        for path in paths:
+            with open(path) as f:
+                window = json.load(f)
+            os.remove(path)
+            merged["model_versions"].update(window["model_versions"])
+            merged["window_end"] = max(merged["window_end"], window["window_end"])
+            for name in self.columns:
+                merged["columns"][name] = sketch_merge(
+                    merged["columns"][name], sketch_from_json(window["columns"][name])
+                )
+            merged["prediction"] = sketch_merge(
+                merged["prediction"], sketch_from_json(window["prediction"])
+            )
+        merged["model_versions"] = sorted(merged["model_versions"])
+        # Windows of previous periods written after their merge are dropped.
+        for path in glob.glob(os.path.join(self.merge_dir, f"{self.model_name}-*.json")):
+            if path < prefix:
+                os.remove(path)
+        return merged
+
+    def _write_sketches(self, current: dict, directory: str, suffix):
+        os.makedirs(directory, exist_ok=True)
+        filename = f"{self.model_name}-{self._window_stamp()}-{suffix}.json"
+        # Renamed once complete, so that no worker reads a partial file.
+        tmp_path = os.path.join(directory, f".{filename}")
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    **current,
+                    "columns": {name: sketch_to_json(s) for name, s in current["columns"].items()},
+                    "prediction": sketch_to_json(current["prediction"]),
+                },
+                f,
+            )
+        os.replace(tmp_path, os.path.join(directory, filename))
+
+    def _upload(self, snapshot: Snapshot):
+        if self._workspace is None:
+            self._workspace = RemoteWorkspace(self.workspace)
+        self._workspace.add_snapshot(self.project_id, snapshot)
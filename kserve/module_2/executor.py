@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from prometheus_client import Gauge
+
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "executor_queue_depth",
+    "Predict calls waiting for a free worker",
+    ["model_name"],
+    multiprocess_mode="livesum",
+)
+EXECUTOR_BUSY_WORKERS = Gauge(
+    "executor_busy_workers",
+    "Workers currently running a predict call",
+    ["model_name"],
+    multiprocess_mode="livesum",
+)
+# One series per process under `prefork`, labelled by pid.
+EXECUTOR_UTILIZATION = Gauge(
+    "executor_utilization",
+    "Share of pool workers currently busy",
+    ["model_name"],
+    multiprocess_mode="liveall",
+)
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when the bounded queue is full. HTTP Servers should return HTTP_429."""
+
+
+class BoundedExecutor:
+    """Run CPU-bound calls off the event loop on a thread or process pool.
+
+    At most `max_workers + max_queue_size` calls are admitted at once; any call
+    beyond that fails fast with `ExecutorSaturated` instead of queueing forever.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        pool_type: str = "thread",
+        max_workers: int = 1,
+        max_queue_size: int = 16,
+        initializer=None,
+        initargs=(),
+    ):
+        if pool_type not in ("thread", "process"):
+            raise ValueError(f"Unknown pool type '{pool_type}', expected thread or process")
+        self.model_name = model_name
+        self.pool_type = pool_type
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.initializer = initializer
+        self.in_flight = 0
+        self.pool = self._make_pool(initargs)
+
+    def _make_pool(self, initargs):
+        if self.pool_type == "thread":
+            return ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=self.initializer,
+                initargs=initargs,
+            )
+        # Forking a process that already runs the event loop and server
+        # threads can deadlock the children, use spawn like kserve does.
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+            initargs=initargs,
+        )
+
+    def _warm_up(self, pool, fn, args):
+        # Submitting one call per worker at once starts all of them.
+        for warmup in [pool.submit(fn, *args) for _ in range(self.max_workers)]:
+            warmup.result()
+
+    def warm_up(self, fn, *args):
+        """Start every worker of the pool and run `fn` on it."""
+        self._warm_up(self.pool, fn, args)
+
+    def restart(self, initargs, warmup_fn=None, warmup_args=()):
+        """Replace the pool with fresh workers built from `initargs`.
+
+        New workers are warmed up before they start taking traffic. Calls
+        already submitted to the old pool still run to completion on it.
+        """
+        pool = self._make_pool(initargs)
+        if warmup_fn is not None:
+            self._warm_up(pool, warmup_fn, warmup_args)
+        old_pool, self.pool = self.pool, pool
+        old_pool.shutdown(wait=False)
+
+    @property
+    def busy_workers(self) -> int:
+        return min(self.in_flight, self.max_workers)
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.max_workers)
+
+    @property
+    def utilization(self) -> float:
+        return self.busy_workers / self.max_workers
+
+    def _update_metrics(self):
+        EXECUTOR_QUEUE_DEPTH.labels(self.model_name).set(self.queue_depth)
+        EXECUTOR_BUSY_WORKERS.labels(self.model_name).set(self.busy_workers)
+        EXECUTOR_UTILIZATION.labels(self.model_name).set(self.utilization)
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.max_workers + self.max_queue_size:
+            raise ExecutorSaturated(
+                f"{self.in_flight} predict calls in flight for model '{self.model_name}'"
+            )
+        self.in_flight += 1
+        self._update_metrics()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self._update_metrics()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import registry
+
+MANIFEST = "cache_manifest.json"
+
+
+def _tree_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for file_name in sorted(files):
+            if file_name == MANIFEST:
+                continue
+            file_path = os.path.join(root, file_name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tree_stat(path: str) -> list:
+    """The relative path, size and modification time of each file of `path`."""
+    stat = []
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            if file_name == MANIFEST:
+                continue
+            file_path = os.path.join(root, file_name)
+            file_stat = os.stat(file_path)
+            stat.append(
+                [os.path.relpath(file_path, path), file_stat.st_size, file_stat.st_mtime_ns]
+            )
+    return sorted(stat)
+
+
+def _tree_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, file_name))
+        for root, _, files in os.walk(path)
+        for file_name in files
+    )
+
+
+class ModelCache:
+    """Content-addressed on-disk cache of registered MLflow models.
+
+    Entries are keyed by model name, resolved version and the model source, so
+    `models:/<name>@<alias>` only hits the tracking server to resolve the alias.
+    The artifact checksum is computed once, when an entry is downloaded, and
+    stored next to it with the size and modification time of its files. A
+    read only hashes the files again if one of those changed.
+    The least recently used entries are evicted once `max_bytes` is exceeded.
+
+    `client` resolves the versions, with the `get_model_version_by_alias` and
+    `get_model_version` methods of an `MlflowClient` or functions of `registry`.
+    """
+
+    def __init__(
+        self, cache_dir: str, client, max_bytes: int = 2 * 1024**3, verify: bool = True
+    ):
+        self.cache_dir = cache_dir
+        self.client = client
+        self.max_bytes = max_bytes
+        self.verify = verify
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _model_version(self, model_uri: str):
+        reference = model_uri[len("models:/"):]
+        if "@" in reference:
+            registered_name, alias = reference.split("@", 1)
+            return self.client.get_model_version_by_alias(registered_name, alias)
+        registered_name, version = reference.split("/", 1)
+        return self.client.get_model_version(registered_name, version)
+
+    def _entry_path(self, model_version) -> str:
+        key = hashlib.sha256(
+            f"{model_version.name}\0{model_version.version}\0{model_version.source}".encode()
+        ).hexdigest()
+        return os.path.join(self.cache_dir, key)
+
+    def _read_manifest(self, entry: str):
+        try:
+            with open(os.path.join(entry, MANIFEST)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, entry: str, manifest: dict):
+        with open(os.path.join(entry, MANIFEST), "w") as f:
+            json.dump(manifest, f)
+
+    def _is_intact(self, entry: str, manifest: dict) -> bool:
+        if not self.verify:
+            return True
+        stat = _tree_stat(entry)
+        if manifest.get("stat") == stat:
+            return True
+        if manifest["checksum"] != _tree_checksum(entry):
+            return False
+        # Same content, but touched or copied: no need to hash it again next time.
+        manifest["stat"] = stat
+        self._write_manifest(entry, manifest)
+        return True
+
+    def local_path(self, model_uri: str) -> str:
+        """Return a local copy of `model_uri`, downloading it on a cache miss."""
+        if not model_uri.startswith("models:/"):
+            return model_uri
+        model_version = self._model_version(model_uri)
+        entry = self._entry_path(model_version)
+        manifest = self._read_manifest(entry)
+        if manifest is not None and self._is_intact(entry, manifest):
+            os.utime(os.path.join(entry, MANIFEST))
+            return entry
+        shutil.rmtree(entry, ignore_errors=True)
+
+        import mlflow
+
+        staging = tempfile.mkdtemp(dir=self.cache_dir, prefix=".download-")
+        try:
+            mlflow.artifacts.download_artifacts(
+                artifact_uri=f"models:/{model_version.name}/{model_version.version}",
+                dst_path=staging,
+            )
+            manifest = {
+                "name": model_version.name,
+                "version": model_version.version,
+                "source": model_version.source,
+                "checksum": _tree_checksum(staging),
+                "stat": _tree_stat(staging),
+                "size": _tree_size(staging),
+            }
+            self._write_manifest(staging, manifest)
+            # Another process may have filled the same entry in the meantime.
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.evict(keep=entry)
+        return entry
+
+    def load_model(self, model_uri: str):
+        import mlflow
+
+        return mlflow.pyfunc.load_model(self.local_path(model_uri))
+
+    def evict(self, keep: str = None):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            manifest = self._read_manifest(entry)
+            if manifest is None:
+                continue
+            last_used = os.path.getmtime(os.path.join(entry, MANIFEST))
+            entries.append((last_used, entry, manifest["size"]))
+        total = sum(size for _, _, size in entries)
+        for _, entry, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def load_model(model_uri: str, cache_dir: str = None, max_bytes: int = 2 * 1024**3):
+    """`mlflow.pyfunc.load_model` going through a `ModelCache` when `cache_dir` is set."""
+    if not cache_dir:
+        import mlflow
+
+        return mlflow.pyfunc.load_model(model_uri)
+    return ModelCache(cache_dir, registry, max_bytes).load_model(model_uri)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_uri", type=str, required=True)
+    parser.add_argument("--cache_dir", type=str, required=True)
+    parser.add_argument("--loads", type=int, default=3)
+    args = parser.parse_args()
+
+    for i in range(args.loads):
+        start = time.perf_counter()
+        load_model(args.model_uri, args.cache_dir)
+        print(f"load {i}: {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,132 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from prometheus_client import Counter, Gauge
+
+FEATURES = ["Tenure", "MonthlyCharges", "ContractType", "SupportTickets"]
+
+CACHE_LOOKUPS = Counter(
+    "prediction_cache_lookups", "Rows looked up in the prediction cache", ["model_name", "result"]
+)
+# One series per process under `prefork`, labelled by pid.
+CACHE_HIT_RATE = Gauge(
+    "prediction_cache_hit_rate",
+    "Share of rows served from the prediction cache",
+    ["model_name"],
+    multiprocess_mode="liveall",
+)
+CACHE_BYTES = Gauge(
+    "prediction_cache_bytes",
+    "Approximate memory used by the prediction cache",
+    ["model_name"],
+    multiprocess_mode="livesum",
+)
+CACHE_ENTRIES = Gauge(
+    "prediction_cache_entries",
+    "Rows held in the prediction cache",
+    ["model_name"],
+    multiprocess_mode="livesum",
+)
+
+# Per entry overhead of the OrderedDict and of its (expiry, prediction) tuple.
+_ENTRY_OVERHEAD = 100 + sys.getsizeof((0.0, 0))
+
+
+def row_keys(input_features) -> list:
+    """Return one hashable key per row of `input_features`.
+
+    Rows are canonicalized to float64 in the `FEATURES` order when columns are
+    named, with a single representation for -0.0 and NaN, so equal feature
+    vectors get the same key whatever the request encoding.
+    """
+    if isinstance(input_features, pd.DataFrame) and set(FEATURES) <= set(input_features.columns):
+        input_features = input_features[FEATURES]
+    rows = np.array(input_features, dtype=np.float64, order="C") + 0.0
+    rows[np.isnan(rows)] = np.nan
+    buffer, width = rows.tobytes(), rows.itemsize * rows.shape[1]
+    return [buffer[i : i + width] for i in range(0, len(buffer), width)]
+
+
+class PredictionCache:
+    """LRU cache of per-row predictions, with a TTL, for one model version.
+
+    Predictions stored for another version than the current one are ignored,
+    so results of requests still running on a swapped-out model never leak
+    into the cache of the new one.
+    """
+
+    def __init__(self, model_name: str, max_entries: int = 100_000, ttl: float = 300.0):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def invalidate(self, version=None):
+        """Drop all entries and start caching predictions of `version`."""
+        with self._lock:
+            self.version = version
+            self._entries = OrderedDict()
+            self.nbytes = 0
+        self._report()
+
+    def lookup(self, version, keys: list, out: np.ndarray) -> np.ndarray:
+        """Fill `out` with the cached predictions of `keys`, return the indices of the misses."""
+        if version != self.version:
+            return np.arange(len(keys))
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries
+            for i, key in enumerate(keys):
+                entry = entries.get(key)
+                if entry is None:
+                    missing.append(i)
+                elif entry[0] < now:
+                    del entries[key]
+                    self.nbytes -= sys.getsizeof(key) + _ENTRY_OVERHEAD
+                    missing.append(i)
+                else:
+                    entries.move_to_end(key)
+                    out[i] = entry[1]
+        n_hits = len(keys) - len(missing)
+        self.hits += n_hits
+        self.misses += len(missing)
+        CACHE_LOOKUPS.labels(self.model_name, "hit").inc(n_hits)
+        CACHE_LOOKUPS.labels(self.model_name, "miss").inc(len(missing))
+        self._report()
+        return np.asarray(missing, dtype=np.intp)
+
+    def store(self, version, keys: list, predictions):
+        if version != self.version:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            entries = self._entries
+            for key, prediction in zip(keys, predictions.tolist()):
+                if key not in entries:
+                    self.nbytes += sys.getsizeof(key) + _ENTRY_OVERHEAD
+                entries[key] = (expires_at, prediction)
+                entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                key, _ = entries.popitem(last=False)
+                self.nbytes -= sys.getsizeof(key) + _ENTRY_OVERHEAD
+        self._report()
+
+    def _report(self):
+        CACHE_HIT_RATE.labels(self.model_name).set(self.hit_rate)
+        CACHE_BYTES.labels(self.model_name).set(self.nbytes)
+        CACHE_ENTRIES.labels(self.model_name).set(len(self._entries))
@@ -0,0 +1,136 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from kserve.errors import InvalidInput
+
+import tree_engine
+
+
+def _converts_to_float32(estimator) -> bool:
+    """Whether `estimator` casts its input to float32 itself, like sklearn trees and forests."""
+    if isinstance(estimator, tree_engine.CompiledForest):
+        return True
+    from sklearn.ensemble import (
+        ExtraTreesClassifier,
+        ExtraTreesRegressor,
+        GradientBoostingClassifier,
+        GradientBoostingRegressor,
+        RandomForestClassifier,
+        RandomForestRegressor,
+    )
+    from sklearn.tree import BaseDecisionTree
+
+    return isinstance(
+        estimator,
+        (
+            BaseDecisionTree,
+            ExtraTreesClassifier,
+            ExtraTreesRegressor,
+            GradientBoostingClassifier,
+            GradientBoostingRegressor,
+            RandomForestClassifier,
+            RandomForestRegressor,
+        ),
+    )
+
+
+class NativeSklearnPredictor:
+    """Call a scikit-learn estimator directly instead of through its pyfunc wrapper.
+
+    For tree models, column names and order are checked once per distinct
+    set of request columns, after which inputs go straight to the estimator
+    as a contiguous float32 array, the dtype sklearn trees convert to
+    internally anyway. Other estimators, pipelines included, get the input
+    unchanged, as a float32 cast would lose precision or fail on
+    non-numeric columns.
+    """
+
+    def __init__(self, estimator, metadata: dict = None):
+        self.estimator = estimator
+        self.metadata = metadata
+        self.float32 = _converts_to_float32(estimator)
+        self.feature_names = None
+        self._column_orders = {}
+        if self.float32:
+            self.n_features = estimator.n_features_in_
+            if hasattr(estimator, "feature_names_in_"):
+                self.feature_names = list(estimator.feature_names_in_)
+                # Validation is done here, this stops sklearn from re-checking
+                # (and warning about) feature names on every call.
+                del estimator.feature_names_in_
+
+    def _column_order(self, columns):
+        order = self._column_orders.get(columns)
+        if order is None:
+            if self.feature_names is None:
+                order = list(range(len(columns)))
+            else:
+                missing = set(self.feature_names) - set(columns)
+                if missing:
+                    raise InvalidInput(f"Missing input columns {sorted(missing)}")
+                order = [columns.index(name) for name in self.feature_names]
+            self._column_orders[columns] = order
+        return order
+
+    def _to_array(self, input_features) -> np.ndarray:
+        if isinstance(input_features, pd.DataFrame):
+            order = self._column_order(tuple(input_features.columns))
+            input_features = input_features.to_numpy()[:, order]
+        input_features = np.asarray(input_features)
+        if input_features.ndim != 2 or input_features.shape[1] != self.n_features:
+            raise InvalidInput(
+                f"Expected input of shape (n, {self.n_features}), got {input_features.shape}"
+            )
+        try:
+            return np.ascontiguousarray(input_features, dtype=np.float32)
+        except (TypeError, ValueError) as e:
+            raise InvalidInput(f"Expected numeric input features: {e}")
+
+    def predict(self, input_features):
+        if self.float32:
+            input_features = self._to_array(input_features)
+        return self.estimator.predict(input_features)
+
+
+def _load_sklearn(model_path: str, flavor_conf: dict):
+    """`mlflow.sklearn.load_model` for a local model, without importing mlflow when possible."""
+    serialization_format = flavor_conf.get("serialization_format", "pickle")
+    if flavor_conf.get("code") or serialization_format not in ("pickle", "cloudpickle"):
+        import mlflow
+
+        return mlflow.sklearn.load_model(model_path)
+    with open(os.path.join(model_path, flavor_conf["pickled_model"]), "rb") as f:
+        if serialization_format == "cloudpickle":
+            import cloudpickle
+
+            return cloudpickle.load(f)
+        return pickle.load(f)
+
+
+def load_predictor(model_uri: str, native: bool = True):
+    """Load `model_uri` with the cheapest predictor available for its flavor.
+
+    Local sklearn and compiled forest models are loaded without importing
+    mlflow, which is the largest contributor to the server start-up time.
+    """
+    if native:
+        model_path = model_uri
+        if not os.path.isdir(model_path):
+            import mlflow
+
+            model_path = mlflow.artifacts.download_artifacts(artifact_uri=model_uri)
+        with open(os.path.join(model_path, "MLmodel")) as f:
+            metadata = yaml.safe_load(f)
+        flavors = metadata["flavors"]
+        if tree_engine.FLAVOR_NAME in flavors:
+            return NativeSklearnPredictor(tree_engine.load_model(model_path), metadata)
+        if "sklearn" in flavors:
+            return NativeSklearnPredictor(_load_sklearn(model_path, flavors["sklearn"]), metadata)
+        model_uri = model_path
+    import mlflow
+
+    return mlflow.pyfunc.load_model(model_uri)
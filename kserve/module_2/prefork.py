@@ -0,0 +1,122 @@
+import gc
+import os
+import signal
+
+import uvicorn
+from fastapi import Request, Response
+from kserve import Model, ModelServer
+from kserve.constants.constants import FASTAPI_APP_IMPORT_STRING
+from kserve.logging import logger
+from kserve.model_server import args
+from kserve.protocol.rest.server import RESTServer
+from prometheus_client import CollectorRegistry, exposition, multiprocess
+
+from protocol import BinaryTensorDataPlane
+
+
+async def _metrics_handler(request: Request) -> Response:
+    """`/metrics` of all the workers, added up from `PROMETHEUS_MULTIPROC_DIR`."""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    encoder, content_type = exposition.choose_encoder(request.headers.get("accept"))
+    return Response(content=encoder(registry), headers={"content-type": content_type})
+
+
+class _WorkerRESTServer(RESTServer):
+    def _register_endpoints(self, app):
+        # Registered before the routes of KServe, whose /metrics only has the
+        # metrics of the worker that happens to accept the scrape.
+        app.add_api_route("/metrics", _metrics_handler, methods=["GET"])
+        super()._register_endpoints(app)
+
+
+def _serve_worker(model: Model, sockets, http_port: int):
+    model_server = ModelServer(http_port=http_port)
+    model_server.dataplane = BinaryTensorDataPlane(
+        model_registry=model_server.registered_models,
+        predictor_config=model_server.dataplane.predictor_config,
+    )
+    model_server.register_model(model)
+    model.start()
+    rest_server = _WorkerRESTServer(
+        FASTAPI_APP_IMPORT_STRING,
+        model_server.dataplane,
+        model_server.model_repository_extension,
+        http_port,
+        access_log_format=model_server.access_log_format,
+        grace_period=model_server.grace_period,
+    )
+    rest_server.run(sockets=sockets)
+
+
+def _fork_worker(model: Model, sockets, http_port: int, index: int, workers: int) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    model.prefork_index = index
+    model.prefork_workers = workers
+    exit_code = 0
+    try:
+        _serve_worker(model, sockets, http_port)
+    except Exception:
+        logger.exception("Worker failed")
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+def serve(model: Model, workers: int, http_port: int = args.http_port):
+    """Serve an already loaded `model` from `workers` forked processes.
+
+    All workers accept connections on one listening socket bound here, and
+    share the model memory of this process copy-on-write. The parent process
+    only restarts workers that die and forwards termination signals.
+    `model.start()` is called in each worker, after the fork, with the index
+    of the worker and the number of workers set as `model.prefork_index` and
+    `model.prefork_workers`. A restarted worker takes the index of the one
+    that died.
+
+    The workers write their metrics to `PROMETHEUS_MULTIPROC_DIR`, which must
+    be set to an empty directory before the server starts, as
+    prometheus_client reads it when it is imported. `/metrics` adds them up.
+    """
+    if getattr(model, "executor", None) is not None:
+        # Its threads or pool processes would not exist in the workers.
+        raise ValueError("Serve the model before start(): each worker starts its own executor")
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        raise ValueError(
+            "Set PROMETHEUS_MULTIPROC_DIR to an empty directory before starting the server, "
+            "so that /metrics adds up the metrics of every worker"
+        )
+    sockets = [uvicorn.Config(None, host="0.0.0.0", port=http_port).bind_socket()]
+    # Keep the garbage collector of the workers from writing to the pages of
+    # objects created before the fork, which would un-share them.
+    gc.collect()
+    gc.freeze()
+
+    stopping = False
+    # The index of the worker of each pid.
+    pids = {
+        _fork_worker(model, sockets, http_port, index, workers): index
+        for index in range(workers)
+    }
+    logger.info(f"Started workers {sorted(pids)} on port {http_port}")
+
+    def stop(sig, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in pids:
+            os.kill(pid, sig)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while pids:
+        pid, status = os.wait()
+        index = pids.pop(pid)
+        # Drops the gauges of the dead worker from the live* modes.
+        multiprocess.mark_process_dead(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting it")
+            pids[_fork_worker(model, sockets, http_port, index, workers)] = index
@@ -0,0 +1,74 @@
+import orjson
+
+from typing import Dict, Union
+from kserve import InferInput, InferRequest
+from kserve.constants.constants import INFERENCE_CONTENT_LENGTH_HEADER
+from kserve.errors import InvalidInput
+from kserve.protocol.dataplane import DataPlane
+from kserve.protocol.infer_type import RequestedOutput
+from kserve.protocol.rest.v2_datamodels import InferenceRequest
+
+
+def decode_binary_request(body: bytes, json_length: int, model_name: str) -> InferRequest:
+    """Build an InferRequest from a V2 binary tensor extension payload.
+
+    Unlike `InferRequest.from_bytes`, the raw tensors are kept as memoryview
+    slices of the request body, so `InferInput.as_numpy()` decodes them with
+    `np.frombuffer` instead of going through Python lists.
+    """
+    view = memoryview(body)
+    try:
+        request = orjson.loads(view[:json_length])
+    except orjson.JSONDecodeError as e:
+        raise InvalidInput(f"Unrecognized request format: {e}")
+
+    infer_inputs = []
+    raw_inputs = []
+    start_index = json_length
+    for input_ in request["inputs"]:
+        parameters = input_.get("parameters", None)
+        infer_input = InferInput(
+            name=input_["name"],
+            shape=input_["shape"],
+            datatype=input_["datatype"],
+            data=input_.get("data", None),
+            parameters=parameters,
+        )
+        raw_input = None
+        if infer_input.data is None:
+            if not parameters or "binary_data_size" not in parameters:
+                raise InvalidInput(
+                    f"'data' field is missing for input '{infer_input.name}' for model '{model_name}'"
+                )
+            end_index = start_index + parameters["binary_data_size"]
+            raw_input = view[start_index:end_index]
+            start_index = end_index
+        infer_inputs.append(infer_input)
+        raw_inputs.append(raw_input)
+
+    request_outputs = None
+    if request.get("outputs", None) is not None:
+        request_outputs = [
+            RequestedOutput(name=output["name"], parameters=output.get("parameters", None))
+            for output in request["outputs"]
+        ]
+    return InferRequest(
+        model_name=model_name,
+        infer_inputs=infer_inputs,
+        request_id=request.get("id", None),
+        raw_inputs=raw_inputs,
+        parameters=request.get("parameters", None),
+        request_outputs=request_outputs,
+    )
+
+
+class BinaryTensorDataPlane(DataPlane):
+    """DataPlane decoding binary tensor payloads without intermediate copies."""
+
+    def decode_inference_request(
+        self, body: Union[bytes, InferenceRequest], headers: Dict, model_name: str
+    ) -> InferRequest:
+        json_length = headers.get(INFERENCE_CONTENT_LENGTH_HEADER, None)
+        if isinstance(body, bytes) and json_length is not None:
+            return decode_binary_request(body, int(json_length), model_name)
+        return super().decode_inference_request(body, headers, model_name)
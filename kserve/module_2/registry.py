@@ -0,0 +1,52 @@
+import os
+from collections import namedtuple
+
+import httpx
+
+# The fields of mlflow.entities.model_registry.ModelVersion used by the server.
+ModelVersion = namedtuple("ModelVersion", ["name", "version", "source"])
+
+
+def _rest_get(endpoint: str, params: dict):
+    """Call the MLflow REST API of an HTTP tracking server, or return None if there is none."""
+    tracking_uri = os.getenv("MLFLOW_TRACKING_URI", "")
+    if not tracking_uri.startswith(("http://", "https://")):
+        return None
+    headers, auth = {}, None
+    if os.getenv("MLFLOW_TRACKING_TOKEN"):
+        headers["Authorization"] = f"Bearer {os.environ['MLFLOW_TRACKING_TOKEN']}"
+    elif os.getenv("MLFLOW_TRACKING_USERNAME"):
+        auth = (os.environ["MLFLOW_TRACKING_USERNAME"], os.getenv("MLFLOW_TRACKING_PASSWORD", ""))
+    response = httpx.get(
+        f"{tracking_uri.rstrip('/')}/api/2.0/mlflow/{endpoint}",
+        params=params,
+        headers=headers,
+        auth=auth,
+        timeout=30,
+    )
+    response.raise_for_status()
+    model_version = response.json()["model_version"]
+    return ModelVersion(model_version["name"], model_version["version"], model_version["source"])
+
+
+def get_model_version_by_alias(name: str, alias: str):
+    """`MlflowClient.get_model_version_by_alias` that does not import mlflow for HTTP servers.
+
+    Importing mlflow takes seconds, which would be paid on every cold start
+    only to resolve the alias of a model already in the local cache.
+    """
+    model_version = _rest_get("registered-models/alias", {"name": name, "alias": alias})
+    if model_version is None:
+        from mlflow.tracking import MlflowClient
+
+        model_version = MlflowClient().get_model_version_by_alias(name, alias)
+    return model_version
+
+
+def get_model_version(name: str, version: str):
+    model_version = _rest_get("model-versions/get", {"name": name, "version": version})
+    if model_version is None:
+        from mlflow.tracking import MlflowClient
+
+        model_version = MlflowClient().get_model_version(name, version)
+    return model_version
@@ -1,41 +1,411 @@
-import mlflow
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
 
-from typing import Dict
+from http import HTTPStatus
+from typing import Dict, Union
+from fastapi import HTTPException
+from prometheus_client import Gauge
 from kserve import InferRequest, InferResponse, InferOutput, Model, ModelServer
+from kserve.logging import logger
 from kserve.utils.utils import get_predict_input, generate_uuid
 
+import prefork
+import registry
+from batching import MicroBatcher
+from executor import BoundedExecutor, ExecutorSaturated
+from model_cache import ModelCache
+from prediction_cache import PredictionCache, row_keys
+from predictors import load_predictor
+from protocol import BinaryTensorDataPlane
+from stage_metrics import NoStageMetrics, StageMetrics
+from warmup import warmup_batches, warmup_request
+
+# The multiprocess modes combine the gauges of the workers of `prefork`.
+MODEL_VERSION = Gauge(
+    "model_version",
+    "Registry version being served",
+    ["model_name"],
+    multiprocess_mode="livemostrecent",
+)
+MODEL_SWAP_SECONDS = Gauge(
+    "model_swap_seconds",
+    "Load and warm-up time of the last model swap",
+    ["model_name"],
+    multiprocess_mode="livemostrecent",
+)
+MODEL_WARMUP_SECONDS = Gauge(
+    "model_warmup_seconds",
+    "Duration of the warm-up run before readiness",
+    ["model_name"],
+    multiprocess_mode="livesum",
+)
+
+# Model copy owned by each worker of a process pool executor.
+_worker_model = None
+
+
+def _init_worker(model_uri: str, cache_dir: str = None, native: bool = True):
+    global _worker_model
+    if cache_dir:
+        model_uri = ModelCache(cache_dir, registry).local_path(model_uri)
+    _worker_model = load_predictor(model_uri, native)
+
+
+def _worker_predict(input_features):
+    return _worker_model.predict(input_features)
+
 
 class SampleModel(Model):
-    def __init__(self, name: str):
+    def __init__(
+        self,
+        name: str,
+        model_uri: str = None,
+        max_batch_size: int = 1,
+        max_batch_wait_ms: float = 5.0,
+        executor: str = None,
+        executor_workers: int = 1,
+        executor_queue_size: int = 16,
+        poll_interval: float = 0,
+        cache_dir: str = None,
+        cache_max_bytes: int = 2 * 1024**3,
+        native: bool = True,
+        prediction_cache_size: int = 0,
+        prediction_cache_ttl: float = 300.0,
+        stage_metrics: bool = False,
+        warmup_batch_sizes=(),
+        drift_profile: str = None,
+        drift_window_seconds: float = 3600.0,
+        drift_workspace: str = None,
+        drift_project_id: str = None,
+        drift_sketch_dir: str = None,
+    ):
         super().__init__(name)
         self.name = name
+        self.model_uri = model_uri or f"models:/{name}@production-live"
+        self.model_version = None
+        self.poll_interval = poll_interval
+        self._sample_input = None
+        self._stop_watching = threading.Event()
+        self.native = native
+        self.cache_dir = cache_dir
+        self.model_cache = ModelCache(cache_dir, registry, cache_max_bytes) if cache_dir else None
+        self.batcher = None
+        if max_batch_size > 1:
+            self.batcher = MicroBatcher(
+                self._predict_batch,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_batch_wait_ms,
+            )
+        self.metrics = StageMetrics(name) if stage_metrics else NoStageMetrics()
+        self.prediction_cache = None
+        if prediction_cache_size > 0:
+            self.prediction_cache = PredictionCache(
+                name, prediction_cache_size, prediction_cache_ttl
+            )
+        self.drift_monitor = None
+        # Set by `prefork` in each worker, before `start`.
+        self.prefork_index = 0
+        self.prefork_workers = 1
+        if drift_profile:
+            # Only imported when enabled, as scipy and evidently take seconds to import.
+            try:
+                from drift_monitor import DriftMonitor
+            except ImportError as e:
+                raise ImportError(
+                    f"Drift monitoring needs the packages of requirements-drift.txt: {e}"
+                ) from e
+
+            self.drift_monitor = DriftMonitor(
+                name,
+                drift_profile,
+                window_seconds=drift_window_seconds,
+                workspace=drift_workspace,
+                project_id=drift_project_id,
+                sketch_dir=drift_sketch_dir,
+            )
         self.load()
+        self._warmup_batches = []
+        if warmup_batch_sizes:
+            self._warmup_batches = warmup_batches(
+                getattr(self.model, "metadata", None), warmup_batch_sizes
+            )
+        # Created in start(), see _start_executor.
+        self.executor = None
+        self.executor_type = executor
+        self.executor_workers = executor_workers
+        self.executor_queue_size = executor_queue_size
+        self.warm_up()
+        self.ready = True
+
+    def _resolve_model_uri(self):
+        """Pin a `models:/<name>@<alias>` URI to the version the alias points to."""
+        if not self.model_uri.startswith("models:/") or "@" not in self.model_uri:
+            return self.model_uri, None
+        registered_name, alias = self.model_uri[len("models:/"):].split("@", 1)
+        version = registry.get_model_version_by_alias(registered_name, alias).version
+        return f"models:/{registered_name}/{version}", version
+
+    def _load_model(self, model_uri: str):
+        if self.model_cache is not None:
+            model_uri = self.model_cache.local_path(model_uri)
+        return load_predictor(model_uri, self.native)
 
     def load(self):
 
-        self.model = mlflow.pyfunc.load_model(f"models:/{self.name}@production-live")
-        self.ready = True
+        self.loaded_uri, self.model_version = self._resolve_model_uri()
+        self.model = self._load_model(self.loaded_uri)
+        if self.model_version is not None:
+            MODEL_VERSION.labels(self.name).set(int(self.model_version))
+        if self.prediction_cache is not None:
+            self.prediction_cache.invalidate(self.model_version)
+        self.metrics.set_version(self.model_version)
 
-    def predict(
-        self, payload: InferRequest, headers: Dict[str, str] = None
-    ) -> InferResponse:
-        
-        input_features = get_predict_input(
-            payload,
+    def _warmup_inputs(self) -> list:
+        if self._warmup_batches:
+            return self._warmup_batches
+        return [] if self._sample_input is None else [self._sample_input]
+
+    def warm_up(self):
+        """Send the warm-up batches through the request path before readiness.
+
+        Covers input decoding, the model and response encoding, but not the
+        micro-batcher, prediction cache or stage metrics, which would
+        otherwise account for warm-up traffic. Executor workers are warmed
+        up when they are started, see `_start_executor`.
+        """
+        if not self._warmup_batches:
+            return
+        start = time.perf_counter()
+        self._warm_up_model(self.model, self._warmup_batches)
+        warmup_seconds = time.perf_counter() - start
+        MODEL_WARMUP_SECONDS.labels(self.name).set(warmup_seconds)
+        logger.info(
+            f"Warmed up {self.name} on batches of {[len(rows) for rows in self._warmup_batches]} "
+            f"rows in {warmup_seconds:.2f}s"
         )
-        response_id = generate_uuid()
 
-        result = self.model.predict(input_features)
+    def _warm_up_model(self, model, batches: list):
+        """Send `batches` through input decoding, `model` and response encoding."""
+        for rows in batches:
+            rows = np.asarray(rows, dtype=np.float64)
+            input_features = get_predict_input(warmup_request(self.name, rows))
+            result = model.predict(input_features)
+            self._infer_response(result, generate_uuid()).to_rest()
+
+    def _start_executor(self):
+        """Create the executor and start every worker on the warm-up batches.
 
+        This runs in `start`, in the process that serves requests: with
+        `prefork`, each forked worker creates its own pool, as threads and
+        pool processes started before a fork do not exist in the children.
+        """
+        if self.executor_type == "thread":
+            self.executor = BoundedExecutor(
+                self.name, "thread", self.executor_workers, self.executor_queue_size
+            )
+        elif self.executor_type == "process":
+            self.executor = BoundedExecutor(
+                self.name,
+                "process",
+                self.executor_workers,
+                self.executor_queue_size,
+                initializer=_init_worker,
+                initargs=(self.loaded_uri, self.cache_dir, self.native),
+            )
+        else:
+            return
+        start = time.perf_counter()
+        for rows in self._warmup_batches:
+            input_features = get_predict_input(warmup_request(self.name, rows))
+            if self.executor.pool_type == "process":
+                self.executor.warm_up(_worker_predict, input_features)
+            else:
+                self.executor.warm_up(self.model.predict, input_features)
+        if self._warmup_batches:
+            warmup_seconds = time.perf_counter() - start
+            MODEL_WARMUP_SECONDS.labels(self.name).inc(warmup_seconds)
+            logger.info(
+                f"Warmed up {self.executor_workers} {self.executor_type} workers of "
+                f"{self.name} in {warmup_seconds:.2f}s"
+            )
+
+    def start(self):
+        if self.executor is None:
+            self._start_executor()
+        super().start()
+        if self.poll_interval > 0 and self.model_version is not None:
+            threading.Thread(target=self._watch, daemon=True).start()
+        if self.drift_monitor is not None:
+            self.drift_monitor.start(self.prefork_index, self.prefork_workers)
+
+    def _watch(self):
+        while not self._stop_watching.wait(self.poll_interval):
+            try:
+                self.swap_if_updated()
+            except Exception:
+                logger.exception(f"Failed to check for a new version of {self.model_uri}")
+
+    def swap_if_updated(self) -> bool:
+        """Load the version the alias now points to and swap it in once warmed up.
+
+        Requests already dispatched keep the model they started with, so
+        nothing is dropped while the new version is loading.
+        """
+        uri, version = self._resolve_model_uri()
+        if version == self.model_version:
+            return False
+        start = time.perf_counter()
+        model = self._load_model(uri)
+        warmup_inputs = self._warmup_inputs()
+        self._warm_up_model(model, warmup_inputs)
+        if self.executor is not None and self.executor.pool_type == "process":
+            warmup_fn = _worker_predict if warmup_inputs else None
+            self.executor.restart(
+                (uri, self.cache_dir, self.native), warmup_fn, warmup_inputs[-1:]
+            )
+        previous_version = self.model_version
+        self.model, self.loaded_uri, self.model_version = model, uri, version
+        if self.prediction_cache is not None:
+            self.prediction_cache.invalidate(version)
+        self.metrics.set_version(version)
+        swap_seconds = time.perf_counter() - start
+        MODEL_VERSION.labels(self.name).set(int(version))
+        MODEL_SWAP_SECONDS.labels(self.name).set(swap_seconds)
+        logger.info(
+            f"Swapped {self.name} from version {previous_version} to {version} "
+            f"in {swap_seconds:.2f}s"
+        )
+        return True
+
+    async def _predict_batch(self, input_features):
+        model = self.model
+        self.metrics.batch(len(input_features))
+        if self.executor is None:
+            return model.predict(input_features)
+        if self.executor.pool_type == "process":
+            return await self.executor.run(_worker_predict, input_features)
+        return await self.executor.run(model.predict, input_features)
+
+    async def _predict_rows(self, input_features):
+        if self.batcher is not None:
+            return await self.batcher.submit(input_features)
+        return await self._predict_batch(input_features)
+
+    async def _predict_cached(self, input_features):
+        """Only send the rows missing from the prediction cache to the model."""
+        version = self.model_version
+        keys = row_keys(input_features)
+        result = np.empty(len(keys), dtype=np.int64)
+        missing = self.prediction_cache.lookup(version, keys, result)
+        if len(missing) == len(keys):
+            result = np.asarray(await self._predict_rows(input_features), dtype=np.int64)
+        elif len(missing):
+            if isinstance(input_features, pd.DataFrame):
+                input_features = input_features.iloc[missing]
+            else:
+                input_features = input_features[missing]
+            result[missing] = await self._predict_rows(input_features)
+        else:
+            return result
+        self.prediction_cache.store(version, [keys[i] for i in missing], result[missing])
+        return result
+
+    def _infer_response(
+        self, result, response_id: str, use_binary_outputs=False, requested_outputs=None
+    ) -> InferResponse:
+        result = np.asarray(result, dtype=np.int64)
         infer_output = InferOutput(
             name="output-0", shape=list(result.shape), datatype="INT64", data=result
         )
-        infer_response = InferResponse(
-            model_name=self.name, infer_outputs=[infer_output], response_id=response_id
+        return InferResponse(
+            model_name=self.name,
+            model_version=self.model_version,
+            infer_outputs=[infer_output],
+            response_id=response_id,
+            use_binary_outputs=use_binary_outputs,
+            requested_outputs=requested_outputs,
         )
+
+    async def predict(
+        self, payload: Union[Dict, InferRequest], headers: Dict[str, str] = None
+    ) -> Union[Dict, InferResponse]:
+        metrics = self.metrics
+        start = metrics.start()
+        input_features = get_predict_input(
+            payload,
+        )
+        start = metrics.stage("decode", start)
+        response_id = generate_uuid()
+        start = metrics.stage("uuid", start)
+        if self._sample_input is None:
+            self._sample_input = input_features[:1]
+
+        try:
+            if self.prediction_cache is not None:
+                result = await self._predict_cached(input_features)
+            else:
+                result = await self._predict_rows(input_features)
+        except ExecutorSaturated as e:
+            raise HTTPException(status_code=HTTPStatus.TOO_MANY_REQUESTS, detail=str(e))
+        start = metrics.stage("model", start)
+
+        if isinstance(payload, InferRequest):
+            infer_response = self._infer_response(
+                result, response_id, payload.use_binary_outputs, payload.request_outputs
+            )
+        else:
+            # V1 request, as in inputs.json: {"instances": [...]}
+            infer_response = {"predictions": np.asarray(result).tolist()}
+        metrics.stage("response", start)
+        metrics.request(len(result))
+        if self.drift_monitor is not None:
+            self.drift_monitor.observe(input_features, result, self.model_version)
         return infer_response
 
+    def stop(self):
+        self._stop_watching.set()
+        if self.executor is not None:
+            self.executor.shutdown()
+        if self.drift_monitor is not None:
+            self.drift_monitor.stop()
+        super().stop()
+
 
 if __name__ == "__main__":
-    model = SampleModel("ChurnPrediction")
-    ModelServer().start([model])
+    model = SampleModel(
+        os.getenv("MODEL_NAME", "ChurnPrediction"),
+        model_uri=os.getenv("MODEL_URI"),
+        max_batch_size=int(os.getenv("MAX_BATCH_SIZE", "1")),
+        max_batch_wait_ms=float(os.getenv("MAX_BATCH_WAIT_MS", "5")),
+        executor=os.getenv("EXECUTOR"),
+        executor_workers=int(os.getenv("EXECUTOR_WORKERS", "1")),
+        executor_queue_size=int(os.getenv("EXECUTOR_QUEUE_SIZE", "16")),
+        poll_interval=float(os.getenv("MODEL_POLL_INTERVAL", "0")),
+        cache_dir=os.getenv("MODEL_CACHE_DIR"),
+        cache_max_bytes=int(os.getenv("MODEL_CACHE_MAX_BYTES", str(2 * 1024**3))),
+        native=os.getenv("NATIVE_SKLEARN", "true").lower() == "true",
+        prediction_cache_size=int(os.getenv("PREDICTION_CACHE_SIZE", "0")),
+        prediction_cache_ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")),
+        stage_metrics=os.getenv("STAGE_METRICS", "false").lower() == "true",
+        warmup_batch_sizes=[
+            int(size) for size in os.getenv("WARMUP_BATCH_SIZES", "1,16,256").split(",") if size
+        ],
+        drift_profile=os.getenv("DRIFT_REFERENCE_PROFILE"),
+        drift_window_seconds=float(os.getenv("DRIFT_WINDOW_SECONDS", "3600")),
+        drift_workspace=os.getenv("EVIDENTLY_WORKSPACE"),
+        drift_project_id=os.getenv("EVIDENTLY_PROJECT_ID"),
+        drift_sketch_dir=os.getenv("DRIFT_SKETCH_DIR"),
+    )
+    prefork_workers = int(os.getenv("PREFORK_WORKERS", "1"))
+    if prefork_workers > 1:
+        prefork.serve(model, prefork_workers)
+    else:
+        model_server = ModelServer()
+        model_server.dataplane = BinaryTensorDataPlane(
+            model_registry=model_server.registered_models,
+            predictor_config=model_server.dataplane.predictor_config,
+        )
+        model_server.start([model])
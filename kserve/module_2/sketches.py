@@ -0,0 +1,176 @@
+import itertools
+
+import numpy as np
+from scipy import stats
+from scipy.spatial import distance
+
+# Columns with more distinct values only keep their quantile sketch.
+MAX_DISTINCT_VALUES = 64
+# Size of the KLL sketch: exact up to this many values.
+KLL_K = 1000
+
+
+def new_sketch() -> dict:
+    """Return an empty mergeable sketch of a numeric column.
+
+    Count, mean and sum of squared deviations, exact counts while the
+    column has at most `MAX_DISTINCT_VALUES` distinct values, and a KLL
+    quantile sketch whose level h holds items of weight 2**h. The
+    components of evidently/module_5 inline this module, see
+    sync_inlined.py.
+    """
+    return {"count": 0, "mean": 0.0, "m2": 0.0, "values": {}, "levels": [np.empty(0)]}
+
+
+def _compact(levels: list, seed: int) -> list:
+    # A level over its capacity is sorted and every other item moves up
+    # with twice the weight.
+    h = 0
+    while h < len(levels):
+        capacity = max(2, int(KLL_K * (2 / 3) ** (len(levels) - 1 - h)))
+        if len(levels[h]) > capacity:
+            items = np.sort(levels[h])
+            odd = len(items) % 2
+            if h + 1 == len(levels):
+                levels.append(np.empty(0))
+            promoted = items[odd:][(seed + h) % 2 :: 2]
+            levels[h + 1] = np.concatenate([levels[h + 1], promoted])
+            levels[h] = items[:odd]
+        h += 1
+    return levels
+
+
+def sketch_merge(a: dict, b: dict) -> dict:
+    """Return the sketch of the union of the values of `a` and `b`."""
+    count = a["count"] + b["count"]
+    if not count:
+        return a
+    delta = b["mean"] - a["mean"]
+    values = None
+    if a["values"] is not None and b["values"] is not None:
+        values = dict(a["values"])
+        for value, n in b["values"].items():
+            values[value] = values.get(value, 0) + n
+        if len(values) > MAX_DISTINCT_VALUES:
+            values = None
+    empty = np.empty(0)
+    levels = [
+        np.concatenate(pair)
+        for pair in itertools.zip_longest(a["levels"], b["levels"], fillvalue=empty)
+    ]
+    return {
+        "count": count,
+        "mean": a["mean"] + delta * b["count"] / count,
+        "m2": a["m2"] + b["m2"] + delta**2 * a["count"] * b["count"] / count,
+        "values": values,
+        "levels": _compact(levels, count),
+    }
+
+
+def sketch_update(sketch: dict, values) -> dict:
+    """Add a chunk of values to `sketch`, non-finite ones are ignored like in Evidently."""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return sketch
+    distinct, counts = np.unique(values, return_counts=True)
+    mean = values.mean()
+    chunk = {
+        "count": len(values),
+        "mean": float(mean),
+        "m2": float(((values - mean) ** 2).sum()),
+        "values": (
+            dict(zip(distinct.tolist(), counts.tolist()))
+            if len(distinct) <= MAX_DISTINCT_VALUES
+            else None
+        ),
+        "levels": [values],
+    }
+    return sketch_merge(sketch, chunk)
+
+
+def sketch_to_json(sketch: dict) -> dict:
+    values = sketch["values"]
+    return {
+        **sketch,
+        "values": None if values is None else [[v, n] for v, n in sorted(values.items())],
+        "levels": [level.tolist() for level in sketch["levels"]],
+    }
+
+
+def sketch_from_json(data: dict) -> dict:
+    values = data["values"]
+    return {
+        **data,
+        "values": None if values is None else {v: n for v, n in values},
+        "levels": [np.array(level, dtype=float) for level in data["levels"]],
+    }
+
+
+def _weighted_items(sketch: dict):
+    # Sorted values and their weights: exact counts, or the KLL items.
+    if sketch["values"] is not None:
+        items, weights = zip(*sorted(sketch["values"].items()))
+        return np.array(items, dtype=float), np.array(weights, dtype=float)
+    items = np.concatenate(sketch["levels"])
+    weights = np.concatenate(
+        [np.full(len(level), 2.0**h) for h, level in enumerate(sketch["levels"])]
+    )
+    order = np.argsort(items, kind="stable")
+    return items[order], weights[order]
+
+
+def _cdf(sketch: dict, x):
+    # Share of the values lower than or equal to x.
+    items, weights = _weighted_items(sketch)
+    shares = np.concatenate([[0], np.cumsum(weights)]) / weights.sum()
+    return shares[np.searchsorted(items, x, side="right")]
+
+
+def column_drift(reference: dict, current: dict, column_type: str = "num") -> tuple:
+    """Return the (stattest name, threshold, score, drift detected) of a column.
+
+    The test and its threshold are the ones Evidently picks by default for
+    the same data, `column_type` being `"num"` or `"cat"`.
+    """
+    n_ref, n_cur = reference["count"], current["count"]
+    if not n_ref or not n_cur:
+        raise ValueError("Cannot compute drift on an empty sketch")
+    keys = None
+    if reference["values"] is not None and current["values"] is not None:
+        keys = sorted(set(reference["values"]) | set(current["values"]))
+        ref_counts, cur_counts = (
+            np.array([sketch["values"].get(k, 0) for k in keys], dtype=float)
+            for sketch in (reference, current)
+        )
+    elif column_type == "cat":
+        raise ValueError(
+            f"Categorical columns are limited to {MAX_DISTINCT_VALUES} distinct values"
+        )
+    categorical = keys is not None and (column_type == "cat" or len(keys) <= 5)
+    if n_ref <= 1000 and categorical and len(keys) <= 2:
+        if len(keys) == 1:
+            p_value = 1.0
+        else:
+            p_ref, p_cur = 1 - ref_counts[0] / n_ref, 1 - cur_counts[0] / n_cur
+            p = (p_ref * n_ref + p_cur * n_cur) / (n_ref + n_cur)
+            z = (p_ref - p_cur) / np.sqrt(p * (1 - p) * (1 / n_ref + 1 / n_cur))
+            p_value = 2 * (1 - stats.norm.cdf(abs(z)))
+        return "Z-test p_value", 0.05, float(p_value), bool(p_value < 0.05)
+    if n_ref <= 1000 and categorical:
+        p_value = stats.chisquare(cur_counts, ref_counts * n_cur / n_ref)[1]
+        return "chi-square p_value", 0.05, float(p_value), bool(p_value < 0.05)
+    if n_ref <= 1000:
+        points = np.union1d(_weighted_items(reference)[0], _weighted_items(current)[0])
+        d = np.max(np.abs(_cdf(reference, points) - _cdf(current, points)))
+        p_value = stats.kstwo.sf(d, np.round(n_ref * n_cur / (n_ref + n_cur)))
+        return "K-S p_value", 0.05, float(p_value), bool(p_value <= 0.05)
+    if categorical:
+        score = distance.jensenshannon(ref_counts / n_ref, cur_counts / n_cur)
+        return "Jensen-Shannon distance", 0.1, float(score), bool(score >= 0.1)
+    ref_items, ref_weights = _weighted_items(reference)
+    cur_items, cur_weights = _weighted_items(current)
+    score = stats.wasserstein_distance(ref_items, cur_items, ref_weights, cur_weights)
+    # Evidently's np.std is the population standard deviation too.
+    score /= max(np.sqrt(reference["m2"] / n_ref), 0.001)
+    return "Wasserstein distance (normed)", 0.1, float(score), bool(score >= 0.1)
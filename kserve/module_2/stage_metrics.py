@@ -0,0 +1,83 @@
+import time
+
+from prometheus_client import Counter, Histogram
+
+STAGES = ["decode", "uuid", "model", "response"]
+
+# Sub-millisecond resolution: most stages take a few microseconds.
+STAGE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+STAGE_SECONDS = Histogram(
+    "predict_stage_seconds",
+    "Time spent in each stage of SampleModel.predict",
+    ["model_name", "model_version", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+REQUESTS = Counter(
+    "predict_requests", "Predict requests handled", ["model_name", "model_version"]
+)
+ROWS = Counter("predict_rows", "Rows scored", ["model_name", "model_version"])
+BATCH_SIZE = Histogram(
+    "predict_batch_size",
+    "Rows per model call, after micro-batching",
+    ["model_name", "model_version"],
+    buckets=BATCH_SIZE_BUCKETS,
+)
+
+
+class StageMetrics:
+    """Per-stage latency histograms and request counters of one served model.
+
+    The labelled children are resolved once per model version so that each
+    observation is a single histogram update.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.set_version(None)
+
+    def set_version(self, model_version):
+        labels = (self.model_name, str(model_version) if model_version is not None else "unknown")
+        self._stages = {stage: STAGE_SECONDS.labels(*labels, stage) for stage in STAGES}
+        self._requests = REQUESTS.labels(*labels)
+        self._rows = ROWS.labels(*labels)
+        self._batch_size = BATCH_SIZE.labels(*labels)
+
+    def start(self) -> float:
+        return time.perf_counter()
+
+    def stage(self, stage: str, start: float) -> float:
+        """Record the time since `start` for `stage` and return the current time."""
+        now = time.perf_counter()
+        self._stages[stage].observe(now - start)
+        return now
+
+    def request(self, n_rows: int):
+        self._requests.inc()
+        self._rows.inc(n_rows)
+
+    def batch(self, n_rows: int):
+        self._batch_size.observe(n_rows)
+
+
+class NoStageMetrics:
+    """Drop-in `StageMetrics` used when instrumentation is disabled."""
+
+    def set_version(self, model_version):
+        pass
+
+    def start(self) -> float:
+        return 0.0
+
+    def stage(self, stage: str, start: float) -> float:
+        return 0.0
+
+    def request(self, n_rows: int):
+        pass
+
+    def batch(self, n_rows: int):
+        pass
@@ -0,0 +1,77 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+
+
+class RecordingModel:
+    """Doubles its input and records the size of each batch it is called with."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.batch_sizes = []
+
+    async def __call__(self, batch):
+        self.batch_sizes.append(len(batch))
+        if self.error is not None:
+            raise self.error
+        return np.asarray(batch)[:, 0] * 2
+
+
+async def submit_all(batcher, requests):
+    try:
+        return await asyncio.gather(
+            *[batcher.submit(rows) for rows in requests], return_exceptions=True
+        )
+    finally:
+        await batcher.close()
+
+
+def test_flush_on_size():
+    model = RecordingModel()
+    # The wait is long enough for the test to time out if only the deadline flushed.
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=60_000)
+    requests = [np.full((2, 1), i) for i in range(4)]
+
+    results = asyncio.run(asyncio.wait_for(submit_all(batcher, requests), timeout=10))
+
+    assert model.batch_sizes == [4, 4]
+    assert [r.tolist() for r in results] == [[2 * i, 2 * i] for i in range(4)]
+
+
+def test_flush_on_timeout():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=100, max_wait_ms=20)
+    requests = [np.full((1, 1), i) for i in range(3)]
+
+    results = asyncio.run(asyncio.wait_for(submit_all(batcher, requests), timeout=10))
+
+    assert model.batch_sizes == [3]
+    assert [r.tolist() for r in results] == [[0], [2], [4]]
+
+
+def test_errors_reach_each_caller():
+    error = ValueError("model failed")
+    batcher = MicroBatcher(RecordingModel(error), max_batch_size=4, max_wait_ms=20)
+
+    results = asyncio.run(submit_all(batcher, [np.ones((1, 1))] * 3))
+
+    assert results == [error] * 3
+
+
+def test_batcher_keeps_serving_after_an_error():
+    model = RecordingModel(ValueError("model failed"))
+    batcher = MicroBatcher(model, max_batch_size=1, max_wait_ms=20)
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await batcher.submit(np.ones((1, 1)))
+        model.error = None
+        try:
+            return await batcher.submit(np.ones((1, 1)))
+        finally:
+            await batcher.close()
+
+    assert asyncio.run(scenario()).tolist() == [2]
@@ -0,0 +1,214 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from evidently.metrics import ColumnDriftMetric, DataDriftTable
+from evidently.report import Report
+from sklearn.ensemble import RandomForestClassifier
+
+from drift_monitor import DriftMonitor
+from sketches import (
+    column_drift,
+    new_sketch,
+    sketch_from_json,
+    sketch_merge,
+    sketch_to_json,
+    sketch_update,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+DATASETS = sorted(glob.glob(os.path.join(DATA_DIR, "churn_data_*.csv")))
+FEATURES = ["Tenure", "MonthlyCharges", "ContractType", "SupportTickets"]
+
+
+class RecordingMonitor(DriftMonitor):
+    """Keeps the snapshots instead of uploading them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, workspace="recording", **kwargs)
+        self.snapshots = []
+
+    def _upload(self, snapshot):
+        self.snapshots.append(snapshot)
+
+
+@pytest.fixture(scope="module")
+def forest():
+    df = pd.read_csv(DATASETS[0])
+    return RandomForestClassifier(n_estimators=5, max_depth=2, random_state=42).fit(
+        df[FEATURES], df["Churn"]
+    )
+
+
+def write_profile(path, reference: pd.DataFrame, predictions) -> str:
+    """Write `reference` in the layout of the reference_profile component of evidently/module_5."""
+    profile = {
+        "key": "test",
+        "model_name": "ChurnPrediction",
+        "model_version": "1",
+        "columns": {
+            name: sketch_to_json(sketch_update(new_sketch(), reference[name])) for name in FEATURES
+        },
+        "prediction": sketch_to_json(sketch_update(new_sketch(), predictions)),
+    }
+    with open(path, "w") as f:
+        json.dump(profile, f)
+    return str(path)
+
+
+def evidently_scores(reference: pd.DataFrame, current: pd.DataFrame) -> dict:
+    report = Report(metrics=[DataDriftTable(columns=FEATURES), ColumnDriftMetric("prediction")])
+    report.run(reference_data=reference, current_data=current)
+    table, prediction = (metric["result"] for metric in report.as_dict()["metrics"])
+    scores = {name: table["drift_by_columns"][name] for name in FEATURES}
+    scores["prediction"] = prediction
+    return scores
+
+
+def test_merged_sketches_match_single_sketch():
+    values = np.random.default_rng(0).lognormal(size=200_000)
+    merged = new_sketch()
+    for chunk in np.array_split(values, 97):
+        merged = sketch_merge(merged, sketch_update(new_sketch(), chunk))
+    single = sketch_update(new_sketch(), values)
+
+    assert merged["count"] == single["count"] == len(values)
+    assert merged["mean"] == pytest.approx(values.mean())
+    assert merged["m2"] / len(values) == pytest.approx(values.var())
+    items = np.concatenate(merged["levels"])
+    weights = np.concatenate([np.full(len(l), 2.0**h) for h, l in enumerate(merged["levels"])])
+    for q in [0.01, 0.5, 0.99]:
+        x = np.quantile(values, q)
+        assert weights[items <= x].sum() / weights.sum() == pytest.approx(q, abs=0.01)
+
+
+@pytest.mark.parametrize("reference_copies", [1, 3], ids=["small", "large"])
+def test_window_snapshot_matches_evidently(forest, tmp_path, reference_copies):
+    # Over 1000 reference rows, Evidently switches from p-values to distances.
+    reference = pd.concat([pd.read_csv(DATASETS[0])[FEATURES]] * reference_copies)
+    reference = reference.assign(prediction=forest.predict(reference))
+    current = pd.read_csv(DATASETS[1])[FEATURES]
+    current = current.assign(prediction=forest.predict(current))
+    profile = write_profile(
+        tmp_path / "profile.json", reference[FEATURES], reference["prediction"]
+    )
+
+    monitor = RecordingMonitor("ChurnPrediction", profile, sketch_dir=str(tmp_path / "windows"))
+    for batch in np.array_split(current, 40):
+        # Both named and unnamed inputs, as decoded by get_predict_input.
+        monitor.observe(batch[FEATURES], batch["prediction"].to_numpy(), "2")
+        monitor.observe(batch[FEATURES].to_numpy(), batch["prediction"].to_numpy(), "2")
+    monitor.stop()
+
+    (snapshot,) = monitor.snapshots
+    assert snapshot.tags == ["data_drift", "prediction_drift"]
+    assert snapshot.metadata["served_model_versions"] == ["2"]
+    dataset_result, prediction_result = snapshot.suite.metric_results
+    assert dataset_result.number_of_columns == len(FEATURES)
+
+    # The sketches of the window, written next to the snapshot, give the per-column results.
+    (path,) = glob.glob(str(tmp_path / "windows" / "ChurnPrediction-*.json"))
+    with open(path) as f:
+        window = json.load(f)
+    results = {
+        name: column_drift(monitor.reference["columns"][name], sketch_from_json(sketch))
+        for name, sketch in window["columns"].items()
+    }
+    results["prediction"] = column_drift(
+        monitor.reference["prediction"], sketch_from_json(window["prediction"]), "cat"
+    )
+    assert results["prediction"] == (
+        prediction_result.stattest_name,
+        prediction_result.stattest_threshold,
+        prediction_result.drift_score,
+        prediction_result.drift_detected,
+    )
+
+    expected = evidently_scores(reference, pd.concat([current, current]))
+    for name, (stattest_name, _, score, detected) in results.items():
+        assert stattest_name == expected[name]["stattest_name"]
+        assert detected == expected[name]["drift_detected"]
+        # Evidently's K-S p-values are exact, the sketches give the asymptotic
+        # ones, and the Wasserstein distance is computed on the KLL items.
+        rel = {"K-S p_value": 0.2, "Wasserstein distance (normed)": 0.01}.get(stattest_name, 1e-6)
+        assert score == pytest.approx(expected[name]["drift_score"], rel=rel, abs=1e-12)
+    assert dataset_result.number_of_drifted_columns == sum(
+        expected[name]["drift_detected"] for name in FEATURES
+    )
+
+
+
+def test_one_snapshot_per_window(forest, tmp_path):
+    df = pd.read_csv(DATASETS[0])[FEATURES]
+    predictions = forest.predict(df)
+    profile = write_profile(tmp_path / "profile.json", df, predictions)
+    monitor = RecordingMonitor("ChurnPrediction", profile, window_seconds=60)
+
+    monitor.observe(df[:300], predictions[:300], "1")
+    monitor.drain()
+    # Rows observed once the window is over go to the next one.
+    monitor.window_end = monitor.window_start
+    monitor.observe(df[300:], predictions[300:], "2")
+    monitor.drain()
+    assert monitor.current_prediction["count"] == len(df) - 300
+    monitor.stop()
+
+    assert [s.metadata["served_model_versions"] for s in monitor.snapshots] == [["1"], ["2"]]
+    # Same data as the reference, so nothing drifts.
+    assert all(s.suite.metric_results[0].number_of_drifted_columns == 0 for s in monitor.snapshots)
+
+
+def test_first_worker_uploads_the_window_of_all_workers(forest, tmp_path):
+    df = pd.read_csv(DATASETS[0])[FEATURES]
+    predictions = forest.predict(df)
+    profile = write_profile(tmp_path / "profile.json", df, predictions)
+    monitors = [
+        RecordingMonitor(
+            "ChurnPrediction",
+            profile,
+            sketch_dir=str(tmp_path / "windows"),
+            merge_dir=str(tmp_path / "merge"),
+        )
+        for _ in range(3)
+    ]
+    for index, (monitor, rows) in enumerate(zip(monitors, np.array_split(np.arange(len(df)), 3))):
+        monitor.start(index, len(monitors))
+        monitor.observe(df.iloc[rows], predictions[rows], str(index))
+    for monitor in monitors[::-1]:
+        monitor.stop()
+
+    assert [len(monitor.snapshots) for monitor in monitors] == [1, 0, 0]
+    (snapshot,) = monitors[0].snapshots
+    assert snapshot.metadata["served_model_versions"] == ["0", "1", "2"]
+    assert snapshot.suite.metric_results[0].number_of_drifted_columns == 0
+    assert os.listdir(tmp_path / "merge") == []
+    (path,) = glob.glob(str(tmp_path / "windows" / "ChurnPrediction-*.json"))
+    with open(path) as f:
+        assert json.load(f)["prediction"]["count"] == len(df)
+
+    # Without the other workers, the first one uploads its own window in the end.
+    monitor = RecordingMonitor(
+        "ChurnPrediction", profile, merge_dir=str(tmp_path / "merge"), merge_timeout=0.2
+    )
+    monitor.start(0, 2)
+    monitor.observe(df, predictions, "1")
+    monitor.stop()
+    (snapshot,) = monitor.snapshots
+    assert snapshot.metadata["served_model_versions"] == ["1"]
+
+
+def test_full_buffer_drops_rows(forest, tmp_path):
+    df = pd.read_csv(DATASETS[0])[FEATURES]
+    predictions = forest.predict(df)
+    profile = write_profile(tmp_path / "profile.json", df, predictions)
+    monitor = RecordingMonitor("ChurnPrediction", profile, max_pending=2)
+
+    for batch in np.array_split(df.to_numpy(), 4):
+        monitor.observe(batch, predictions[: len(batch)])
+    assert monitor.dropped == 500
+    monitor.drain()
+    assert monitor.current_prediction["count"] == 500
+    assert monitor.dropped == 0
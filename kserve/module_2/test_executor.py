@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+import pytest
+
+from executor import BoundedExecutor, ExecutorSaturated
+
+
+def test_saturated_executor_fails_fast():
+    executor = BoundedExecutor("ChurnPrediction", max_workers=1, max_queue_size=1)
+    release = threading.Event()
+
+    async def scenario():
+        # One call runs on the worker, the other one waits in the queue.
+        admitted = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert (executor.busy_workers, executor.queue_depth) == (1, 1)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(release.wait)
+        release.set()
+        assert await asyncio.gather(*admitted) == [True, True]
+        assert executor.in_flight == 0
+        # Calls are admitted again once the pool has drained.
+        return await executor.run(sum, [1, 2])
+
+    try:
+        assert asyncio.run(asyncio.wait_for(scenario(), timeout=10)) == 3
+    finally:
+        release.set()
+        executor.shutdown()
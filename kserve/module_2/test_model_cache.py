@@ -0,0 +1,94 @@
+import json
+import os
+
+import mlflow
+import pytest
+from mlflow.tracking import MlflowClient
+
+import model_cache
+import registry
+from benchmark_utils import save_local_model
+from model_cache import MANIFEST, ModelCache
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    """Register two versions of the churn model, and count the artifact downloads."""
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", f"sqlite:///{tmp_path}/mlflow.db")
+    client = MlflowClient()
+    client.create_registered_model("ChurnPrediction")
+    for max_depth in [2, 3]:
+        client.create_model_version("ChurnPrediction", save_local_model(max_depth=max_depth))
+    client.set_registered_model_alias("ChurnPrediction", "production-live", "1")
+
+    calls = []
+    download_artifacts = mlflow.artifacts.download_artifacts
+
+    def counting_download(*args, **kwargs):
+        calls.append(kwargs["artifact_uri"])
+        return download_artifacts(*args, **kwargs)
+
+    monkeypatch.setattr(mlflow.artifacts, "download_artifacts", counting_download)
+    return calls
+
+
+def test_hit_after_first_download(tmp_path, downloads):
+    cache = ModelCache(str(tmp_path / "cache"), registry)
+
+    path = cache.local_path("models:/ChurnPrediction@production-live")
+
+    assert cache.local_path("models:/ChurnPrediction/1") == path
+    assert downloads == ["models:/ChurnPrediction/1"]
+    assert cache.load_model("models:/ChurnPrediction@production-live").metadata is not None
+
+
+def test_hits_only_hash_changed_entries(tmp_path, downloads, monkeypatch):
+    cache = ModelCache(str(tmp_path / "cache"), registry)
+    path = cache.local_path("models:/ChurnPrediction/1")
+    hashed = []
+    tree_checksum = model_cache._tree_checksum
+
+    def counting_checksum(path):
+        hashed.append(path)
+        return tree_checksum(path)
+
+    monkeypatch.setattr(model_cache, "_tree_checksum", counting_checksum)
+
+    cache.local_path("models:/ChurnPrediction/1")
+    assert hashed == []
+    # Touched but unchanged: hashed once, then trusted again.
+    os.utime(os.path.join(path, "MLmodel"), ns=(0, 0))
+    cache.local_path("models:/ChurnPrediction/1")
+    cache.local_path("models:/ChurnPrediction/1")
+    assert hashed == [path]
+    assert len(downloads) == 1
+
+
+def test_corrupted_entry_is_downloaded_again(tmp_path, downloads):
+    cache = ModelCache(str(tmp_path / "cache"), registry)
+    path = cache.local_path("models:/ChurnPrediction/1")
+    with open(os.path.join(path, "MLmodel"), "a") as f:
+        f.write("\n")
+
+    assert cache.local_path("models:/ChurnPrediction/1") == path
+    assert len(downloads) == 2
+    # Without verification, the entry is trusted as it is.
+    with open(os.path.join(path, "MLmodel"), "a") as f:
+        f.write("\n")
+    ModelCache(str(tmp_path / "cache"), registry, verify=False).local_path(
+        "models:/ChurnPrediction/1"
+    )
+    assert len(downloads) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, downloads):
+    cache = ModelCache(str(tmp_path / "cache"), MlflowClient())
+    first = cache.local_path("models:/ChurnPrediction/1")
+    # Room for one of the two versions only.
+    with open(os.path.join(first, MANIFEST)) as f:
+        cache.max_bytes = json.load(f)["size"]
+
+    second = cache.local_path("models:/ChurnPrediction/2")
+
+    assert os.listdir(cache.cache_dir) == [os.path.basename(second)]
+    assert not os.path.exists(first)
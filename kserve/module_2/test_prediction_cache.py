@@ -0,0 +1,61 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmark_utils import save_local_model
+from prediction_cache import FEATURES, PredictionCache, row_keys
+from server import SampleModel
+
+INPUTS = os.path.join(os.path.dirname(__file__), "inputs.json")
+
+
+def lookup(cache, version, keys):
+    out = np.full(len(keys), -1, dtype=np.int64)
+    missing = cache.lookup(version, keys, out)
+    return out.tolist(), missing.tolist()
+
+
+def test_keys_ignore_the_encoding_of_rows():
+    rows = np.array([[1.0, 70.5, 0.0, 2.0], [-0.0, np.nan, 1.0, 0.0]])
+    named = pd.DataFrame(rows[:, ::-1], columns=FEATURES[::-1])
+
+    assert row_keys(rows) == row_keys(rows.astype(np.float32)) == row_keys(named)
+    assert row_keys(rows)[1] == row_keys(np.array([[0.0, np.nan, 1.0, 0.0]]))[0]
+
+
+def test_invalidate_on_version_swap():
+    cache = PredictionCache("ChurnPrediction", max_entries=10)
+    cache.invalidate("1")
+    keys = row_keys(np.arange(8.0).reshape(2, 4))
+    cache.store("1", keys, np.array([0, 1]))
+    assert lookup(cache, "1", keys) == ([0, 1], [])
+
+    cache.invalidate("2")
+    assert lookup(cache, "2", keys)[1] == [0, 1]
+    # A request still running on version 1 does not fill the cache of version 2.
+    cache.store("1", keys, np.array([0, 1]))
+    assert lookup(cache, "2", keys)[1] == [0, 1]
+    assert lookup(cache, "1", keys)[1] == [0, 1]
+
+
+def test_server_empties_the_cache_on_swap(monkeypatch):
+    model = SampleModel("ChurnPrediction", model_uri=save_local_model(), prediction_cache_size=100)
+    with open(INPUTS) as f:
+        payload = json.load(f)
+    n_rows = len(payload["instances"])
+
+    asyncio.run(model.predict(payload))
+    asyncio.run(model.predict(payload))
+    assert (model.prediction_cache.hits, model.prediction_cache.misses) == (n_rows, n_rows)
+
+    new_model_uri = save_local_model(n_estimators=3)
+    monkeypatch.setattr(model, "_resolve_model_uri", lambda: (new_model_uri, "2"))
+    assert model.swap_if_updated()
+    response = asyncio.run(model.predict(payload))
+
+    assert model.prediction_cache.misses == 2 * n_rows
+    expected = model.model.predict(np.asarray(payload["instances"]))
+    assert response == {"predictions": expected.tolist()}
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from kserve.errors import InvalidInput
+from sklearn.compose import make_column_transformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from predictors import NativeSklearnPredictor
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "Tenure": rng.integers(0, 72, 200),
+            "MonthlyCharges": rng.normal(70, 30, 200),
+            "ContractType": rng.choice(["monthly", "yearly", "two-year"], 200),
+        }
+    )
+    churn = (df["MonthlyCharges"] + rng.normal(0, 20, 200) > 70).astype(int)
+    return df, churn
+
+
+def test_tree_model_rejects_non_numeric_input(data):
+    df, churn = data
+    numeric = df.drop(columns=["ContractType"])
+    predictor = NativeSklearnPredictor(RandomForestClassifier(n_estimators=5).fit(numeric, churn))
+    numeric = numeric.assign(MonthlyCharges=numeric["MonthlyCharges"].astype(str) + " USD")
+
+    assert predictor.float32
+    with pytest.raises(InvalidInput):
+        predictor.predict(numeric)
+
+
+class RecordingLogisticRegression(LogisticRegression):
+    def predict(self, X):
+        self.last_input = X
+        return super().predict(X)
+
+
+def test_linear_model_input_is_not_cast(data):
+    df, churn = data
+    numeric = df.drop(columns=["ContractType"])
+    estimator = RecordingLogisticRegression().fit(numeric, churn)
+
+    predictor = NativeSklearnPredictor(estimator)
+
+    assert not predictor.float32
+    expected = LogisticRegression().fit(numeric, churn).predict(numeric)
+    assert np.array_equal(predictor.predict(numeric), expected)
+    assert estimator.last_input is numeric
+
+
+def test_pipeline_with_encoder(data):
+    df, churn = data
+    estimator = make_pipeline(
+        make_column_transformer(
+            (OneHotEncoder(), ["ContractType"]), remainder="passthrough"
+        ),
+        LogisticRegression(max_iter=1000),
+    ).fit(df, churn)
+
+    predictor = NativeSklearnPredictor(estimator)
+
+    assert np.array_equal(predictor.predict(df), estimator.predict(df))
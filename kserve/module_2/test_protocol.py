@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+import orjson
+import pytest
+from kserve import ModelRepository
+from kserve.constants.constants import INFERENCE_CONTENT_LENGTH_HEADER
+from kserve.errors import InvalidInput
+
+from benchmark_payloads import round_trip
+from benchmark_utils import load_features, make_binary_body, make_json_body, save_local_model
+from protocol import BinaryTensorDataPlane, decode_binary_request
+from server import SampleModel
+
+INPUTS = os.path.join(os.path.dirname(__file__), "inputs.json")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return SampleModel("ChurnPrediction", model_uri=save_local_model())
+
+
+@pytest.fixture(scope="module")
+def dataplane(model):
+    registry = ModelRepository()
+    registry.update(model)
+    return BinaryTensorDataPlane(model_registry=registry)
+
+
+def decode_binary_response(body: bytes, json_length: int):
+    header = orjson.loads(body[:json_length])
+    (output,) = header["outputs"]
+    assert output["parameters"]["binary_data_size"] == len(body) - json_length
+    return np.frombuffer(body[json_length:], dtype=np.int64).reshape(output["shape"])
+
+
+def test_binary_request_is_not_copied():
+    rows = load_features().to_numpy()[:16]
+    body, json_length = make_binary_body(rows)
+
+    request = decode_binary_request(body, json_length, "ChurnPrediction")
+
+    decoded = request.inputs[0].as_numpy()
+    assert decoded.tolist() == rows.tolist()
+    assert np.shares_memory(decoded, np.frombuffer(body, dtype=np.uint8))
+
+
+@pytest.mark.parametrize(
+    "header", [b'{"inputs": [', b'{"inputs": [{"name": "x", "shape": [1], "datatype": "FP64"}]}']
+)
+def test_invalid_binary_request(header):
+    with pytest.raises(InvalidInput):
+        decode_binary_request(header, len(header), "ChurnPrediction")
+
+
+def test_binary_round_trip_matches_json(model, dataplane):
+    rows = load_features().to_numpy()[:100]
+    body, json_length = make_binary_body(rows)
+    headers = {INFERENCE_CONTENT_LENGTH_HEADER: str(json_length)}
+
+    request, _ = dataplane.decode(body, headers, "v2", model.name)
+    response = asyncio.run(model.predict(request))
+    binary_response, response_headers = dataplane.encode(model.name, response, headers, {})
+    json_body = asyncio.run(round_trip(dataplane, model, make_json_body(rows), {}))
+    json_response = orjson.loads(json_body)
+
+    expected = model.model.predict(rows).tolist()
+    assert json_response["outputs"][0]["data"] == expected
+    json_length = int(response_headers[INFERENCE_CONTENT_LENGTH_HEADER])
+    assert decode_binary_response(binary_response, json_length).tolist() == expected
+
+
+def test_v1_round_trip(model, dataplane):
+    with open(INPUTS) as f:
+        body = f.read().encode()
+
+    request, _ = dataplane.decode(body, {}, "v1", model.name)
+    response, _ = dataplane.encode(model.name, asyncio.run(model.predict(request)), {}, {})
+
+    instances = np.asarray(json.loads(body)["instances"])
+    assert response == {"predictions": model.model.predict(instances).tolist()}
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from kserve import InferRequest
+
+import server
+from benchmark_utils import REFERENCE_DATASET, make_request, save_local_model
+from server import SampleModel
+
+INPUTS = os.path.join(os.path.dirname(__file__), "inputs.json")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return SampleModel("ChurnPrediction", model_uri=save_local_model())
+
+
+def test_v1_request(model):
+    with open(INPUTS) as f:
+        payload = json.load(f)
+
+    response = asyncio.run(model.predict(payload))
+
+    expected = model.model.predict(np.asarray(payload["instances"]))
+    assert response == {"predictions": expected.tolist()}
+
+
+def test_v2_request(model):
+    rows = pd.read_csv(REFERENCE_DATASET).drop(columns=["Churn"]).to_numpy()[:8]
+
+    response = asyncio.run(model.predict(make_request(rows)))
+
+    assert response.outputs[0].as_numpy().tolist() == model.model.predict(rows).tolist()
+
+
+def test_saturated_executor_returns_429():
+    model = SampleModel(
+        "ChurnPrediction", model_uri=save_local_model(), executor="thread", executor_queue_size=0
+    )
+    release = threading.Event()
+    predict = model.model.predict
+    model.model = SimpleNamespace(predict=lambda rows: release.wait() and predict(rows))
+    with open(INPUTS) as f:
+        payload = json.load(f)
+
+    async def scenario():
+        running = asyncio.ensure_future(model.predict(payload))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as e:
+            await model.predict(payload)
+        release.set()
+        await running
+        return e.value.status_code
+
+    model.start()
+    try:
+        assert asyncio.run(asyncio.wait_for(scenario(), timeout=10)) == 429
+    finally:
+        release.set()
+        model.stop()
+        model.executor.shutdown()
+
+
+def test_swap_warms_up_through_the_request_path(monkeypatch):
+    model = SampleModel(
+        "ChurnPrediction", model_uri=save_local_model(), warmup_batch_sizes=[1, 16]
+    )
+    new_model_uri = save_local_model(n_estimators=3)
+    monkeypatch.setattr(model, "_resolve_model_uri", lambda: (new_model_uri, "2"))
+    decoded = []
+    get_predict_input = server.get_predict_input
+
+    def recording_get_predict_input(payload):
+        decoded.append(payload)
+        return get_predict_input(payload)
+
+    monkeypatch.setattr(server, "get_predict_input", recording_get_predict_input)
+
+    assert model.swap_if_updated()
+
+    assert [type(payload) for payload in decoded] == [InferRequest, InferRequest]
+    assert [payload.inputs[0].shape for payload in decoded] == [[1, 4], [16, 4]]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_executor_started_after_fork(executor):
+    """Like a prefork worker: fork the warmed up model, then start and serve from the child."""
+    model = SampleModel(
+        "ChurnPrediction",
+        model_uri=save_local_model(),
+        executor=executor,
+        executor_workers=2,
+        warmup_batch_sizes=[1, 16],
+    )
+    assert model.executor is None
+    with open(INPUTS) as f:
+        payload = json.load(f)
+
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            model.start()
+            asyncio.run(model.predict(payload))
+            exit_code = 0
+        finally:
+            # os._exit skips the shutdown of the pool, which would leave its processes behind.
+            if model.executor is not None:
+                model.executor.pool.shutdown()
+            os._exit(exit_code)
+    deadline = time.monotonic() + 60
+    while (status := os.waitpid(pid, os.WNOHANG))[0] == 0 and time.monotonic() < deadline:
+        time.sleep(0.1)
+    if status[0] == 0:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        pytest.fail("The forked worker did not answer")
+    assert os.waitstatus_to_exitcode(status[1]) == 0
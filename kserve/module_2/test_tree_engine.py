@@ -0,0 +1,55 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import tree_engine
+from predictors import load_predictor
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+DATASETS = sorted(glob.glob(os.path.join(DATA_DIR, "churn_data_*.csv")))
+
+# The forest trained by kfp/module_6 and the default one of dvc/module_4.
+FORESTS = [
+    {"n_estimators": 5, "max_depth": 2, "random_state": 42},
+    {"n_estimators": 100, "random_state": 42},
+]
+
+
+@pytest.fixture(scope="module", params=FORESTS)
+def forest(request):
+    df = pd.read_csv(DATASETS[0])
+    return RandomForestClassifier(**request.param).fit(
+        df.drop(columns=["Churn"]), df["Churn"]
+    )
+
+
+@pytest.mark.parametrize("dataset", DATASETS, ids=os.path.basename)
+def test_parity_with_sklearn(forest, dataset):
+    features = pd.read_csv(dataset).drop(columns=["Churn"])
+    compiled = tree_engine.CompiledForest(tree_engine.compile_forest(forest))
+
+    assert np.array_equal(compiled.predict_proba(features), forest.predict_proba(features))
+    assert np.array_equal(compiled.predict(features), forest.predict(features))
+
+
+def test_mlflow_flavor_round_trip(forest, tmp_path):
+    features = pd.read_csv(DATASETS[-1]).drop(columns=["Churn"])
+    model_path = str(tmp_path / "model")
+    tree_engine.save_model(forest, model_path)
+
+    predictor = load_predictor(model_path)
+
+    assert isinstance(predictor.estimator, tree_engine.CompiledForest)
+    assert np.array_equal(predictor.predict(features[features.columns[::-1]]), forest.predict(features))
+
+
+def test_parity_with_missing_values(forest):
+    features = pd.read_csv(DATASETS[-1]).drop(columns=["Churn"]).to_numpy()
+    features[np.random.default_rng(0).random(features.shape) < 0.2] = np.nan
+    compiled = tree_engine.CompiledForest(tree_engine.compile_forest(forest))
+
+    assert np.array_equal(compiled.predict_proba(features), forest.predict_proba(features))
@@ -0,0 +1,188 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import yaml
+
+FLAVOR_NAME = "compiled_forest"
+DATA_FILE = "compiled_forest.npz"
+
+
+def _breadth_first(tree) -> np.ndarray:
+    """Order the nodes of `tree` so that the two children of a node are adjacent."""
+    order = [0]
+    for node in order:
+        if tree.children_left[node] != -1:
+            order += [tree.children_left[node], tree.children_right[node]]
+    return np.asarray(order)
+
+
+def compile_forest(forest) -> dict:
+    """Flatten the trees of a fitted forest classifier into packed node arrays.
+
+    The nodes of all trees are concatenated and renumbered so that the right
+    child of a node directly follows its left child, which is the only one
+    stored. Leaves point to themselves and have an infinite threshold.
+    """
+    if forest.n_outputs_ != 1:
+        raise ValueError("Only single output forests can be compiled")
+    roots, feature, threshold, left, missing_right, value = [], [], [], [], [], []
+    n_nodes = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        order = _breadth_first(tree)
+        position = np.empty_like(order)
+        position[order] = n_nodes + np.arange(len(order))
+        is_leaf = tree.children_left[order] == -1
+        roots.append(n_nodes)
+        feature.append(np.where(is_leaf, 0, tree.feature[order]))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+        left.append(np.where(is_leaf, position[order], position[tree.children_left[order]]))
+        # Before missing value support, NaN features always went right.
+        missing_go_to_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count))
+        missing_right.append(~is_leaf & (missing_go_to_left[order] == 0))
+        # Same normalization as DecisionTreeClassifier.predict_proba.
+        proba = tree.value[order, 0, :]
+        normalizer = proba.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        value.append(proba / normalizer)
+        n_nodes += len(order)
+    arrays = {
+        "roots": np.asarray(roots, dtype=np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "left": np.concatenate(left).astype(np.int32),
+        "missing_right": np.concatenate(missing_right),
+        "value": np.concatenate(value).astype(np.float64),
+        "classes": forest.classes_,
+        "n_features": np.int32(forest.n_features_in_),
+    }
+    if hasattr(forest, "feature_names_in_"):
+        arrays["feature_names"] = np.asarray(forest.feature_names_in_, dtype=str)
+    return arrays
+
+
+class CompiledForest:
+    """Evaluate all trees of a compiled forest at once with NumPy.
+
+    Exposes the parts of the scikit-learn classifier API used for serving, and
+    returns the same predictions as the forest it was compiled from.
+    """
+
+    def __init__(self, arrays):
+        # Indices are stored as int32 and used as intp to avoid casts on lookups.
+        self.roots = arrays["roots"].astype(np.intp)
+        self.feature = arrays["feature"].astype(np.intp)
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"].astype(np.intp)
+        self.missing_right = arrays["missing_right"]
+        self.value = arrays["value"]
+        self.classes_ = arrays["classes"]
+        self.n_features_in_ = int(arrays["n_features"])
+        if "feature_names" in arrays:
+            self.feature_names_in_ = arrays["feature_names"].astype(object)
+        self._is_leaf = self.left == np.arange(len(self.left))
+
+    def apply(self, X) -> np.ndarray:
+        """Return the leaf reached in each tree, shape (n_samples, n_trees)."""
+        # Trees split on float32 features like sklearn, comparing them to
+        # float64 thresholds.
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_samples, n_trees = X.shape[0], len(self.roots)
+        flat_X = X.ravel()
+        has_missing = bool(np.isnan(flat_X).any())
+        leaves = np.tile(self.roots, n_samples)
+        # Walk all (sample, tree) lanes together. Leaves point to themselves,
+        # so lanes that are done only need to be dropped once they make up a
+        # good share of the ones left.
+        lanes = np.arange(leaves.size)
+        node = leaves.copy()
+        row_offset = np.repeat(np.arange(n_samples) * X.shape[1], n_trees)
+        while lanes.size:
+            x = flat_X[row_offset + self.feature[node]]
+            go_right = x > self.threshold[node]
+            if has_missing:
+                go_right |= np.isnan(x) & self.missing_right[node]
+            node = self.left[node] + go_right
+            done = self._is_leaf[node]
+            if np.count_nonzero(done) * 4 >= lanes.size:
+                leaves[lanes[done]] = node[done]
+                running = ~done
+                lanes, node, row_offset = lanes[running], node[running], row_offset[running]
+        return leaves.reshape(n_samples, n_trees)
+
+    def predict_proba(self, X) -> np.ndarray:
+        leaves = self.value[self.apply(X)]
+        # Accumulate tree by tree, in the order sklearn does, so that ties
+        # between classes are broken the same way.
+        proba = np.zeros((leaves.shape[0], leaves.shape[2]))
+        for tree in range(leaves.shape[1]):
+            proba += leaves[:, tree]
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def save_model(sk_model, path: str, mlflow_model=None, **kwargs):
+    """Save `sk_model` with the sklearn flavor plus its compiled form.
+
+    The model stays loadable with `mlflow.sklearn` and `mlflow.pyfunc`, the
+    serving runtime picks the `compiled_forest` flavor when present.
+    """
+    import mlflow
+    from mlflow.models import Model
+
+    if mlflow_model is None:
+        mlflow_model = Model()
+    mlflow.sklearn.save_model(sk_model, path, mlflow_model=mlflow_model, **kwargs)
+    arrays = compile_forest(sk_model)
+    np.savez(os.path.join(path, DATA_FILE), **arrays)
+    mlflow_model.add_flavor(
+        FLAVOR_NAME,
+        data=DATA_FILE,
+        n_trees=len(arrays["roots"]),
+        n_nodes=len(arrays["left"]),
+    )
+    mlflow_model.save(os.path.join(path, "MLmodel"))
+
+
+def log_model(sk_model, artifact_path: str, **kwargs):
+    """Log `sk_model` with `save_model` to the active run, as `mlflow.sklearn.log_model` does."""
+    from mlflow.models import Model
+
+    return Model.log(
+        artifact_path=artifact_path,
+        flavor=SimpleNamespace(save_model=save_model),
+        sk_model=sk_model,
+        **kwargs,
+    )
+
+
+def load_model(model_uri: str) -> CompiledForest:
+    local_path = model_uri
+    if not os.path.isdir(local_path):
+        import mlflow
+
+        local_path = mlflow.artifacts.download_artifacts(artifact_uri=model_uri)
+    with open(os.path.join(local_path, "MLmodel")) as f:
+        flavor_conf = yaml.safe_load(f)["flavors"][FLAVOR_NAME]
+    with np.load(os.path.join(local_path, flavor_conf["data"])) as arrays:
+        return CompiledForest(dict(arrays))
+
+
+if __name__ == "__main__":
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(
+        description="Convert a pickled forest, e.g. the one from dvc/module_4/train.py, "
+        "into an MLflow model with the compiled_forest flavor."
+    )
+    parser.add_argument("--model_path", type=str, required=True)
+    parser.add_argument("--output_path", type=str, required=True)
+    args = parser.parse_args()
+
+    with open(args.model_path, "rb") as f:
+        save_model(pickle.load(f), args.output_path)
@@ -0,0 +1,47 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from kserve import InferInput, InferRequest
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), "warmup_sample.csv")
+
+_NUMERIC_TYPES = {"double", "float", "long", "integer", "boolean"}
+
+
+def _signature_rows(metadata, n_rows: int, rng: np.random.Generator):
+    """Draw random rows matching the column-based input signature of the model, if any."""
+    if hasattr(metadata, "to_dict"):
+        metadata = metadata.to_dict()
+    signature = (metadata or {}).get("signature") or {}
+    if not signature.get("inputs"):
+        return None
+    types = [column["type"] for column in json.loads(signature["inputs"])]
+    if not set(types) <= _NUMERIC_TYPES:
+        return None
+    columns = [
+        rng.uniform(0, 100, n_rows) if data_type in ("double", "float") else rng.integers(0, 4, n_rows)
+        for data_type in types
+    ]
+    return np.column_stack(columns).astype(np.float64)
+
+
+def warmup_batches(metadata, batch_sizes, seed: int = 0) -> list:
+    """Build one batch per size in `batch_sizes`.
+
+    Rows are drawn from the model signature when it only has numeric columns,
+    otherwise from the sample of churn_data_2025_03 bundled with the server.
+    """
+    rng = np.random.default_rng(seed)
+    rows = _signature_rows(metadata, max(batch_sizes), rng)
+    if rows is None:
+        sample = pd.read_csv(SAMPLE_PATH).to_numpy(dtype=np.float64)
+        rows = sample[rng.integers(0, len(sample), max(batch_sizes))]
+    return [rows[:batch_size] for batch_size in batch_sizes]
+
+
+def warmup_request(model_name: str, rows: np.ndarray) -> InferRequest:
+    infer_input = InferInput(name="input-0", shape=list(rows.shape), datatype="FP64")
+    infer_input.set_data_from_numpy(rows, binary_data=False)
+    return InferRequest(model_name=model_name, infer_inputs=[infer_input])
@@ -0,0 +1,237 @@
+"""Keep the helpers inlined in KFP components in sync with the modules they come from.
+
+A lightweight KFP component only ships the source of its own function, so it
+cannot import the modules of this repository: their helpers are copied in its
+body, between two markers.
+
+    # BEGIN INLINED kserve/module_2/sketches.py: new_sketch sketch_update
+    # Generated by sync_inlined.py, edit the file above instead.
+    ...
+    # END INLINED
+
+A region holds the named top-level definitions of the file, the ones they
+use, and the imports they need. Definitions imported from a module next to
+the file are inlined too. Definitions and imports already in the component,
+or in a previous region of the same component, are not repeated, and a
+definition named like a parameter of the component is an error.
+
+A region can also be outside of any function, to share the definitions of a
+script with a script of another directory, which cannot import it.
+
+    python sync_inlined.py          # rewrite the regions of every file
+    python sync_inlined.py --check  # list the files whose regions are out of date
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BEGIN = re.compile(r"^( *)# BEGIN INLINED (\S+): (.+)$")
+END = "# END INLINED"
+NOTE = "# Generated by sync_inlined.py, edit the file above instead."
+
+
+def _import_key(node, alias) -> tuple:
+    if isinstance(node, ast.Import):
+        return (None, alias.name, alias.asname)
+    return (node.module, alias.name, alias.asname)
+
+
+def _render_imports(keys, indent: str) -> list:
+    lines = []
+    for module, name, asname in sorted(k for k in keys if k[0] is None):
+        lines.append(f"{indent}import {name}" + (f" as {asname}" if asname else ""))
+    by_module = {}
+    for module, name, asname in keys:
+        if module is not None:
+            by_module.setdefault(module, []).append(name + (f" as {asname}" if asname else ""))
+    for module in sorted(by_module):
+        lines.append(f"{indent}from {module} import {', '.join(sorted(by_module[module]))}")
+    return lines
+
+
+class _Source:
+    """The top-level definitions and imports of a module of the repository."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(ROOT, path)) as f:
+            self.lines = f.read().splitlines()
+        self.definitions = {}
+        # bound name -> import key
+        self.imports = {}
+        # bound name -> (path, name) of the definitions imported from modules next to this one
+        self.siblings = {}
+        for node in ast.parse("\n".join(self.lines)).body:
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                self.definitions[node.name] = node
+            elif isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        self.definitions[target.id] = node
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                sibling = None
+                if isinstance(node, ast.ImportFrom) and not node.level:
+                    sibling = os.path.join(os.path.dirname(path), node.module + ".py")
+                for alias in node.names:
+                    bound = alias.asname or alias.name.split(".")[0]
+                    if sibling and os.path.exists(os.path.join(ROOT, sibling)):
+                        self.siblings[bound] = (sibling, alias.name)
+                    else:
+                        self.imports[bound] = _import_key(node, alias)
+
+    def start(self, node) -> int:
+        """The first line of a definition, with its decorators and the comments right above it."""
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+        while start > 0 and self.lines[start - 1].lstrip().startswith("#"):
+            start -= 1
+        return start
+
+
+def _inline(
+    names: list, path: str, indent: str, defined: set, imported: set, parameters: set
+) -> list:
+    """The lines of a region inlining `names` of `path`, updating `defined` and `imported`."""
+    sources = {}
+    needed = {}
+    imports = []
+    queue = [(path, name) for name in names]
+    while queue:
+        path, name = queue.pop(0)
+        if path not in sources:
+            sources[path] = _Source(path)
+            needed[path] = []
+        source = sources[path]
+        if name in source.siblings:
+            sibling, original = source.siblings[name]
+            if original != name:
+                raise ValueError(f"{path}: cannot inline {name}, imported under another name")
+            queue.append((sibling, name))
+            continue
+        if name not in source.definitions:
+            raise ValueError(f"{path} has no top-level definition {name!r}")
+        if name in defined:
+            continue
+        if name in parameters:
+            raise ValueError(f"{path}: cannot inline {name}, a parameter of the component")
+        node = source.definitions[name]
+        defined.add(name)
+        if node in needed[path]:
+            continue
+        needed[path].append(node)
+        for child in ast.walk(node):
+            if not isinstance(child, ast.Name):
+                continue
+            if child.id in source.definitions or child.id in source.siblings:
+                queue.append((path, child.id))
+            elif child.id in source.imports:
+                key = source.imports[child.id]
+                if key[0] is None and os.path.exists(
+                    os.path.join(ROOT, os.path.dirname(path), key[1] + ".py")
+                ):
+                    raise ValueError(f"{path}: cannot inline {name}, which uses module {key[1]}")
+                if key not in imported:
+                    imported.add(key)
+                    imports.append(key)
+
+    lines = _render_imports(imports, indent)
+    # Two blank lines between top-level definitions, one in a function.
+    separator = [""] if indent else ["", ""]
+    # Modules inlined for their definitions come first, in the order of their files.
+    for path in reversed(list(sources)):
+        source, previous = sources[path], None
+        for node in sorted(needed[path], key=lambda node: node.lineno):
+            start = source.start(node)
+            # Definitions next to each other in their file, such as constants, stay together.
+            if lines and not (previous is not None and previous.end_lineno == start):
+                lines += separator
+            segment = source.lines[start : node.end_lineno]
+            lines += [indent + line if line else "" for line in segment]
+            previous = node
+    return lines
+
+
+def _own_imports(function, regions) -> set:
+    # The imports of the component, or of the module, outside of its regions.
+    keys = set()
+    for node in function.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and not any(
+            begin < node.lineno <= end for begin, end in regions
+        ):
+            keys.update(_import_key(node, alias) for alias in node.names)
+    return keys
+
+
+def render(path: str) -> str:
+    """Return the content of `path` with its regions generated again from their files."""
+    with open(os.path.join(ROOT, path)) as f:
+        lines = f.read().splitlines()
+    regions = []
+    begin = None
+    for i, line in enumerate(lines):
+        if BEGIN.match(line):
+            begin = i
+        elif line.strip() == END and begin is not None:
+            regions.append((begin + 1, i + 1))
+            begin = None
+    module = ast.parse("\n".join(lines))
+    functions = [node for node in module.body if isinstance(node, ast.FunctionDef)]
+
+    output, position = [], 0
+    state = {}
+    for begin, end in regions:
+        # A region outside of any function belongs to the module.
+        function = next((f for f in functions if f.lineno <= begin <= f.end_lineno), module)
+        if function not in state:
+            state[function] = (set(), _own_imports(function, regions))
+        defined, imported = state[function]
+        indent, source, names = BEGIN.match(lines[begin - 1]).groups()
+        output += lines[position : begin - 1]
+        output += [lines[begin - 1], indent + NOTE]
+        parameters = set()
+        if function is not module:
+            parameters = {a.arg for a in function.args.args + function.args.kwonlyargs}
+        output += _inline(names.split(), source, indent, defined, imported, parameters)
+        output.append(indent + END)
+        position = end
+    output += lines[position:]
+    return "\n".join(output) + "\n"
+
+
+def find_files() -> list:
+    """The Python files of the repository with inlined regions."""
+    paths = []
+    for directory, dirs, files in os.walk(ROOT):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for file_name in sorted(files):
+            path = os.path.relpath(os.path.join(directory, file_name), ROOT)
+            if not file_name.endswith(".py") or path == "sync_inlined.py":
+                continue
+            with open(os.path.join(ROOT, path)) as f:
+                if any(BEGIN.match(line) for line in f):
+                    paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate the helpers inlined in KFP components from the files they come from."
+    )
+    parser.add_argument("--check", action="store_true", help="only list the files out of date")
+    args = parser.parse_args()
+
+    out_of_date = []
+    for path in find_files():
+        content = render(path)
+        with open(os.path.join(ROOT, path)) as f:
+            if f.read() == content:
+                continue
+        out_of_date.append(path)
+        if not args.check:
+            with open(os.path.join(ROOT, path), "w") as f:
+                f.write(content)
+    for path in out_of_date:
+        print(f"{path} is out of date" if args.check else f"Updated {path}")
+    sys.exit(1 if args.check and out_of_date else 0)
@@ -0,0 +1,12 @@
+import os
+
+import pytest
+
+import sync_inlined
+
+
+@pytest.mark.parametrize("path", sync_inlined.find_files())
+def test_inlined_helpers_are_up_to_date(path):
+    with open(os.path.join(sync_inlined.ROOT, path)) as f:
+        content = f.read()
+    assert sync_inlined.render(path) == content, f"Run `python sync_inlined.py` to update {path}"